@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+#
+# Measure the throughput of the DataLoader input pipeline on synthetic
+# datasets, over a sweep of num_workers, batch_size, pin_memory and
+# collate functions.
+#
+# Every sample is a float tensor of a configurable size, whose loading
+# sleeps for a configurable I/O latency and spins the CPU for a
+# configurable time. For each configuration one epoch is loaded, and the
+# samples/s, the latency of the first batch and the distribution of the
+# latencies of the following batches, the CPU utilization of the workers
+# and the fraction of the main process time spent waiting for batches in
+# _MultiProcessingDataLoaderIter._get_data are reported.
+#
+
+import argparse
+import itertools
+import time
+
+import torch
+from torch.utils.data import DataLoader, Dataset, IterableDataset, get_worker_info
+from torch.utils.data import dataloader as dataloader_module
+from torch.utils.data._utils.collate import default_collate
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def load_sample(index, sample_size, cpu_ms, io_ms):
+    if io_ms > 0:
+        time.sleep(io_ms / 1000)
+    if cpu_ms > 0:
+        end = time.perf_counter() + cpu_ms / 1000
+        while time.perf_counter() < end:
+            pass
+    return torch.full((sample_size,), float(index)), index
+
+
+class SyntheticDataset(Dataset):
+    def __init__(self, num_samples, sample_size, cpu_ms, io_ms):
+        self.num_samples = num_samples
+        self.sample_size = sample_size
+        self.cpu_ms = cpu_ms
+        self.io_ms = io_ms
+
+    def __len__(self):
+        return self.num_samples
+
+    def __getitem__(self, index):
+        return load_sample(index, self.sample_size, self.cpu_ms, self.io_ms)
+
+
+class SyntheticIterableDataset(IterableDataset):
+    def __init__(self, num_samples, sample_size, cpu_ms, io_ms):
+        self.num_samples = num_samples
+        self.sample_size = sample_size
+        self.cpu_ms = cpu_ms
+        self.io_ms = io_ms
+
+    def __iter__(self):
+        # Every worker loads an interleaved share of the samples.
+        worker_info = get_worker_info()
+        start, step = 0, 1
+        if worker_info is not None:
+            start, step = worker_info.id, worker_info.num_workers
+        for index in range(start, self.num_samples, step):
+            yield load_sample(index, self.sample_size, self.cpu_ms, self.io_ms)
+
+
+def stack_collate(batch):
+    # Collates the samples into a preallocated tensor, without the
+    # recursion over the sample structure of default_collate.
+    tensors, labels = zip(*batch)
+    out = None
+    if get_worker_info() is not None:
+        # Allocate in shared memory to avoid a copy when sending the batch
+        # to the main process, as default_collate does.
+        numel = len(tensors) * tensors[0].numel()
+        storage = tensors[0].storage()._new_shared(numel)
+        out = tensors[0].new(storage)
+    return torch.stack(tensors, out=out), torch.tensor(labels)
+
+
+def list_collate(batch):
+    # No collation, the batch is sent as a list of samples.
+    return batch
+
+
+COLLATE_FNS = {
+    "default": default_collate,
+    "stack": stack_collate,
+    "list": list_collate,
+}
+
+DATASETS = {
+    "map": SyntheticDataset,
+    "iterable": SyntheticIterableDataset,
+}
+
+
+class GetDataTimer(object):
+    """Accumulates the time the main process spends in
+    _MultiProcessingDataLoaderIter._get_data, waiting for batches from the
+    workers or the pin memory thread."""
+    def __init__(self):
+        self.total = 0.0
+        self._get_data = None
+
+    def __enter__(self):
+        cls = dataloader_module._MultiProcessingDataLoaderIter
+        self._get_data = cls._get_data
+        get_data = self._get_data
+
+        def timed_get_data(it):
+            start = time.perf_counter()
+            try:
+                return get_data(it)
+            finally:
+                self.total += time.perf_counter() - start
+
+        cls._get_data = timed_get_data
+        return self
+
+    def __exit__(self, *args):
+        dataloader_module._MultiProcessingDataLoaderIter._get_data = self._get_data
+
+
+def children_cpu_time():
+    # CPU time of the terminated child processes, which includes the
+    # workers once the iterator is exhausted and has joined them.
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    index = max(0, (q * len(sorted_values) + 99) // 100 - 1)
+    return sorted_values[index]
+
+
+def measure(dataset, num_workers, batch_size, pin_memory, collate_fn):
+    loader = DataLoader(dataset, batch_size=batch_size, num_workers=num_workers,
+                        pin_memory=pin_memory, collate_fn=collate_fn)
+    latencies = []
+    num_samples = 0
+    cpu_start = children_cpu_time()
+    with GetDataTimer() as get_data_timer:
+        start = time.perf_counter()
+        last = start
+        for batch in loader:
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+            num_samples += len(batch) if collate_fn is list_collate else len(batch[1])
+        end = time.perf_counter()
+    # The workers are joined once the iterator is exhausted, so that their
+    # CPU time is now accounted to the main process.
+    elapsed = end - start
+    cpu_end = children_cpu_time()
+    worker_util = None
+    if num_workers > 0 and cpu_start is not None:
+        worker_util = (cpu_end - cpu_start) / (elapsed * num_workers)
+    steady = sorted(latencies[1:])
+    return {
+        "samples/s": num_samples / elapsed,
+        "first ms": latencies[0] * 1000 if latencies else float("nan"),
+        "p50 ms": percentile(steady, 50) * 1000,
+        "p90 ms": percentile(steady, 90) * 1000,
+        "p99 ms": percentile(steady, 99) * 1000,
+        "worker cpu": worker_util,
+        "get_data": get_data_timer.total / elapsed if num_workers > 0 else None,
+    }
+
+
+def format_fraction(value):
+    return "-" if value is None else "{:.0%}".format(value)
+
+
+def parse_list(value, type=int):
+    return [type(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataLoader throughput benchmark")
+    parser.add_argument("--datasets", type=str, default="map,iterable",
+                        help="comma-separated dataset kinds, among map and iterable")
+    parser.add_argument("--num-samples", type=int, default=4096)
+    parser.add_argument("--sample-size", type=int, default=3 * 64 * 64,
+                        help="number of float elements per sample")
+    parser.add_argument("--cpu-ms", type=float, default=0.1,
+                        help="CPU time to load a sample, in milliseconds")
+    parser.add_argument("--io-ms", type=float, default=0.1,
+                        help="I/O latency to load a sample, in milliseconds")
+    parser.add_argument("--num-workers", type=str, default="0,1,2,4")
+    parser.add_argument("--batch-sizes", type=str, default="32,128")
+    parser.add_argument("--pin-memory", type=str, default="0,1",
+                        help="comma-separated pin_memory values, 0 or 1")
+    parser.add_argument("--collate", type=str, default="default,stack",
+                        help="comma-separated collate functions, among " + ", ".join(COLLATE_FNS))
+    opts = parser.parse_args()
+
+    pin_memory_values = [bool(v) for v in parse_list(opts.pin_memory)]
+    if any(pin_memory_values) and not torch.cuda.is_available():
+        print("* CUDA is not available, pin_memory=True is ignored by the DataLoader")
+        pin_memory_values = [False]
+
+    print("* Samples: {} of {} floats".format(opts.num_samples, opts.sample_size))
+    print("* Per sample: {} ms CPU, {} ms I/O".format(opts.cpu_ms, opts.io_ms))
+    print()
+    columns = ["samples/s", "first ms", "p50 ms", "p90 ms", "p99 ms", "worker cpu", "get_data"]
+    print("{:>9} {:>8} {:>6} {:>4} {:>8} ".format("dataset", "workers", "batch", "pin", "collate") +
+          " ".join("{:>10}".format(c) for c in columns))
+    configs = itertools.product(parse_list(opts.datasets, str), parse_list(opts.num_workers),
+                                parse_list(opts.batch_sizes), pin_memory_values,
+                                parse_list(opts.collate, str))
+    for dataset_kind, num_workers, batch_size, pin_memory, collate in configs:
+        dataset = DATASETS[dataset_kind](opts.num_samples, opts.sample_size, opts.cpu_ms, opts.io_ms)
+        result = measure(dataset, num_workers, batch_size, pin_memory, COLLATE_FNS[collate])
+        print("{:>9} {:>8} {:>6} {:>4} {:>8} ".format(
+            dataset_kind, num_workers, batch_size, int(pin_memory), collate) +
+            " ".join("{:>10.1f}".format(result[c]) for c in columns[:5]) + " " +
+            " ".join("{:>10}".format(format_fraction(result[c])) for c in columns[5:]))
+
+
+if __name__ == "__main__":
+    main()
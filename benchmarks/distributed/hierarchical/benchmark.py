@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# Compare the latency of a flat all-reduce over the default process group
+# with the two-level all-reduce of HierarchicalGroup.
+#
+# Run with a single command to simulate nodes on one machine:
+#
+#   python benchmark.py --nprocs 8 --local-size 4
+#
+# or once per process on a real cluster, e.g. with torch.distributed.launch,
+# in which case the nodes are detected by host name.
+#
+
+import argparse
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.distributed.algorithms.hierarchical import HierarchicalGroup
+
+
+def measure(fn, tensor, iterations, warmup):
+    for _ in range(warmup):
+        fn(tensor)
+    times = []
+    for _ in range(iterations):
+        dist.barrier()
+        start = time.time()
+        fn(tensor)
+        times.append(time.time() - start)
+    # The slowest process determines the latency of a collective.
+    times = torch.tensor(times, dtype=torch.float64)
+    dist.all_reduce(times, op=dist.ReduceOp.MAX)
+    return times.median().item()
+
+
+def run(opts):
+    hierarchical_group = HierarchicalGroup(local_size=opts.local_size)
+    rank = dist.get_rank()
+    if rank == 0:
+        print("* Backend: {}".format(dist.get_backend()))
+        print("* World size: {}".format(dist.get_world_size()))
+        print("* Nodes: {}".format(hierarchical_group.nodes))
+        print()
+        print("{:>12} {:>18} {:>18} {:>10}".format(
+            "size (MB)", "flat (ms)", "hierarchical (ms)", "speedup"))
+
+    def flat(tensor):
+        dist.all_reduce(tensor)
+
+    for size_mb in opts.sizes:
+        numel = int(size_mb * 1024 * 1024 / 4)
+        tensor = torch.ones(numel)
+        flat_time = measure(flat, tensor, opts.iterations, opts.warmup)
+        hierarchical_time = measure(hierarchical_group.all_reduce, tensor, opts.iterations, opts.warmup)
+        if rank == 0:
+            print("{:>12.2f} {:>18.3f} {:>18.3f} {:>10.2f}".format(
+                size_mb, flat_time * 1e3, hierarchical_time * 1e3, flat_time / hierarchical_time))
+
+
+def run_spawned(rank, opts):
+    dist.init_process_group(
+        opts.distributed_backend,
+        init_method="tcp://{}:{}".format(opts.master_addr, opts.master_port),
+        rank=rank,
+        world_size=opts.nprocs)
+    run(opts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hierarchical all-reduce benchmark")
+    parser.add_argument("--nprocs", type=int, default=None,
+                        help="Spawn this many local processes instead of using "
+                             "the environment of torch.distributed.launch")
+    parser.add_argument("--local-size", type=int, default=None,
+                        help="Processes per node (default: detect by host name)")
+    parser.add_argument("--distributed-backend", type=str, default="gloo")
+    parser.add_argument("--master-addr", type=str, default="127.0.0.1")
+    parser.add_argument("--master-port", type=str, default="29500")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.25, 1, 4, 16, 64],
+                        help="Tensor sizes in MB")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    opts = parser.parse_args()
+
+    if opts.nprocs is None:
+        dist.init_process_group(opts.distributed_backend, init_method="env://")
+        run(opts)
+    else:
+        mp.spawn(run_spawned, args=(opts,), nprocs=opts.nprocs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+#
+# Measure the training throughput of trainers sharing a model on a
+# parameter server, with DistributedOptimizer and ParameterServerOptimizer.
+#
+# All processes run on the local machine: one parameter server, which holds
+# the model and runs the forward and backward passes and optimizer steps,
+# and a number of trainers, which drive the training over RPC.
+#
+
+import argparse
+import os
+import time
+
+import torch
+import torch.distributed.autograd as dist_autograd
+import torch.distributed.rpc as rpc
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch import optim
+from torch.distributed.optim import DistributedOptimizer, ParameterServerOptimizer
+
+
+_model = None
+
+
+def _create_model(layers, width):
+    global _model
+    torch.manual_seed(0)
+    _model = nn.ModuleList([nn.Linear(width, width) for _ in range(layers)])
+    return [rpc.RRef(p) for p in _model.parameters()]
+
+
+def _forward(input):
+    # Other trainers update the weights in place while this trainer runs
+    # its backward pass, so the forward pass uses a snapshot of them.
+    output = input
+    for layer in _model:
+        output = torch.relu(nn.functional.linear(output, layer.weight.clone(), layer.bias.clone()))
+    return output
+
+
+def _create_optimizer(mode, params_rref, lr):
+    if mode == "distributed":
+        return DistributedOptimizer(optim.Adam, params_rref, lr=lr)
+    return ParameterServerOptimizer(
+        optim.Adam, params_rref, lr=lr, asynchronous=(mode == "ps-async"))
+
+
+def run_trainer(mode, params_rref, opts):
+    optimizer = _create_optimizer(mode, params_rref, opts.lr)
+    torch.manual_seed(rpc.get_worker_info().id)
+    input = torch.randn(opts.batch_size, opts.width)
+    for i in range(opts.warmup + opts.iterations):
+        if i == opts.warmup:
+            start = time.time()
+        with dist_autograd.context() as context_id:
+            loss = rpc.rpc_sync("ps", _forward, args=(input,)).pow(2).mean()
+            dist_autograd.backward(context_id, [loss])
+            optimizer.step(context_id)
+    return time.time() - start
+
+
+def run_benchmark(mode, opts):
+    params_rref = _create_model(opts.layers, opts.width)
+    futs = [
+        rpc.rpc_async("trainer{}".format(i), run_trainer, args=(mode, params_rref, opts))
+        for i in range(opts.trainers)
+    ]
+    elapsed = max(fut.wait() for fut in futs)
+    return opts.trainers * opts.iterations / elapsed
+
+
+def run(rank, opts):
+    name = "ps" if rank == 0 else "trainer{}".format(rank - 1)
+    rpc.init_rpc(name, rank=rank, world_size=opts.trainers + 1)
+    if rank == 0:
+        print("* Trainers: {}".format(opts.trainers))
+        print("* Model: {} x Linear({}, {}), Adam".format(opts.layers, opts.width, opts.width))
+        print()
+        print("{:>12} {:>14}".format("optimizer", "steps/s"))
+        for mode in opts.modes:
+            print("{:>12} {:>14.1f}".format(mode, run_benchmark(mode, opts)))
+    rpc.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter server optimizer benchmark")
+    parser.add_argument("--trainers", type=int, default=4)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--modes", type=str, nargs="+",
+                        default=["distributed", "ps", "ps-async"],
+                        choices=["distributed", "ps", "ps-async"])
+    parser.add_argument("--master-addr", type=str, default="127.0.0.1")
+    parser.add_argument("--master-port", type=str, default="29500")
+    opts = parser.parse_args()
+
+    os.environ["MASTER_ADDR"] = opts.master_addr
+    os.environ["MASTER_PORT"] = opts.master_port
+    mp.spawn(run, args=(opts,), nprocs=opts.trainers + 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+#
+# Measure the throughput of many small RPCs sent one by one with
+# rpc_async, and in batches with rpc_async_many, optionally vectorized on
+# the callee with a batch function.
+#
+# The caller sends embedding lookups of a few indices each to the callee,
+# which holds the embedding table.
+#
+
+import argparse
+import os
+import time
+
+import torch
+import torch.distributed.rpc as rpc
+import torch.multiprocessing as mp
+
+
+_embedding = None
+
+
+def _create_embedding(num_embeddings, embedding_dim):
+    global _embedding
+    _embedding = torch.nn.Embedding(num_embeddings, embedding_dim)
+
+
+def lookup(indices):
+    with torch.no_grad():
+        return _embedding(indices)
+
+
+def batch_lookup(args_list):
+    indices = [indices for indices, in args_list]
+    with torch.no_grad():
+        embeddings = _embedding(torch.cat(indices))
+    return list(embeddings.split([len(i) for i in indices]))
+
+
+def run_one_by_one(requests, opts):
+    futs = [rpc.rpc_async("callee", lookup, args=(indices,)) for indices in requests]
+    return [fut.wait() for fut in futs]
+
+
+def run_batched(requests, opts, batch_func=None):
+    futs = []
+    for start in range(0, len(requests), opts.batch_size):
+        args_list = [(indices,) for indices in requests[start:start + opts.batch_size]]
+        futs.extend(rpc.rpc_async_many("callee", lookup, args_list, batch_func=batch_func))
+    return [fut.wait() for fut in futs]
+
+
+def measure(fn, requests, opts, **kwargs):
+    fn(requests[:opts.batch_size], opts, **kwargs)
+    start = time.time()
+    fn(requests, opts, **kwargs)
+    return len(requests) / (time.time() - start)
+
+
+def run(rank, opts):
+    backend = rpc.backend_registry.BackendType[opts.backend]
+    rpc.init_rpc("caller" if rank == 0 else "callee", backend=backend, rank=rank, world_size=2)
+    if rank == 0:
+        rpc.rpc_sync("callee", _create_embedding, args=(opts.num_embeddings, opts.embedding_dim))
+        torch.manual_seed(0)
+        requests = [torch.randint(opts.num_embeddings, (opts.indices_per_call,))
+                    for _ in range(opts.calls)]
+        print("* Backend: {}".format(opts.backend))
+        print("* Calls: {} lookups of {} indices".format(opts.calls, opts.indices_per_call))
+        print("* Batch size: {}".format(opts.batch_size))
+        print()
+        print("{:>24} {:>14}".format("mode", "calls/s"))
+        print("{:>24} {:>14.1f}".format("rpc_async", measure(run_one_by_one, requests, opts)))
+        print("{:>24} {:>14.1f}".format("rpc_async_many", measure(run_batched, requests, opts)))
+        print("{:>24} {:>14.1f}".format(
+            "rpc_async_many + batch", measure(run_batched, requests, opts, batch_func=batch_lookup)))
+    rpc.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched RPC benchmark")
+    parser.add_argument("--backend", type=str, default="PROCESS_GROUP",
+                        choices=["PROCESS_GROUP", "TENSORPIPE"])
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--indices-per-call", type=int, default=4)
+    parser.add_argument("--num-embeddings", type=int, default=100000)
+    parser.add_argument("--embedding-dim", type=int, default=64)
+    parser.add_argument("--master-addr", type=str, default="127.0.0.1")
+    parser.add_argument("--master-port", type=str, default="29500")
+    opts = parser.parse_args()
+
+    os.environ["MASTER_ADDR"] = opts.master_addr
+    os.environ["MASTER_PORT"] = opts.master_port
+    mp.spawn(run, args=(opts,), nprocs=2)
+
+
+if __name__ == "__main__":
+    main()
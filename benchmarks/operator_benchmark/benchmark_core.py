@@ -14,8 +14,9 @@ import ast
 # needs to be imported after torch
 import torch.utils.cpp_extension as cpp_extension # noqa
 
+import benchmark_regression
 import benchmark_utils
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 
 """Performance microbenchmarks.
 
@@ -172,6 +173,10 @@ class BenchmarkRunner(object):
         self.num_runs = args.num_runs
         self.print_per_iter = False
         self.operator_range = benchmark_utils.get_operator_range(args.operator_range)
+        # Results of the run tests by test id, saved to args.output_json and
+        # compared against args.baseline_json
+        self.results = OrderedDict()
+        self.regressions = []
         # 100 is the default warmup iterations
         if self.args.warmup_iterations == -1:
             self.args.warmup_iterations = 100
@@ -268,6 +273,65 @@ class BenchmarkRunner(object):
                                       number=1)
         return backward_time
 
+    def _warmup(self, launch_test, test_case):
+        """ Run <warmup_iterations> iterations of the operator, repeatedly until
+        at least <min_warmup_time> seconds are spent, so that caches, allocators
+        and the CPU frequency reach a steady state before measuring.
+        """
+        warmup_time = 0
+        while True:
+            warmup_time += launch_test(test_case, self.args.warmup_iterations, print_per_iter=False)
+            if warmup_time >= self.args.min_warmup_time or self.args.warmup_iterations <= 0:
+                break
+
+    def _test_id(self, test_case):
+        parts = [test_case.framework, test_case.test_config.test_name]
+        if test_case.framework == "PyTorch":
+            parts.append("JIT" if self.use_jit else "Eager")
+        return '_'.join(parts)
+
+    def _record_result(self, reported_run_time_us, test_case):
+        result = {
+            "framework": test_case.framework,
+            "test_name": test_case.test_config.test_name,
+            "input_config": test_case.test_config.input_config,
+            "run_backward": test_case.test_config.run_backward,
+            "samples_us": [float(t) for t in reported_run_time_us],
+        }
+        result.update(benchmark_regression.summarize(result["samples_us"]))
+        self.results[self._test_id(test_case)] = result
+
+    def _report_results(self):
+        """ Save the results to <output_json> and compare them against
+        <baseline_json>. The regressed tests are kept in self.regressions.
+        """
+        if not self.args.output_json and not self.args.baseline_json:
+            return
+        if self.num_runs < 2:
+            print("# Warning: confidence intervals and significance tests need "
+                  "--num_runs of at least 2")
+        if self.args.output_json:
+            config = {
+                "num_runs": self.num_runs,
+                "iterations": self.args.iterations,
+                "warmup_iterations": self.args.warmup_iterations,
+                "min_warmup_time": self.args.min_warmup_time,
+                "omp_num_threads": self.args.omp_num_threads,
+                "mkl_num_threads": self.args.mkl_num_threads,
+                "cpu_affinity": self.args.cpu_affinity,
+                "torch_version": torch.__version__,
+            }
+            benchmark_regression.save_results(self.args.output_json, config, self.results)
+            print("# Results saved to {}".format(self.args.output_json))
+        if self.args.baseline_json:
+            baseline = benchmark_regression.load_results(self.args.baseline_json)
+            comparison = benchmark_regression.compare(
+                baseline, self.results, self.args.regression_threshold)
+            benchmark_regression.print_comparison(
+                comparison, self.args.baseline_json, self.args.regression_threshold)
+            self.regressions = [test_id for test_id, status, _ in comparison
+                                if status == "regression"]
+
     def _measure_time(self, launch_test, test_case, iters, print_per_iter):
         """
         This function execute the operator for <iters> iterations then look at the time.
@@ -390,11 +454,14 @@ class BenchmarkRunner(object):
                 else:
                     launch_func = self._launch_forward
 
-                # Warmup
-                launch_func(test_case, self.args.warmup_iterations, print_per_iter=False)
+                self._warmup(launch_func, test_case)
                 # Actual Execution
                 reported_time = [self._measure_time(launch_func, test_case,
                                                     self.iters, self.print_per_iter)
                                  for _ in range(self.num_runs)]
 
                 self._print_perf_result(reported_time, test_case)
+                self._record_result(reported_time, test_case)
+
+        if not self.args.list_tests and not self.args.list_ops:
+            self._report_results()
@@ -0,0 +1,143 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import bisect
+import json
+import math
+
+"""Regression tracking for the operator microbenchmarks.
+
+The execution times of the runs of each test are saved as JSON together
+with their mean and 95% confidence interval, and can be compared against
+the results of a previous run (the baseline). A test regresses when its mean
+execution time is significantly higher than in the baseline, according to
+Welch's t-test, and by more than a relative threshold.
+"""
+
+RESULTS_FORMAT_VERSION = 1
+
+# Two-sided 95% critical values of Student's t distribution, by degrees of
+# freedom. Degrees of freedom between two entries use the lower entry, which
+# gives a slightly wider interval.
+_T_CRITICAL_95 = [
+    (1, 12.706), (2, 4.303), (3, 3.182), (4, 2.776), (5, 2.571),
+    (6, 2.447), (7, 2.365), (8, 2.306), (9, 2.262), (10, 2.228),
+    (12, 2.179), (15, 2.131), (20, 2.086), (25, 2.060), (30, 2.042),
+    (40, 2.021), (60, 2.000), (120, 1.980),
+]
+_T_CRITICAL_95_DOF = [dof for dof, _ in _T_CRITICAL_95]
+
+
+def t_critical_95(dof):
+    """ Returns the two-sided 95% critical value of Student's t distribution
+        with dof degrees of freedom, which can be fractional.
+    """
+    index = bisect.bisect_right(_T_CRITICAL_95_DOF, dof) - 1
+    return _T_CRITICAL_95[max(index, 0)][1]
+
+
+def summarize(samples_us):
+    """ Computes the statistics of the execution times of the runs of a test.
+        The standard deviation and confidence interval need at least two runs,
+        and are None otherwise.
+    """
+    n = len(samples_us)
+    mean = sum(samples_us) / n
+    ordered = sorted(samples_us)
+    median = (ordered[(n - 1) // 2] + ordered[n // 2]) / 2
+    stdev = None
+    ci95 = None
+    if n > 1:
+        stdev = math.sqrt(sum((x - mean) ** 2 for x in samples_us) / (n - 1))
+        half_width = t_critical_95(n - 1) * stdev / math.sqrt(n)
+        ci95 = [mean - half_width, mean + half_width]
+    return {
+        "num_samples": n,
+        "mean_us": mean,
+        "median_us": median,
+        "stdev_us": stdev,
+        "ci95_us": ci95,
+    }
+
+
+def is_significant(baseline, result):
+    """ Welch's t-test at the 5% level of whether the mean execution times of
+        two summaries differ. Returns None when either summary has fewer than
+        two runs.
+    """
+    if baseline["stdev_us"] is None or result["stdev_us"] is None:
+        return None
+    var_base = baseline["stdev_us"] ** 2 / baseline["num_samples"]
+    var_result = result["stdev_us"] ** 2 / result["num_samples"]
+    diff = result["mean_us"] - baseline["mean_us"]
+    if var_base + var_result == 0:
+        return diff != 0
+    t = diff / math.sqrt(var_base + var_result)
+    dof = (var_base + var_result) ** 2 / (
+        var_base ** 2 / (baseline["num_samples"] - 1) +
+        var_result ** 2 / (result["num_samples"] - 1))
+    return abs(t) > t_critical_95(dof)
+
+
+def compare(baseline_results, results, threshold):
+    """ Compares the results of a run against a baseline. Returns a list of
+        (test_id, status, relative change of the mean) for the tests in both,
+        with status one of "regression", "improvement", "unchanged" or
+        "insufficient runs", followed by the tests missing from the baseline
+        with status "new". A change is only reported as a regression or an
+        improvement when it is significant and larger than threshold.
+    """
+    comparison = []
+    new = []
+    for test_id, result in results.items():
+        baseline = baseline_results.get(test_id)
+        if baseline is None:
+            new.append((test_id, "new", None))
+            continue
+        change = (result["mean_us"] - baseline["mean_us"]) / baseline["mean_us"]
+        significant = is_significant(baseline, result)
+        if significant is None:
+            status = "insufficient runs"
+        elif significant and change > threshold:
+            status = "regression"
+        elif significant and change < -threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        comparison.append((test_id, status, change))
+    return comparison + new
+
+
+def save_results(path, config, results):
+    with open(path, "w") as f:
+        json.dump({
+            "version": RESULTS_FORMAT_VERSION,
+            "config": config,
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("version") != RESULTS_FORMAT_VERSION:
+        raise ValueError("{} is not a results file of the operator benchmarks "
+                         "(version {})".format(path, RESULTS_FORMAT_VERSION))
+    return data["results"]
+
+
+def print_comparison(comparison, baseline_path, threshold):
+    print("# {}\n"
+          "# Comparison against baseline {}\n"
+          "# Regression threshold: {:.1%}\n"
+          "# {}".format('-' * 40, baseline_path, threshold, '-' * 40))
+    for test_id, status, change in comparison:
+        change_str = "" if change is None else "{:+.2%}".format(change)
+        print("{:<18} {:>9}  {}".format(status, change_str, test_id))
+    counts = {}
+    for _, status, _ in comparison:
+        counts[status] = counts.get(status, 0) + 1
+    print("\n# " + ", ".join("{}: {}".format(status, count)
+                             for status, count in sorted(counts.items())))
@@ -4,6 +4,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import argparse
+import sys
 
 import torch
 
@@ -81,6 +82,13 @@ def main():
         type=int
     )
 
+    parser.add_argument(
+        "--min_warmup_time",
+        help="Repeat the warmup iterations until at least this time (unit: seconds) is spent",
+        default=0,
+        type=float
+    )
+
     parser.add_argument(
         "--omp_num_threads",
         help="Number of OpenMP threads used in PyTorch/Caffe2 runtime",
@@ -95,6 +103,30 @@ def main():
         type=int
     )
 
+    parser.add_argument(
+        "--cpu_affinity",
+        help="Pin the benchmark to a comma-delimited list of CPUs and CPU ranges (e.g. 0-3,6)",
+        default=None)
+
+    parser.add_argument(
+        "--output_json",
+        help="Save the execution time of every run of each test and their statistics to this JSON file",
+        default=None)
+
+    parser.add_argument(
+        "--baseline_json",
+        help="Compare the results against a JSON file saved with --output_json, "
+             "and exit with an error if a test regressed",
+        default=None)
+
+    parser.add_argument(
+        "--regression_threshold",
+        help="Minimum relative increase of the mean execution time of a test, "
+             "on top of being statistically significant, to report it as a regression",
+        default=0.05,
+        type=float
+    )
+
     parser.add_argument(
         "--ai_pep_format",
         type=benchmark_utils.str2bool,
@@ -134,6 +166,11 @@ def main():
 
     args, _ = parser.parse_known_args()
 
+    if args.cpu_affinity:
+        # Pinned before any operator runs, so that the intra-op threads,
+        # which are created on first use, inherit the affinity.
+        benchmark_utils.set_cpu_affinity(benchmark_utils.parse_cpu_list(args.cpu_affinity))
+
     if args.omp_num_threads:
         # benchmark_utils.set_omp_threads sets the env variable OMP_NUM_THREADS
         # which doesn't have any impact as C2 init logic has already been called
@@ -150,7 +187,12 @@ def main():
     if args.mkl_num_threads:
         benchmark_utils.set_mkl_threads(args.mkl_num_threads)
 
-    benchmark_core.BenchmarkRunner(args).run()
+    runner = benchmark_core.BenchmarkRunner(args)
+    runner.run()
+    if runner.regressions:
+        print("# {} test(s) regressed: {}".format(
+            len(runner.regressions), ', '.join(runner.regressions)))
+        sys.exit(1)
 
 
 if __name__ == "__main__":
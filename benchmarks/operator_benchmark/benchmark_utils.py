@@ -61,6 +61,30 @@ def set_mkl_threads(num_threads):
     os.environ["MKL_NUM_THREADS"] = str(num_threads)
 
 
+def parse_cpu_list(cpu_list):
+    """ Parses a comma-delimited list of CPUs and CPU ranges, e.g. 0-3,6."""
+    cpus = set()
+    for item in cpu_list.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '-' in item:
+            start, end = item.split('-')
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(item))
+    if not cpus:
+        raise ValueError("Invalid CPU list: {}".format(cpu_list))
+    return cpus
+
+
+def set_cpu_affinity(cpus):
+    if not hasattr(os, 'sched_setaffinity'):
+        raise RuntimeError("Setting the CPU affinity is not supported on this platform")
+    os.sched_setaffinity(0, cpus)
+    print("# Pinned to CPUs: {}".format(', '.join(str(c) for c in sorted(cpus))))
+
+
 def cross_product(*inputs):
     """
     Return a list of cartesian product of input iterables.
@@ -7,10 +7,12 @@ for with_cuda in [False, True]:
     model = models.resnet18()
     inputs = torch.randn(5, 3, 224, 224)
     sort_key = "self_cpu_memory_usage"
+    device = "cpu"
     if with_cuda and torch.cuda.is_available():
         model = model.cuda()
         inputs = inputs.cuda()
         sort_key = "self_cuda_memory_usage"
+        device = "cuda"
         print("Profiling CUDA Resnet model")
     else:
         print("Profiling CPU Resnet model")
@@ -20,3 +22,20 @@ for with_cuda in [False, True]:
             model(inputs)
 
     print(prof.key_averages(group_by_input_shape=True).table(sort_by=sort_key, row_limit=-1))
+
+    timeline = prof.memory_timeline()
+    print(timeline.table(device=device, row_limit=20))
+
+    # The peak is the highest point of the timeline, and is held by the
+    # allocations live at the peak, less the blocks allocated before the
+    # profile started that were freed before the peak. It is at least the
+    # memory still held at the end of the root range.
+    live = timeline.live_at_peak(device)
+    peak = timeline.peak_usage(device)
+    assert peak == max(usage for _, usage in timeline.usage(device))
+    assert peak <= sum(record.nbytes for record in live)
+    root = next(evt for evt in prof.function_events if evt.name == "root")
+    root_usage = root.cpu_memory_usage if device == "cpu" else root.cuda_memory_usage
+    assert peak >= root_usage, (peak, root_usage)
+    print("Peak {} memory usage: {}, held by {} allocations\n".format(
+        device.upper(), profiler.format_memory(peak), len(live)))
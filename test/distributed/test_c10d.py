@@ -25,6 +25,12 @@ import torch.nn.functional as F
 import torch.distributed as c10d
 import torch.distributed as dist
 from torch.nn.parallel import DistributedDataParallel
+from torch.distributed.algorithms.ddp_comm_hooks import allreduce_hook, \
+    fp16_compress_hook, TopKState, topk_hook, PowerSGDState, powerSGD_hook
+from torch.distributed.algorithms.ddp_comm_hooks import hierarchical_allreduce_hook
+from torch.distributed.algorithms.hierarchical import HierarchicalGroup
+from torch.distributed.optim import ZeroRedundancyOptimizer
+from torch.nn.parallel.distributed import GradBucket
 
 from torch.testing._internal.common_distributed import MultiProcessTestCase, \
     requires_gloo, requires_nccl, requires_nccl_version, \
@@ -2762,6 +2768,170 @@ class DistributedDataParallelTest(MultiProcessTestCase):
         ddp_parameter = next(ddp_model.parameters())
         self.assertEqual(vanilla_parameter.grad, ddp_parameter.grad)
 
+    def _create_gloo_process_group(self):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        options = c10d.ProcessGroupGloo.Options()
+        options.devices = [c10d.ProcessGroupGloo.create_device(interface=LOOPBACK)]
+        return c10d.ProcessGroupGloo(store, self.rank, self.world_size, options)
+
+    def _test_ddp_comm_hook(self, state, hook, atol, model=None, in_features=2, out_features=4):
+        process_group = self._create_gloo_process_group()
+        torch.manual_seed(1337)
+        if model is None:
+            model = Net()
+        ddp_model = DistributedDataParallel(
+            copy.deepcopy(model), process_group=process_group, bucket_cap_mb=0.001)
+        hook_model = DistributedDataParallel(
+            copy.deepcopy(model), process_group=process_group, bucket_cap_mb=0.001)
+        state = state(process_group)
+        hook_model.register_comm_hook(state, hook)
+
+        input = torch.randn(4 * self.world_size, in_features)
+        target = torch.randn(4 * self.world_size, out_features)
+        local_input = input.split(4)[self.rank]
+        local_target = target.split(4)[self.rank]
+        for _ in range(2):
+            for m in (ddp_model, hook_model):
+                m.zero_grad()
+                F.mse_loss(m(local_input), local_target).backward()
+            for p, hook_p in zip(ddp_model.parameters(), hook_model.parameters()):
+                self.assertEqual(p.grad, hook_p.grad, atol=atol, rtol=0)
+        return state
+
+    @requires_gloo()
+    def test_ddp_comm_hook_allreduce(self):
+        self._test_ddp_comm_hook(lambda pg: pg, allreduce_hook, 1e-6)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_fp16_compress(self):
+        self._test_ddp_comm_hook(lambda pg: pg, fp16_compress_hook, 1e-3)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_topk_full_ratio(self):
+        self._test_ddp_comm_hook(lambda pg: TopKState(pg, ratio=1.0), topk_hook, 1e-6)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_powerSGD_full_rank(self):
+        # The gradient of a weight is a sum of one outer product per sample,
+        # so its rank is at most the global batch size. Approximating it with
+        # that rank is exact, and the factors of these 32 x 16 weights are
+        # still smaller than the weights, so they are compressed.
+        global_batch_size = 4 * self.world_size
+        model = nn.Sequential(
+            nn.Linear(16, 32, bias=False), nn.ReLU(), nn.Linear(32, 16, bias=False))
+        self.assertLess((32 + 16) * global_batch_size, 32 * 16)
+        state = self._test_ddp_comm_hook(
+            lambda pg: PowerSGDState(pg, matrix_approximation_rank=global_batch_size),
+            powerSGD_hook, 1e-4, model=model, in_features=16, out_features=16)
+        self.assertGreater(sum(q.numel() for q in state.q_memory_dict.values()), 0)
+
+    def _test_ddp_comm_hook_error_feedback(self, state, hook):
+        # The average of the compressed gradients and the average of the
+        # errors that are fed back add up to the average of the gradients.
+        process_group = self._create_gloo_process_group()
+        torch.manual_seed(1337)
+        model = Net()
+        ddp_model = DistributedDataParallel(
+            copy.deepcopy(model), process_group=process_group, bucket_cap_mb=0.001)
+        hook_model = DistributedDataParallel(
+            copy.deepcopy(model), process_group=process_group, bucket_cap_mb=0.001)
+        state = state(process_group)
+        hook_model.register_comm_hook(state, hook)
+
+        torch.manual_seed(self.rank)
+        input = torch.randn(4, 2)
+        target = torch.randn(4, 4)
+        for m in (ddp_model, hook_model):
+            F.mse_loss(m(input), target).backward()
+
+        buckets = hook_model.reducer.buckets
+        self.assertEqual(len(state.error_dict), len(buckets))
+        for bucket in buckets:
+            error = state.error_dict[bucket.get_index()].clone()
+            process_group.allreduce([error]).wait()
+            error.div_(self.world_size)
+            for p, hook_p, p_error in zip(
+                    [list(ddp_model.parameters())[i] for i in hook_model._bucket_indices[bucket.get_index()]],
+                    [list(hook_model.parameters())[i] for i in hook_model._bucket_indices[bucket.get_index()]],
+                    bucket._unflatten(error)):
+                self.assertNotEqual(hook_p.grad, p.grad)
+                self.assertEqual(hook_p.grad + p_error, p.grad)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_topk_error_feedback(self):
+        self._test_ddp_comm_hook_error_feedback(lambda pg: TopKState(pg, ratio=0.1), topk_hook)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_powerSGD_error_feedback(self):
+        self._test_ddp_comm_hook_error_feedback(lambda pg: PowerSGDState(pg), powerSGD_hook)
+
+    class _BufferModule(nn.Module):
+        def __init__(self):
+            super(DistributedDataParallelTest._BufferModule, self).__init__()
+            self.register_buffer('table', torch.arange(4.))
+            self.fc = nn.Linear(2, 4, bias=False)
+            self.bn = nn.BatchNorm1d(4)
+
+        def forward(self, x):
+            return self.bn(self.fc(x)) + self.table
+
+    def _assert_buffers_synced(self, process_group, module):
+        buffers = torch.cat([b.double().view(-1) for b in module.buffers()])
+        reduced = buffers.clone()
+        process_group.allreduce([reduced]).wait()
+        self.assertEqual(reduced, buffers * self.world_size)
+
+    def _test_ddp_buffer_sync(self, **kwargs):
+        process_group = self._create_gloo_process_group()
+        torch.manual_seed(1337)
+        model = DistributedDataParallel(
+            self._BufferModule(), process_group=process_group, **kwargs)
+        torch.manual_seed(self.rank)
+        for _ in range(3):
+            model(torch.randn(4, 2))
+            # The buffers are synced at the beginning of the forward pass.
+            with torch.no_grad():
+                model.module.table.add_(self.rank)
+            model.eval()
+            model(torch.randn(4, 2))
+            self._assert_buffers_synced(process_group, model.module)
+            model.train()
+        return model
+
+    @requires_gloo()
+    def test_ddp_skip_unchanged_buffers(self):
+        model = self._test_ddp_buffer_sync(skip_unchanged_buffers=True)
+        # Only the running stats of the batch norm changed.
+        model(torch.randn(4, 2))
+        self.assertEqual(model._buffers_to_sync(), [1, 2, 3])
+
+    @requires_gloo()
+    def test_ddp_overlap_buffer_sync(self):
+        model = self._test_ddp_buffer_sync(skip_unchanged_buffers=True, overlap_buffer_sync=True)
+        self.assertEqual(model._pending_buffer_broadcasts, [])
+        self.assertEqual(len(model.module.bn._forward_pre_hooks), 0)
+
+    @requires_gloo()
+    def test_ddp_buffer_sync_period(self):
+        process_group = self._create_gloo_process_group()
+        model = DistributedDataParallel(
+            self._BufferModule(), process_group=process_group, buffer_sync_period=2)
+        indices = [model._buffers_to_sync() for _ in range(4)]
+        self.assertEqual(indices, [[0, 1, 2, 3], [], [0, 1, 2, 3], []])
+        with self.assertRaisesRegex(ValueError, "buffer_sync_period"):
+            DistributedDataParallel(
+                self._BufferModule(), process_group=process_group, buffer_sync_period=0)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_register_errors(self):
+        process_group = self._create_gloo_process_group()
+        model = DistributedDataParallel(Net(), process_group=process_group)
+        with self.assertRaisesRegex(TypeError, "must be callable"):
+            model.register_comm_hook(None, 1)
+        model.register_comm_hook(process_group, allreduce_hook)
+        with self.assertRaisesRegex(RuntimeError, "only be called once"):
+            model.register_comm_hook(process_group, allreduce_hook)
+
 
 class ReducerModule(nn.Module):
     def __init__(self):
@@ -3184,6 +3354,181 @@ class CommTest(MultiProcessTestCase):
         self._test_broadcast_coalesced(process_group, device)
 
 
+@unittest.skipIf(TEST_WITH_TSAN, "TSAN is not fork-safe since we're forking in a multi-threaded environment")
+class HierarchicalGroupTest(MultiProcessTestCase):
+    def setUp(self):
+        super(HierarchicalGroupTest, self).setUp()
+        self._fork_processes()
+
+    def tearDown(self):
+        super(HierarchicalGroupTest, self).tearDown()
+        try:
+            os.remove(self.file_name)
+        except OSError:
+            pass
+
+    @property
+    def world_size(self):
+        return 4
+
+    def _create_hierarchical_group(self):
+        # Two nodes of two processes, so that the tensors are sharded inside
+        # the nodes and the shards reduced across nodes.
+        store = c10d.FileStore(self.file_name, self.world_size)
+        c10d.init_process_group("gloo", store=store, rank=self.rank, world_size=self.world_size)
+        hierarchical_group = HierarchicalGroup(local_size=2)
+        self.assertEqual(hierarchical_group.nodes, [[0, 1], [2, 3]])
+        self.assertIsNotNone(hierarchical_group.cross_group)
+        self.assertIsNone(hierarchical_group.leader_group)
+        return hierarchical_group
+
+    @requires_gloo()
+    def test_sharded_all_reduce(self):
+        hierarchical_group = self._create_hierarchical_group()
+        expected = self.world_size * (self.world_size + 1) // 2
+        # Sizes divisible and not divisible by the processes per node, and
+        # a non-contiguous tensor.
+        for tensor in [torch.arange(12.), torch.arange(7.), torch.arange(1.), torch.arange(12.).view(4, 3).t()]:
+            reference = tensor.clone()
+            tensor.mul_(self.rank + 1)
+            hierarchical_group.all_reduce(tensor)
+            self.assertEqual(tensor, reference * expected)
+
+        tensor = torch.arange(6.) * self.rank
+        work = hierarchical_group.all_reduce(tensor, op=dist.ReduceOp.MAX, async_op=True)
+        self.assertFalse(work.is_completed())
+        work.wait()
+        self.assertTrue(work.is_completed())
+        self.assertEqual(tensor, torch.arange(6.) * (self.world_size - 1))
+
+    @requires_gloo()
+    def test_two_level_all_gather(self):
+        hierarchical_group = self._create_hierarchical_group()
+        tensors = [torch.full((2, 3), -1.) for _ in range(self.world_size)]
+        hierarchical_group.all_gather(tensors, torch.arange(6.).view(2, 3) + self.rank)
+        for i, tensor in enumerate(tensors):
+            self.assertEqual(tensor, torch.arange(6.).view(2, 3) + i)
+
+    @requires_gloo()
+    def test_hierarchical_allreduce_hook(self):
+        hierarchical_group = self._create_hierarchical_group()
+        params = [torch.zeros(2, 3), torch.zeros(5)]
+        bucket = GradBucket(0, torch.arange(11.) * self.rank, params)
+        result = hierarchical_allreduce_hook(hierarchical_group, bucket).wait()
+        self.assertEqual(result[0], torch.arange(11.) * (self.world_size - 1) / 2)
+
+
+@unittest.skipIf(TEST_WITH_TSAN, "TSAN is not fork-safe since we're forking in a multi-threaded environment")
+class ZeroRedundancyOptimizerTest(MultiProcessTestCase):
+    def setUp(self):
+        super(ZeroRedundancyOptimizerTest, self).setUp()
+        self._fork_processes()
+
+    def tearDown(self):
+        super(ZeroRedundancyOptimizerTest, self).tearDown()
+        try:
+            os.remove(self.file_name)
+        except OSError:
+            pass
+
+    @property
+    def world_size(self):
+        return 2
+
+    def _create_process_group(self):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        options = c10d.ProcessGroupGloo.Options()
+        options.devices = [c10d.ProcessGroupGloo.create_device(interface=LOOPBACK)]
+        return c10d.ProcessGroupGloo(store, self.rank, self.world_size, options)
+
+    def _train(self, models_and_optimizers, steps=3):
+        torch.manual_seed(1337)
+        input = torch.randn(4, 2)
+        target = torch.randn(4, 4)
+        for _ in range(steps):
+            for model, optimizer in models_and_optimizers:
+                optimizer.zero_grad()
+                F.mse_loss(model(input), target).backward()
+                optimizer.step()
+
+    @requires_gloo()
+    def test_step(self):
+        process_group = self._create_process_group()
+        torch.manual_seed(1337)
+        model = Net()
+        reference = copy.deepcopy(model)
+        optimizer = ZeroRedundancyOptimizer(
+            model.parameters(), torch.optim.Adam, process_group=process_group, lr=0.1, bucket_cap_mb=0.0001)
+        reference_optimizer = torch.optim.Adam(reference.parameters(), lr=0.1)
+        schedulers = [torch.optim.lr_scheduler.StepLR(o, step_size=1, gamma=0.5)
+                      for o in (optimizer, reference_optimizer)]
+        for _ in range(2):
+            self._train([(model, optimizer), (reference, reference_optimizer)])
+            for scheduler in schedulers:
+                scheduler.step()
+        for p, reference_p in zip(model.parameters(), reference.parameters()):
+            self.assertEqual(p, reference_p)
+
+        # Every rank only holds the state of its partition.
+        num_local_states = torch.tensor([len(optimizer.optim.state)])
+        process_group.allreduce([num_local_states]).wait()
+        self.assertEqual(num_local_states.item(), len(reference_optimizer.state))
+        self.assertLess(len(optimizer.optim.state), len(reference_optimizer.state))
+
+    @requires_gloo()
+    def test_consolidate_state_dict(self):
+        process_group = self._create_process_group()
+        torch.manual_seed(1337)
+        model = Net()
+        reference = copy.deepcopy(model)
+        optimizer = ZeroRedundancyOptimizer(
+            model.parameters(), torch.optim.Adam, process_group=process_group, lr=0.1)
+        reference_optimizer = torch.optim.Adam(reference.parameters(), lr=0.1)
+        self._train([(model, optimizer), (reference, reference_optimizer)])
+
+        optimizer.consolidate_state_dict(to=0)
+        if self.rank == 0:
+            state_dict = optimizer.state_dict()
+            reference_state_dict = reference_optimizer.state_dict()
+            self.assertEqual(state_dict['param_groups'], reference_state_dict['param_groups'])
+            self.assertEqual(state_dict['state'], reference_state_dict['state'])
+        else:
+            with self.assertRaisesRegex(RuntimeError, "consolidate_state_dict"):
+                optimizer.state_dict()
+
+    @requires_gloo()
+    def test_load_state_dict(self):
+        process_group = self._create_process_group()
+        torch.manual_seed(1337)
+        model = Net()
+        reference = copy.deepcopy(model)
+        reference_optimizer = torch.optim.Adam(reference.parameters(), lr=0.1)
+        self._train([(reference, reference_optimizer)])
+
+        model.load_state_dict(reference.state_dict())
+        optimizer = ZeroRedundancyOptimizer(
+            model.parameters(), torch.optim.Adam, process_group=process_group, lr=0.5)
+        optimizer.load_state_dict(copy.deepcopy(reference_optimizer.state_dict()))
+        self.assertEqual(optimizer.param_groups[0]['lr'], 0.1)
+        self._train([(model, optimizer), (reference, reference_optimizer)])
+        for p, reference_p in zip(model.parameters(), reference.parameters()):
+            self.assertEqual(p, reference_p)
+
+    @requires_gloo()
+    def test_add_param_group(self):
+        process_group = self._create_process_group()
+        model = Net()
+        optimizer = ZeroRedundancyOptimizer(
+            [model.fc1.weight, model.fc2.weight], torch.optim.SGD, process_group=process_group, lr=0.1)
+        optimizer.add_param_group({'params': [model.fc3.weight], 'lr': 0.01})
+        self.assertEqual(len(optimizer.param_groups), 2)
+        self.assertEqual(len(optimizer.optim.param_groups), 2)
+        self.assertEqual(optimizer.optim.param_groups[1]['lr'], 0.01)
+        num_local_params = torch.tensor([sum(len(group['params']) for group in optimizer.optim.param_groups)])
+        process_group.allreduce([num_local_params]).wait()
+        self.assertEqual(num_local_params.item(), 3)
+
+
 if __name__ == '__main__':
     assert not torch.cuda._initialized, "test_distributed must not have initialized CUDA context on main process"
 
@@ -10,6 +10,7 @@ import unittest
 from contextlib import contextmanager
 from datetime import timedelta
 from functools import reduce, wraps
+from unittest import mock
 
 import torch
 import torch.cuda
@@ -18,6 +19,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 from torch.testing._internal.common_utils import TestCase, run_tests, find_free_port
 from torch.distributed.distributed_c10d import _get_default_group
+from torch.distributed.algorithms.ddp_comm_hooks import hierarchical_allreduce_hook
+from torch.distributed.algorithms.hierarchical import HierarchicalGroup
+from torch.nn.parallel.distributed import GradBucket
 from torch._utils_internal import TEST_MASTER_ADDR as MASTER_ADDR
 from torch._utils_internal import TEST_MASTER_PORT as MASTER_PORT
 from torch.testing._internal.common_distributed import (
@@ -1461,6 +1465,164 @@ class _DistTestBase(object):
             output_tensors_lists, input_tensors, expected_tensors, group_id)
         self._barrier()
 
+    # OBJECT COLLECTIVES
+    def _build_object(self, rank):
+        return {
+            "rank": rank,
+            "name": "x" * (rank + 1),
+            "tensor": _build_tensor(rank + 1, rank),
+            "param": nn.Parameter(torch.ones(rank + 1)),
+            "mask": torch.ones(rank + 1, dtype=torch.bool),
+            "indices": torch.arange(rank + 2),
+        }
+
+    def _assert_object_equal(self, obj, rank):
+        expected = self._build_object(rank)
+        self.assertEqual(obj["rank"], expected["rank"])
+        self.assertEqual(obj["name"], expected["name"])
+        self.assertEqual(obj["tensor"], expected["tensor"])
+        self.assertEqual(obj["param"], expected["param"])
+        self.assertIsInstance(obj["param"], nn.Parameter)
+        self.assertEqual(obj["mask"], expected["mask"])
+        self.assertEqual(obj["indices"], expected["indices"])
+
+    def _test_all_gather_object_helper(self, group, group_id, rank):
+        if group_id is not None:
+            # Gather twice, so that the second call reuses the receive buffer.
+            for _ in range(2):
+                obj = self._build_object(rank)
+                object_list = [None] * len(group)
+                with mock.patch.object(dist.distributed_c10d, "all_gather",
+                                       wraps=dist.distributed_c10d.all_gather) as all_gather, \
+                        mock.patch.object(dist.distributed_c10d, "broadcast",
+                                          wraps=dist.distributed_c10d.broadcast) as broadcast:
+                    dist.all_gather_object(object_list, obj, group_id)
+                # Sizes, payloads, and one all-gather per dtype of the
+                # out-of-band tensors (float and long).
+                self.assertEqual(all_gather.call_count, 4)
+                self.assertEqual(broadcast.call_count, 0)
+                for i, gathered in zip(group, object_list):
+                    self._assert_object_equal(gathered, i)
+                self.assertIs(object_list[group.index(rank)]["tensor"], obj["tensor"])
+
+            with self.assertRaisesRegex(ValueError, "size of the group"):
+                dist.all_gather_object([None], obj, group_id)
+
+        self._barrier()
+
+    @unittest.skipIf(BACKEND == "nccl", "Nccl does not support CPU tensors")
+    def test_all_gather_object(self):
+        group, group_id, rank = self._init_global_test()
+        self._test_all_gather_object_helper(group, group_id, rank)
+
+    @skip_if_small_worldsize
+    @unittest.skipIf(BACKEND == "nccl", "Nccl does not support CPU tensors")
+    def test_all_gather_object_group(self):
+        group, group_id, rank = self._init_group_test()
+        self._test_all_gather_object_helper(group, group_id, rank)
+
+    def _test_broadcast_object_list_helper(self, group, group_id, rank):
+        if group_id is not None:
+            for src in group:
+                if rank == src:
+                    object_list = [self._build_object(src), "foo", 12]
+                else:
+                    object_list = [None, None, None]
+                dist.broadcast_object_list(object_list, src, group_id)
+                self._assert_object_equal(object_list[0], src)
+                self.assertEqual(object_list[1:], ["foo", 12])
+
+        self._barrier()
+
+    @unittest.skipIf(BACKEND == "nccl", "Nccl does not support CPU tensors")
+    def test_broadcast_object_list(self):
+        group, group_id, rank = self._init_global_test()
+        self._test_broadcast_object_list_helper(group, group_id, rank)
+
+    @skip_if_small_worldsize
+    @unittest.skipIf(BACKEND == "nccl", "Nccl does not support CPU tensors")
+    def test_broadcast_object_list_group(self):
+        group, group_id, rank = self._init_group_test()
+        self._test_broadcast_object_list_helper(group, group_id, rank)
+
+    def _test_scatter_object_list_helper(self, group, group_id, rank):
+        if group_id is not None:
+            for src in group:
+                input_list = [self._build_object(i) for i in group] if rank == src else None
+                output_list = [None]
+                dist.scatter_object_list(output_list, input_list, src, group_id)
+                self._assert_object_equal(output_list[0], rank)
+
+            with self.assertRaisesRegex(ValueError, "at least 1"):
+                dist.scatter_object_list([], None, group[0], group_id)
+
+        self._barrier()
+
+    @unittest.skipIf(BACKEND == "nccl", "Nccl does not support scatter")
+    def test_scatter_object_list(self):
+        group, group_id, rank = self._init_global_test()
+        self._test_scatter_object_list_helper(group, group_id, rank)
+
+    @skip_if_small_worldsize
+    @unittest.skipIf(BACKEND == "nccl", "Nccl does not support scatter")
+    def test_scatter_object_list_group(self):
+        group, group_id, rank = self._init_group_test()
+        self._test_scatter_object_list_helper(group, group_id, rank)
+
+    # HIERARCHICAL COLLECTIVES
+    def _create_hierarchical_group(self):
+        # Split the processes into two nodes, of different sizes if the
+        # world size is odd, which covers the fallback to the node leaders.
+        # Equal nodes are tested with an explicit local_size in
+        # HierarchicalGroupTest of test_c10d.py.
+        world_size = dist.get_world_size()
+        node = dist.get_rank() * 2 // world_size
+        with mock.patch("socket.gethostname", return_value="node{}".format(node)):
+            return HierarchicalGroup()
+
+    @unittest.skipIf(BACKEND != "gloo", "Only Gloo backend supports hierarchical group tests")
+    @skip_if_small_worldsize
+    def test_hierarchical_all_reduce(self):
+        hierarchical_group = self._create_hierarchical_group()
+        rank = dist.get_rank()
+        world_size = dist.get_world_size()
+        # Sizes divisible and not divisible by the processes per node, and
+        # a non-contiguous tensor.
+        for tensor in [torch.ones(12), torch.ones(7), torch.ones(1), torch.ones(4, 3).t()]:
+            tensor.mul_(rank + 1)
+            hierarchical_group.all_reduce(tensor)
+            self.assertEqual(tensor, torch.ones_like(tensor) * (world_size * (world_size + 1) // 2))
+
+        tensor = torch.ones(5) * rank
+        work = hierarchical_group.all_reduce(tensor, op=dist.ReduceOp.MAX, async_op=True)
+        work.wait()
+        self.assertEqual(tensor, torch.ones(5) * (world_size - 1))
+        self._barrier()
+
+    @unittest.skipIf(BACKEND != "gloo", "Only Gloo backend supports hierarchical group tests")
+    @skip_if_small_worldsize
+    def test_hierarchical_all_gather(self):
+        hierarchical_group = self._create_hierarchical_group()
+        rank = dist.get_rank()
+        world_size = dist.get_world_size()
+        tensors = [_build_tensor(3, -1) for _ in range(world_size)]
+        hierarchical_group.all_gather(tensors, _build_tensor(3, rank))
+        for i, tensor in enumerate(tensors):
+            self.assertEqual(tensor, _build_tensor(3, i))
+        self._barrier()
+
+    @unittest.skipIf(BACKEND != "gloo", "Only Gloo backend supports hierarchical group tests")
+    @skip_if_small_worldsize
+    def test_hierarchical_allreduce_hook(self):
+        hierarchical_group = self._create_hierarchical_group()
+        rank = dist.get_rank()
+        world_size = dist.get_world_size()
+        params = [torch.zeros(2, 3), torch.zeros(5)]
+        bucket = GradBucket(0, torch.ones(11) * rank, params)
+        result = hierarchical_allreduce_hook(hierarchical_group, bucket).wait()
+        self.assertEqual(result[0], torch.ones(11) * (world_size - 1) / 2)
+        self._barrier()
+
     # AllToAll
     def _test_all_to_all_single_equal_split_helper(self, group, group_id, rank):
         if group_id is not None:
@@ -14,6 +14,7 @@ from operator import mul
 from functools import reduce
 import torch
 import json
+import gzip
 
 # TODO: remove this global setting
 # Autograd tests use double as the default dtype
@@ -25,7 +26,10 @@ from torch.autograd.gradcheck import gradgradcheck, gradcheck
 from torch.autograd.function import once_differentiable
 from torch.autograd.profiler import (profile, format_time, EventList,
                                      FunctionEvent, FunctionEventAvg,
-                                     record_function, emit_nvtx)
+                                     record_function, emit_nvtx,
+                                     scheduled_profile, schedule, ProfilerAction,
+                                     load_trace, enable_range_metrics, disable_range_metrics,
+                                     range_metrics_snapshot, RangeMetricsReporter)
 import torch.autograd.functional as autogradF
 from torch.utils.checkpoint import checkpoint
 from torch.testing._internal.common_utils import (TEST_MKL, TEST_WITH_ROCM, TestCase, run_tests, skipIfNoLapack,
@@ -2995,6 +2999,88 @@ class TestAutograd(TestCase):
             ]
         )
 
+    def test_memory_timeline(self):
+        with profile(profile_memory=True) as prof:
+            with record_function("test_user_scope_alloc"):
+                x = torch.rand(1024, 1024)
+                y = x * 2
+            with record_function("test_user_scope_dealloc"):
+                del x
+                del y
+            with record_function("test_user_scope_small"):
+                z = torch.rand(16)
+
+        timeline = prof.memory_timeline()
+        tensor_bytes = 1024 * 1024 * 4
+        self.assertEqual(timeline.devices, ['cpu'])
+        self.assertGreaterEqual(timeline.peak_usage(), 2 * tensor_bytes)
+        self.assertEqual(max(usage for _, usage in timeline.usage()), timeline.peak_usage())
+        self.assertTrue(timeline.usage()[-1][1] < timeline.peak_usage())
+
+        # both tensors are alive at the peak
+        live = [record for record in timeline.live_at_peak() if record.nbytes == tensor_bytes]
+        self.assertEqual(len(live), 2)
+        self.assertTrue(all(record.ranges[0] == "test_user_scope_alloc" for record in live))
+        self.assertTrue(any("mul" in record.ranges for record in live))
+
+        top = timeline.top_allocating_ops(row_limit=2)
+        self.assertEqual(len(top), 2)
+        for stats in top:
+            self.assertEqual(stats.ranges[0], "test_user_scope_alloc")
+            self.assertEqual(stats.allocated, tensor_bytes)
+            self.assertEqual(stats.live_at_peak, tensor_bytes)
+        self.assertIn("Peak CPU memory usage", timeline.table())
+
+        with profile() as prof:
+            torch.rand(10)
+        with self.assertRaisesRegex(RuntimeError, "profile_memory"):
+            prof.memory_timeline()
+
+    def test_memory_timeline_chrome_trace(self):
+        with profile(profile_memory=True) as prof:
+            x = torch.rand(1024)
+            del x
+        if sys.platform != "win32":
+            with tempfile.NamedTemporaryFile(mode="w+") as trace_file:
+                prof.export_chrome_trace(trace_file.name)
+                trace_file.seek(0)
+                events = json.load(trace_file)
+            counters = [evt for evt in events if evt["ph"] == "C"]
+            self.assertEqual([evt["args"]["allocated"] for evt in counters], [1024 * 4, 0])
+            self.assertTrue(all(evt["name"] == "CPU memory" for evt in counters))
+
+    def test_profiler_export_trace(self):
+        name = 'scope "quoted" \\ {}'
+        with profile(record_shapes=True) as prof:
+            with record_function(name):
+                torch.mm(torch.rand(2, 3), torch.rand(3, 4))
+
+        if sys.platform == "win32":
+            return
+        with tempfile.NamedTemporaryFile(suffix=".json.gz") as trace_file:
+            prof.export_chrome_trace(trace_file.name)
+            with gzip.open(trace_file.name, "rt") as f:
+                events = json.load(f)
+        self.assertIn(name, [evt["name"] for evt in events])
+        self.assertEqual(len(events), len(prof.function_events))
+
+        with tempfile.NamedTemporaryFile() as trace_file:
+            prof.export_trace(trace_file.name)
+            loaded = load_trace(trace_file.name)
+        self.assertEqual(len(loaded), len(prof.function_events))
+        for evt, loaded_evt in zip(prof.function_events, loaded):
+            self.assertEqual(evt.name, loaded_evt.name)
+            self.assertEqual(evt.thread, loaded_evt.thread)
+            self.assertEqual(evt.cpu_interval.start, loaded_evt.cpu_interval.start)
+            self.assertEqual(evt.cpu_interval.end, loaded_evt.cpu_interval.end)
+            self.assertEqual(evt.input_shapes, loaded_evt.input_shapes)
+        self.assertEqual(str(prof.key_averages()), str(loaded.key_averages()))
+
+        with tempfile.NamedTemporaryFile(suffix=".json.gz") as trace_file:
+            prof.export_chrome_trace(trace_file.name)
+            with self.assertRaisesRegex(RuntimeError, "not a trace written by export_trace"):
+                load_trace(trace_file.name)
+
     def test_record_function(self):
         x = torch.randn(10, 10)
 
@@ -3051,6 +3137,148 @@ class TestAutograd(TestCase):
         # doesn't throw.
         rf.__exit__()
 
+    def test_range_metrics(self):
+        x = torch.randn(10, 10)
+
+        def step():
+            with record_function("stage"):
+                time.sleep(0.001)
+                x * 2 + 1
+
+        range_metrics_snapshot(reset=True)
+        enable_range_metrics()
+        try:
+            for _ in range(3):
+                step()
+            # Ranges are counted on all threads, including the threads that
+            # exited before the snapshot.
+            t = threading.Thread(target=step)
+            t.start()
+            t.join()
+            snapshot = range_metrics_snapshot(reset=True)
+            self.assertEqual(list(snapshot.keys()), ["stage"])
+            stats = snapshot["stage"]
+            self.assertEqual(stats.count, 4)
+            self.assertGreaterEqual(stats.min_us, 1000)
+            self.assertLessEqual(stats.min_us, stats.mean_us)
+            self.assertLessEqual(stats.mean_us, stats.max_us)
+            self.assertAlmostEqual(stats.total_us, 4 * stats.mean_us)
+            self.assertEqual(len(range_metrics_snapshot()), 0)
+
+            enable_range_metrics(record_ops=True)
+            step()
+            snapshot = range_metrics_snapshot(reset=True)
+            self.assertEqual(snapshot["stage"].count, 1)
+            self.assertEqual(snapshot["mul"].count, 1)
+            self.assertEqual(snapshot["add"].count, 1)
+
+            reports = []
+            with RangeMetricsReporter(60, reports.append):
+                step()
+            self.assertEqual(len(reports), 1)
+            self.assertEqual(reports[0]["stage"].count, 1)
+        finally:
+            disable_range_metrics()
+        step()
+        self.assertEqual(len(range_metrics_snapshot()), 0)
+
+
+    def test_profiler_schedule(self):
+        schedule_fn = schedule(wait=1, warmup=1, active=2, repeat=2)
+        expected = [ProfilerAction.NONE, ProfilerAction.WARMUP,
+                    ProfilerAction.RECORD, ProfilerAction.RECORD_AND_SAVE] * 2 + [ProfilerAction.NONE] * 2
+        self.assertEqual([schedule_fn(step) for step in range(10)], expected)
+        with self.assertRaisesRegex(ValueError, "Invalid schedule"):
+            schedule(wait=1, warmup=1, active=0)
+
+    def test_scheduled_profile(self):
+        x = torch.randn(10, 10)
+        traces = []
+
+        def on_trace_ready(prof):
+            traces.append([evt.name for evt in prof.function_events if evt.name.startswith("step")])
+
+        with scheduled_profile(schedule(wait=1, warmup=1, active=2),
+                               on_trace_ready=on_trace_ready) as prof:
+            for step in range(10):
+                self.assertEqual(torch.autograd._profiler_enabled(), step % 4 != 0)
+                with record_function("step{}".format(step)):
+                    x * 2
+                prof.step()
+        self.assertFalse(torch.autograd._profiler_enabled())
+        # The warmup of the third cycle is discarded on exit.
+        self.assertEqual(traces, [["step2", "step3"], ["step6", "step7"]])
+
+    def test_profiler_sampling(self):
+        x = torch.randn(10, 10)
+        with profile(sampling_period=3) as prof:
+            for _ in range(9):
+                with record_function("outer"):
+                    x * 2
+        names = [evt.name for evt in prof.function_events]
+        # The operations nested in a top-level range are sampled with it.
+        self.assertEqual(names.count("outer"), 3)
+        self.assertEqual(names.count("mul"), 3)
+
+        with self.assertRaisesRegex(ValueError, "sampling_period"):
+            profile(sampling_period=0)
+
+    def test_profiler_aggregate(self):
+        rnn = torch.nn.LSTM(10, 20, 2)
+        x = torch.randn(5, 3, 10)
+        with profile(record_shapes=True) as prof:
+            rnn(x)
+        with profile(record_shapes=True, aggregate=True, trace_sample_size=5) as aggregated:
+            rnn(x)
+
+        self.assertLessEqual(len(aggregated.function_events), 5)
+        for group_by_input_shape in [False, True]:
+            expected = {(evt.key, str(evt.input_shapes)): evt.count
+                        for evt in prof.key_averages(group_by_input_shape)}
+            averages = aggregated.key_averages(group_by_input_shape)
+            self.assertEqual({(evt.key, str(evt.input_shapes)): evt.count for evt in averages}, expected)
+            for evt in averages:
+                self.assertLessEqual(evt.self_cpu_time_total, evt.cpu_time_total)
+        self.assertEqual(aggregated.total_average().count, len(prof.function_events))
+        self.assertIn("lstm", aggregated.table(sort_by="self_cpu_time_total"))
+
+    def test_profiler_with_stack(self):
+        model = torch.nn.Sequential(torch.nn.Linear(10, 10), torch.nn.ReLU())
+        x = torch.randn(4, 10)
+
+        def run_model():
+            return model(x)
+
+        with profile(with_stack=True) as prof:
+            run_model()
+
+        names = [evt.name for evt in prof.function_events]
+        self.assertIn("nn.Module: Sequential", names)
+        self.assertIn("nn.Module: Sequential.0", names)
+        self.assertIn("nn.Module: Sequential.1", names)
+        for evt in prof.function_events:
+            if evt.name == "addmm":
+                self.assertEqual(evt.module_path, "Sequential.0")
+                self.assertTrue(any("run_model" in frame for frame in evt.stack))
+            elif evt.name == "relu":
+                self.assertEqual(evt.module_path, "Sequential.1")
+
+        averages = prof.key_averages(group_by_module=True)
+        self.assertIn(("addmm", "Sequential.0"), [(evt.key, evt.module_path) for evt in averages])
+        self.assertIn("Sequential.0", prof.key_averages(group_by_module=True).table())
+
+        with tempfile.NamedTemporaryFile(mode="w+") as f:
+            prof.export_stacks(f.name)
+            lines = f.read().splitlines()
+        self.assertTrue(any("nn.Module: Sequential.0;addmm" in line for line in lines))
+        for line in lines:
+            stack, value = line.rsplit(" ", 1)
+            self.assertGreater(int(value), 0)
+
+        # The hooks are removed when the profiler exits.
+        with profile() as prof:
+            run_model()
+        self.assertNotIn("nn.Module: Sequential", [evt.name for evt in prof.function_events])
 
     def test_dir(self):
         x = torch.randn(10, 10)
@@ -479,6 +479,129 @@ class TestNN(NNTestCase):
         test_fwd.remove()
         test_bwd.remove()
 
+    def test_module_latency_monitor(self):
+        model = nn.Sequential(nn.Linear(5, 5), nn.Sigmoid(), nn.Linear(5, 2))
+        monitor = nn.utils.ModuleLatencyMonitor(model, submodules=['', '1', '2'], window_size=4)
+        input = torch.randn(3, 5)
+        for _ in range(6):
+            model(input).sum().backward()
+
+        stats = monitor.stats()
+        self.assertEqual(list(stats.keys()), ['', '1', '2'])
+        for name in ['1', '2']:
+            for key in ['forward', 'backward']:
+                summary = stats[name][key]
+                self.assertEqual(summary['count'], 6)
+                self.assertTrue(0 <= summary['p50_ms'] <= summary['p99_ms'] <= summary['max_ms'])
+        # the input of the model does not require grad
+        self.assertNotIn('backward', stats[''])
+        self.assertEqual(stats['']['forward']['count'], 6)
+        self.assertGreaterEqual(stats['']['forward']['max_ms'], stats['2']['forward']['max_ms'])
+
+        # no overhead and no new calls while disabled
+        monitor.disable()
+        self.assertEqual(len(model[1]._forward_hooks), 0)
+        model(input)
+        self.assertEqual(monitor.stats()['1']['forward']['count'], 6)
+        monitor.enable()
+        with torch.no_grad():
+            output = model(input)
+        self.assertFalse(output.requires_grad)
+        self.assertEqual(monitor.stats()['1']['forward']['count'], 7)
+        self.assertEqual(monitor.stats()['1']['backward']['count'], 6)
+
+        # the gradients are not changed
+        model.zero_grad()
+        model(input).sum().backward()
+        grads = [p.grad.clone() for p in model.parameters()]
+        monitor.disable()
+        model.zero_grad()
+        model(input).sum().backward()
+        for grad, p in zip(grads, model.parameters()):
+            self.assertEqual(grad, p.grad)
+
+        scalars = {}
+
+        class Writer(object):
+            def add_scalar(self, tag, value, global_step):
+                scalars[tag] = (value, global_step)
+
+        monitor.add_to_summary_writer(Writer(), global_step=2)
+        self.assertEqual(scalars['latency/2/forward/count'], (8, 2))
+        self.assertIn('latency/<root>/forward/p99_ms', scalars)
+
+        monitor.reset()
+        self.assertEqual(monitor.stats(), {})
+        with self.assertRaisesRegex(ValueError, "no submodule named 'foo'"):
+            nn.utils.ModuleLatencyMonitor(model, submodules=['foo'])
+
+    def test_module_latency_monitor_inplace(self):
+        model = nn.Sequential(nn.Linear(5, 5), nn.ReLU(inplace=True), nn.Linear(5, 2))
+        monitor = nn.utils.ModuleLatencyMonitor(model)
+        input = torch.randn(3, 5, requires_grad=True)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            for _ in range(3):
+                model(input).sum().backward()
+        self.assertEqual(len(w), 0)
+        stats = monitor.stats()
+        for name in ['', '0', '1', '2']:
+            self.assertEqual(stats[name]['forward']['count'], 3)
+            self.assertEqual(stats[name]['backward']['count'], 3)
+        # the hooks on the gradient of the leaf input are removed once called
+        self.assertEqual(len(input._backward_hooks), 0)
+
+        grads = [p.grad.clone() for p in model.parameters()] + [input.grad.clone()]
+        monitor.disable()
+        model.zero_grad()
+        input.grad = None
+        for _ in range(3):
+            model(input).sum().backward()
+        for grad, t in zip(grads, list(model.parameters()) + [input]):
+            self.assertEqual(grad, t.grad)
+
+    def test_global_hooks(self):
+        from torch.nn.modules.module import (register_module_forward_pre_hook,
+                                             register_module_forward_hook)
+        module = nn.Sequential(nn.Linear(5, 5), nn.Sigmoid())
+        input = torch.ones(2, 5)
+        calls = []
+
+        def pre_hook(h_module, input):
+            calls.append(('pre', type(h_module).__name__))
+
+        def fw_hook(h_module, input, output):
+            calls.append(('fw', type(h_module).__name__))
+
+        module[1].register_forward_hook(lambda *args: calls.append(('module_fw', 'Sigmoid')))
+        pre_handle = register_module_forward_pre_hook(pre_hook)
+        fw_handle = register_module_forward_hook(fw_hook)
+        try:
+            module(input)
+        finally:
+            pre_handle.remove()
+            fw_handle.remove()
+        self.assertEqual(calls, [
+            ('pre', 'Sequential'),
+            ('pre', 'Linear'),
+            ('fw', 'Linear'),
+            ('pre', 'Sigmoid'),
+            ('fw', 'Sigmoid'),
+            ('module_fw', 'Sigmoid'),
+            ('fw', 'Sequential'),
+        ])
+
+        # Global hooks can modify the input and output like module hooks.
+        pre_handle = register_module_forward_pre_hook(lambda m, input: (input[0] * 0,))
+        fw_handle = register_module_forward_hook(lambda m, input, output: output + 1)
+        try:
+            output = nn.Identity()(input)
+        finally:
+            pre_handle.remove()
+            fw_handle.remove()
+        self.assertEqual(output, torch.ones(2, 5))
+        self.assertEqual(nn.Identity()(input), input)
+
     def test_hook_cpp(self):
         counter = [0]
         bn = nn.BatchNorm1d(5)
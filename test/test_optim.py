@@ -12,8 +12,9 @@ from torch.autograd import Variable
 from torch import sparse
 from torch.optim.lr_scheduler import LambdaLR, MultiplicativeLR, StepLR, \
     MultiStepLR, ExponentialLR, CosineAnnealingLR, ReduceLROnPlateau, \
-    _LRScheduler, CyclicLR, CosineAnnealingWarmRestarts, OneCycleLR
-from torch.optim.swa_utils import AveragedModel, SWALR, update_bn
+    _LRScheduler, CyclicLR, CosineAnnealingWarmRestarts, OneCycleLR, ChainedScheduler
+from torch.optim.swa_utils import AveragedModel, FlatAveragedModel, SWALR, update_bn
+from torch.optim.mixed_precision import MixedPrecisionOptimizer
 from torch.testing._internal.common_utils import TestCase, run_tests, TEST_WITH_UBSAN, load_tests, \
     skipIfRocm
 
@@ -820,6 +821,97 @@ class TestLRScheduler(TestCase):
         closed_form_scheduler = CosineAnnealingLR(self.opt, T_max=T_max, eta_min=eta_min)
         self._test_against_closed_form(scheduler, closed_form_scheduler, epochs)
 
+    def _test_lr_at(self, scheduler_constructor, epochs=20):
+        self.setUp()
+        scheduler = scheduler_constructor(self.opt)
+        table = scheduler.lr_table(range(epochs))
+        self.assertEqual(table.shape, (epochs, len(self.opt.param_groups)))
+        for epoch in range(epochs):
+            targets = [group['lr'] for group in self.opt.param_groups]
+            for target, lr, table_lr in zip(targets, scheduler.lr_at(epoch), table[epoch].tolist()):
+                self.assertAlmostEqual(target, lr, delta=1e-9,
+                                       msg='lr_at is wrong in epoch {}: expected {}, got {}'.format(
+                                           epoch, target, lr))
+                self.assertAlmostEqual(target, table_lr, delta=1e-9,
+                                       msg='lr_table is wrong in epoch {}: expected {}, got {}'.format(
+                                           epoch, target, table_lr))
+            scheduler.step()
+
+        # Replaying the same schedule from a precomputed table.
+        self.setUp()
+        scheduler = scheduler_constructor(self.opt)
+        scheduler.precompute(epochs // 2)
+        for epoch in range(epochs):
+            for target, param_group in zip(table[epoch].tolist(), self.opt.param_groups):
+                self.assertAlmostEqual(target, param_group['lr'], delta=1e-9,
+                                       msg='LR is wrong in epoch {}: expected {}, got {}'.format(
+                                           epoch, target, param_group['lr']))
+            scheduler.step()
+        self.assertNotIn('_lr_table', scheduler.state_dict())
+
+    def test_lr_at(self):
+        self._test_lr_at(lambda opt: LambdaLR(opt, lr_lambda=[lambda x: x / 10, lambda x: 0.95 ** x]))
+        self._test_lr_at(lambda opt: MultiplicativeLR(opt, lr_lambda=lambda x: 0.9))
+        self._test_lr_at(lambda opt: StepLR(opt, gamma=0.1, step_size=3))
+        self._test_lr_at(lambda opt: MultiStepLR(opt, gamma=0.1, milestones=[2, 5, 5, 9]))
+        self._test_lr_at(lambda opt: ExponentialLR(opt, gamma=0.9))
+        self._test_lr_at(lambda opt: CosineAnnealingLR(opt, T_max=5, eta_min=1e-10))
+        self._test_lr_at(lambda opt: CyclicLR(opt, base_lr=0.01, max_lr=0.1, step_size_up=4,
+                                              mode='triangular2', cycle_momentum=False))
+        self._test_lr_at(lambda opt: CyclicLR(opt, base_lr=0.01, max_lr=0.1, step_size_up=4,
+                                              scale_fn=lambda x: 0.5 ** x, cycle_momentum=False))
+        self._test_lr_at(lambda opt: CosineAnnealingWarmRestarts(opt, T_0=2, T_mult=1, eta_min=1e-10))
+        self._test_lr_at(lambda opt: CosineAnnealingWarmRestarts(opt, T_0=2, T_mult=3, eta_min=1e-10), 100)
+        self._test_lr_at(lambda opt: OneCycleLR(opt, max_lr=1.0, total_steps=20, cycle_momentum=False))
+
+    def test_lr_at_large_step(self):
+        scheduler = CosineAnnealingWarmRestarts(self.opt, T_0=10, T_mult=2, eta_min=0.001)
+        lrs = scheduler.lr_at(10 ** 7)
+        table = scheduler.lr_table([10 ** 7])
+        for lr, table_lr in zip(lrs, table[0].tolist()):
+            self.assertAlmostEqual(lr, table_lr, delta=1e-9)
+        # T_0 * (2 ** 20 - 1) = 10485750 is the start of the 21st period.
+        self.assertAlmostEqual(scheduler.lr_at(10485750)[0], 0.05)
+
+    def test_precompute_cycle_momentum(self):
+        scheduler = CyclicLR(self.opt, base_lr=0.01, max_lr=0.1)
+        with self.assertRaisesRegex(ValueError, "cycle_momentum"):
+            scheduler.precompute(10)
+
+    def test_chained_scheduler(self):
+        epochs = 20
+        single_targets = [0.05 * 0.9 ** x * 0.1 ** (x // 3) for x in range(epochs)]
+        targets = [single_targets, [x * 10 for x in single_targets]]
+        scheduler = ChainedScheduler([ExponentialLR(self.opt, gamma=0.9),
+                                      StepLR(self.opt, gamma=0.1, step_size=3)])
+        self._test(scheduler, targets, epochs)
+        self._test_lr_at(lambda opt: ChainedScheduler([ExponentialLR(opt, gamma=0.9),
+                                                       StepLR(opt, gamma=0.1, step_size=3)]))
+
+    def test_chained_scheduler_state_dict(self):
+        scheduler = ChainedScheduler([ExponentialLR(self.opt, gamma=0.9),
+                                      StepLR(self.opt, gamma=0.1, step_size=3)])
+        for _ in range(5):
+            scheduler.step()
+        state_dict = scheduler.state_dict()
+        self.assertEqual(len(state_dict['_schedulers']), 2)
+
+        self.setUp()
+        scheduler_copy = ChainedScheduler([ExponentialLR(self.opt, gamma=0.5),
+                                           StepLR(self.opt, gamma=0.5, step_size=2)])
+        scheduler_copy.load_state_dict(state_dict)
+        self.assertEqual(scheduler_copy.last_epoch, 5)
+        self.assertEqual(scheduler_copy._schedulers[0].gamma, 0.9)
+        self.assertEqual(scheduler_copy._schedulers[1].step_size, 3)
+        self.assertEqual(scheduler_copy.lr_at(7), scheduler.lr_at(7))
+
+    def test_chained_scheduler_errors(self):
+        other_opt = SGD(self.net.conv1.parameters(), lr=0.1)
+        with self.assertRaisesRegex(ValueError, "same optimizer"):
+            ChainedScheduler([ExponentialLR(self.opt, gamma=0.9), ExponentialLR(other_opt, gamma=0.9)])
+        with self.assertRaisesRegex(ValueError, "at least one"):
+            ChainedScheduler([])
+
     def test_reduce_lr_on_plateau1(self):
         epochs = 10
         for param_group in self.opt.param_groups:
@@ -1774,6 +1866,93 @@ class TestSWAUtils(TestCase):
         for p_avg, p_swa in zip(averaged_params, averaged_dnn.parameters()):
             self.assertAlmostEqual(p_avg, p_swa)
 
+    def _test_flat_averaged_model(self, net_device, swa_device):
+        dnn = torch.nn.Sequential(
+            torch.nn.Conv2d(1, 5, kernel_size=3),
+            torch.nn.BatchNorm2d(5, momentum=0.3),
+            torch.nn.Linear(5, 10)
+        ).to(net_device)
+
+        averaged_dnn = FlatAveragedModel(dnn, device=swa_device)
+        averaged_params = [torch.zeros_like(param) for param in dnn.parameters()]
+        averaged_running_mean = torch.zeros_like(dnn[1].running_mean)
+        n_updates = 10
+        for i in range(n_updates):
+            for p, p_avg in zip(dnn.parameters(), averaged_params):
+                p.detach().add_(torch.randn_like(p))
+                p_avg += p.detach() / n_updates
+            dnn[1].running_mean.add_(torch.randn_like(dnn[1].running_mean))
+            dnn[1].num_batches_tracked += 1
+            averaged_running_mean += dnn[1].running_mean / n_updates
+            averaged_dnn.update_parameters(dnn)
+
+        for p_avg, p_swa in zip(averaged_params, averaged_dnn.parameters()):
+            self.assertAlmostEqual(p_avg, p_swa)
+            self.assertTrue(p_swa.device == swa_device)
+        self.assertAlmostEqual(averaged_running_mean, averaged_dnn.module[1].running_mean.to(net_device))
+        self.assertEqual(averaged_dnn.module[1].num_batches_tracked.item(), n_updates)
+        self.assertEqual(averaged_dnn.n_averaged.item(), n_updates)
+
+    def test_flat_averaged_model_all_devices(self):
+        cpu = torch.device("cpu")
+        self._test_flat_averaged_model(cpu, cpu)
+        if torch.cuda.is_available():
+            cuda = torch.device(0)
+            self._test_flat_averaged_model(cuda, cpu)
+            self._test_flat_averaged_model(cpu, cuda)
+            self._test_flat_averaged_model(cuda, cuda)
+
+    def test_flat_averaged_model_exponential(self):
+        dnn = torch.nn.Sequential(
+            torch.nn.Conv2d(1, 5, kernel_size=3),
+            torch.nn.Linear(5, 10)
+        )
+        alpha = 0.9
+        averaged_dnn = FlatAveragedModel(dnn, decay=alpha, update_every=2)
+        averaged_params = [torch.zeros_like(param) for param in dnn.parameters()]
+        n_updates = 10
+        for i in range(n_updates):
+            for p in dnn.parameters():
+                p.detach().add_(torch.randn_like(p))
+            if i % 2 == 0:
+                averaged_params = [p.detach().clone() if i == 0 else p_avg * alpha + p.detach() * (1 - alpha)
+                                   for p, p_avg in zip(dnn.parameters(), averaged_params)]
+            averaged_dnn.update_parameters(dnn)
+
+        for p_avg, p_swa in zip(averaged_params, averaged_dnn.parameters()):
+            self.assertAlmostEqual(p_avg, p_swa)
+        self.assertEqual(averaged_dnn.n_averaged.item(), n_updates // 2)
+
+    def test_flat_averaged_model_flat_storage(self):
+        dnn = torch.nn.Sequential(
+            torch.nn.Linear(5, 10),
+            torch.nn.Linear(10, 2)
+        )
+        averaged_dnn = FlatAveragedModel(dnn)
+        params = list(averaged_dnn.parameters())
+        self.assertTrue(all(p.storage().data_ptr() == params[0].storage().data_ptr() for p in params))
+
+        # Casting the averaged model keeps the parameters in a single buffer.
+        averaged_dnn.double()
+        params = list(averaged_dnn.parameters())
+        self.assertTrue(all(p.dtype == torch.double for p in params))
+        self.assertTrue(all(p.storage().data_ptr() == params[0].storage().data_ptr() for p in params))
+        averaged_dnn.update_parameters(dnn.double())
+        for p_model, p_swa in zip(dnn.parameters(), averaged_dnn.parameters()):
+            self.assertEqual(p_model, p_swa)
+
+        averaged_dnn2 = FlatAveragedModel(dnn)
+        averaged_dnn2.load_state_dict(averaged_dnn.state_dict())
+        params = list(averaged_dnn2.parameters())
+        self.assertTrue(all(p.storage().data_ptr() == params[0].storage().data_ptr() for p in params))
+        for p_swa, p_swa2 in zip(averaged_dnn.parameters(), averaged_dnn2.parameters()):
+            self.assertEqual(p_swa, p_swa2)
+
+        with self.assertRaisesRegex(ValueError, "Invalid decay"):
+            FlatAveragedModel(dnn, decay=1.5)
+        with self.assertRaisesRegex(ValueError, "update_every"):
+            FlatAveragedModel(dnn, update_every=0)
+
     def _test_update_bn(self, dnn, dl_x, dl_xy, cuda):
 
         preactivation_sum = torch.zeros(dnn.n_features)
@@ -1876,5 +2055,113 @@ class TestSWAUtils(TestCase):
         self.assertEqual(dnn.bn.momentum, 0.3)
 
 
+class TestMixedPrecisionOptimizer(TestCase):
+    def _model(self, dtype):
+        torch.manual_seed(0)
+        return torch.nn.Sequential(
+            torch.nn.Linear(5, 4),
+            torch.nn.Linear(4, 3)
+        ).to(dtype)
+
+    def test_accumulate_grad(self):
+        model = self._model(torch.bfloat16)
+        optimizer = MixedPrecisionOptimizer(SGD(model.parameters(), lr=0.1), loss_scale=4.0)
+        params = list(model.parameters())
+        grads = [[torch.randn_like(p) for p in params] for _ in range(3)]
+        optimizer.zero_grad()
+        for micro_batch in grads:
+            for p, grad in zip(params, micro_batch):
+                p.grad = grad
+            optimizer.accumulate_grad()
+            for p in params:
+                self.assertIsNone(p.grad)
+        for i, master in enumerate(optimizer.param_groups[0]['params']):
+            self.assertEqual(master.dtype, torch.float32)
+            expected = sum(micro_batch[i].float() for micro_batch in grads) / 4.0
+            self.assertEqual(optimizer._master_groups[0].master_grads[i], expected)
+
+    def test_step(self):
+        model = self._model(torch.bfloat16)
+        reference = self._model(torch.float32)
+        for p, p_ref in zip(model.parameters(), reference.parameters()):
+            p_ref.detach().copy_(p)
+        optimizer = MixedPrecisionOptimizer(SGD(model.parameters(), lr=0.1, momentum=0.9))
+        optimizer_ref = SGD(reference.parameters(), lr=0.1, momentum=0.9)
+        for _ in range(3):
+            optimizer.zero_grad()
+            optimizer_ref.zero_grad()
+            for p, p_ref in zip(model.parameters(), reference.parameters()):
+                grad = torch.randn_like(p_ref).to(torch.bfloat16)
+                p.grad = grad
+                p_ref.grad = grad.float()
+            optimizer.step()
+            optimizer_ref.step()
+        for p, master, p_ref in zip(model.parameters(), optimizer.param_groups[0]['params'],
+                                    reference.parameters()):
+            self.assertEqual(p.dtype, torch.bfloat16)
+            self.assertEqual(master, p_ref)
+            self.assertEqual(p, master.to(torch.bfloat16))
+
+    def test_zero_grad_after_step(self):
+        model = self._model(torch.bfloat16)
+        optimizer = MixedPrecisionOptimizer(SGD(model.parameters(), lr=0.1))
+        for _ in range(2):
+            optimizer.zero_grad()
+            for master in optimizer.param_groups[0]['params']:
+                self.assertIsNone(master.grad)
+            self.assertEqual(optimizer._master_groups[0].master_grad.abs().sum().item(), 0)
+            for p in model.parameters():
+                p.grad = torch.ones_like(p)
+            optimizer.step()
+            for master in optimizer.param_groups[0]['params']:
+                self.assertEqual(master.grad, torch.ones_like(master))
+
+    def test_step_without_grad(self):
+        model = self._model(torch.bfloat16)
+        optimizer = MixedPrecisionOptimizer(optim.Adam(model.parameters(), lr=0.1))
+        first, second = model[0].weight, model[1].weight
+        second_before = second.detach().clone()
+        first_before = first.detach().clone()
+        optimizer.zero_grad()
+        first.grad = torch.ones_like(first)
+        optimizer.step()
+        self.assertNotEqual(first, first_before)
+        self.assertEqual(second, second_before)
+        self.assertEqual(len(optimizer.state), 1)
+
+    def test_fp32_params(self):
+        model = self._model(torch.bfloat16)
+        extra = torch.nn.Parameter(torch.randn(3))
+        optimizer = MixedPrecisionOptimizer(SGD(list(model.parameters()) + [extra], lr=0.1))
+        self.assertIs(optimizer.param_groups[0]['params'][-1], extra)
+        extra.grad = torch.ones(3)
+        extra_before = extra.detach().clone()
+        optimizer.step()
+        self.assertEqual(extra, extra_before - 0.1)
+
+    def test_state_dict(self):
+        model = self._model(torch.bfloat16)
+        optimizer = MixedPrecisionOptimizer(optim.Adam(model.parameters(), lr=0.1))
+        for p in model.parameters():
+            p.grad = torch.randn_like(p)
+        optimizer.step()
+        state_dict = deepcopy(optimizer.state_dict())
+
+        model2 = self._model(torch.bfloat16)
+        optimizer2 = MixedPrecisionOptimizer(optim.Adam(model2.parameters(), lr=0.1))
+        optimizer2.load_state_dict(state_dict)
+        for p, p2 in zip(model.parameters(), model2.parameters()):
+            self.assertEqual(p, p2)
+        for master, master2 in zip(optimizer.param_groups[0]['params'], optimizer2.param_groups[0]['params']):
+            self.assertEqual(master, master2)
+
+    def test_invalid_arguments(self):
+        model = self._model(torch.bfloat16)
+        with self.assertRaises(TypeError):
+            MixedPrecisionOptimizer(model)
+        with self.assertRaisesRegex(ValueError, "Invalid loss_scale"):
+            MixedPrecisionOptimizer(SGD(model.parameters(), lr=0.1), loss_scale=0)
+
+
 if __name__ == '__main__':
     run_tests()
@@ -80,6 +80,61 @@ class TestThroughputBenchmark(TestCase):
         with tempfile.NamedTemporaryFile(delete=False) as f:
             self.linear_test(TwoLayerNetModule, profiler_output_path=f.name)
 
+    def make_bench(self, Module):
+        bench = ThroughputBenchmark(Module(10, 5, 15))
+        for i in range(2):
+            bench.add_input(torch.randn(8, 10), torch.randn(8, 10))
+        return bench
+
+    def test_latency_percentiles(self):
+        bench = self.make_bench(TwoLayerNet)
+        stats = bench.benchmark(num_calling_threads=2, num_warmup_iters=10, num_iters=200)
+        self.assertEqual(len(stats.latencies_ms), 200)
+        self.assertEqual(stats.num_warmup_iters, [10, 10])
+        self.assertTrue(0 < stats.latency_p50_ms <= stats.latency_p90_ms <= stats.latency_p99_ms)
+        self.assertEqual(stats.latency_percentile_ms(100), max(stats.latencies_ms))
+        self.assertEqual(stats.latency_percentile_ms(0), min(stats.latencies_ms))
+        histogram = stats.latency_histogram(num_buckets=10)
+        self.assertEqual(len(histogram), 10)
+        self.assertEqual(sum(count for _, count in histogram), 200)
+        self.assertEqual(histogram[-1][0], max(stats.latencies_ms))
+        with self.assertRaisesRegex(ValueError, "Invalid percentile"):
+            stats.latency_percentile_ms(101)
+        print(stats)
+
+    def test_open_loop(self):
+        bench = self.make_bench(TwoLayerNet)
+        target_qps = 2000
+        num_iters = 200
+        stats = bench.benchmark(num_calling_threads=2, num_warmup_iters=10, num_iters=num_iters,
+                                target_qps=target_qps)
+        self.assertEqual(len(stats.latencies_ms), num_iters)
+        # The requests arrive at the target rate, not as fast as they are served
+        self.assertGreater(stats.total_time_seconds, 0.5 * num_iters / target_qps)
+        self.assertLess(stats.iters_per_second, 2 * target_qps)
+        self.assertAlmostEqual(stats.latency_avg_ms, sum(stats.latencies_ms) / num_iters, places=3)
+        print(stats)
+
+    def test_warmup_until_steady_state(self):
+        bench = self.make_bench(TwoLayerNetModule)
+        stats = bench.benchmark(num_calling_threads=2, num_warmup_iters=10, num_iters=50,
+                                warmup_tolerance=0.5, max_warmup_iters=100)
+        self.assertEqual(len(stats.num_warmup_iters), 2)
+        for num_warmup_iters in stats.num_warmup_iters:
+            self.assertGreaterEqual(num_warmup_iters, 20)
+            self.assertLessEqual(num_warmup_iters, 100)
+
+    def test_sweep(self):
+        bench = self.make_bench(TwoLayerNet)
+        num_threads = torch.get_num_threads()
+        results = bench.sweep(num_calling_threads=[1, 2], num_intra_op_threads=[1, None],
+                              num_warmup_iters=5, num_iters=50)
+        self.assertEqual([(r.num_calling_threads, r.num_intra_op_threads) for r in results],
+                         [(1, 1), (2, 1), (1, num_threads), (2, num_threads)])
+        for result in results:
+            self.assertEqual(result.stats.num_iters, 50)
+        self.assertEqual(torch.get_num_threads(), num_threads)
+
 
 if __name__ == '__main__':
     run_tests()
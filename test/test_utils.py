@@ -10,7 +10,9 @@ import torch
 import torch.nn as nn
 import torch.utils.data
 import torch.cuda
-from torch.utils.checkpoint import checkpoint, checkpoint_sequential
+from torch.utils.checkpoint import checkpoint, checkpoint_sequential, \
+    CheckpointSegment, LayerProfile, plan_checkpoint_segments, profile_sequential, \
+    offload_activations
 import torch.hub as hub
 from torch.autograd._functions.utils import check_onnx_broadcast
 from torch.onnx.symbolic_opset9 import _prepare_onnx_paddings
@@ -267,6 +269,125 @@ class TestCheckpoint(TestCase):
         out = checkpoint(run_fn, input_var, None)
         out.sum().backward()
 
+    def test_checkpoint_sequential_plan(self):
+        model = nn.Sequential(
+            nn.Linear(100, 50),
+            nn.ReLU(),
+            nn.Linear(50, 20),
+            nn.ReLU(),
+            nn.Linear(20, 5),
+            nn.ReLU()
+        )
+        plan = [
+            CheckpointSegment(0, 0, False),
+            CheckpointSegment(1, 2, True),
+            CheckpointSegment(3, 3, True),
+            CheckpointSegment(4, 5, False),
+        ]
+        self._check_checkpoint_sequential(
+            model,
+            [list(model.children()), model],
+            plan,
+            torch.randn(1, 100, requires_grad=True)
+        )
+
+        with self.assertRaisesRegex(ValueError, "without gaps"):
+            checkpoint_sequential(model, [CheckpointSegment(1, 5, True)],
+                                  torch.randn(1, 100, requires_grad=True))
+        with self.assertRaisesRegex(ValueError, "the model has 6"):
+            checkpoint_sequential(model, [CheckpointSegment(0, 3, True)],
+                                  torch.randn(1, 100, requires_grad=True))
+
+    def test_plan_checkpoint_segments(self):
+        # Alternating expensive (matmul-like) and cheap (elementwise) layers
+        # with identical activation sizes.
+        profiles = []
+        for i in range(8):
+            cpu_time = 100 if i % 2 == 0 else 1
+            profiles.append(LayerProfile(i, 'layer', cpu_time, 10))
+
+        # An unlimited budget saves everything.
+        plan = plan_checkpoint_segments(profiles, 10 ** 9)
+        self.assertEqual(plan, [CheckpointSegment(0, 7, False)])
+
+        # A tight budget keeps the expensive layers first.
+        plan = plan_checkpoint_segments(profiles, 60)
+        self.assertEqual(plan[0].start, 0)
+        self.assertEqual(plan[-1].end, 7)
+        self.assertTrue(any(s.checkpointed for s in plan))
+        saved = set(i for s in plan if not s.checkpointed for i in range(s.start, s.end + 1))
+        self.assertTrue(saved.issuperset({0, 2, 4, 6}))
+
+        # A custom policy that prefers the cheap layers.
+        plan = plan_checkpoint_segments(profiles, 60, policy=lambda p: -p.cpu_time)
+        saved = set(i for s in plan if not s.checkpointed for i in range(s.start, s.end + 1))
+        self.assertTrue(saved.issuperset({1, 3, 5, 7}))
+
+        # Recomputed layers are split into sqrt(n)-sized checkpointed segments.
+        plan = plan_checkpoint_segments(profiles, 0)
+        self.assertTrue(all(s.checkpointed for s in plan))
+        self.assertEqual(len(plan), 2)
+
+    def test_profile_sequential(self):
+        model = nn.Sequential(
+            nn.Linear(100, 50),
+            nn.ReLU(),
+            nn.Linear(50, 20),
+        )
+        input_var = torch.randn(4, 100, requires_grad=True)
+        profiles = profile_sequential(model, input_var)
+        self.assertEqual([p.index for p in profiles], [0, 1, 2])
+        self.assertEqual([p.name for p in profiles], ['Linear', 'ReLU', 'Linear'])
+        for p in profiles:
+            self.assertGreater(p.memory, 0)
+            self.assertGreaterEqual(p.cpu_time, 0)
+
+        plan = plan_checkpoint_segments(profiles, 0)
+        out = checkpoint_sequential(model, plan, input_var)
+        self.assertEqual(out, model(input_var))
+
+    def test_checkpoint_offload_activations(self):
+        model = nn.Sequential(*[nn.Sequential(nn.Linear(20, 20), nn.Tanh()) for _ in range(8)])
+        input_var = torch.randn(16, 20, requires_grad=True)
+
+        out = checkpoint_sequential(model, 4, input_var)
+        out.sum().backward()
+        expected_input_grad = input_var.grad.clone()
+        expected_grads = [p.grad.clone() for p in model.parameters()]
+
+        model.zero_grad()
+        input_var.grad = None
+        offloader = offload_activations(min_bytes=0, prefetch=2)
+        with offloader:
+            out = checkpoint_sequential(model, 4, input_var)
+        # The last segment is not checkpointed.
+        self.assertEqual(offloader.num_offloaded, 3)
+        self.assertEqual(offloader.offloaded_bytes, 3 * 16 * 20 * 4)
+        self.assertEqual(offloader.host_bytes, offloader.offloaded_bytes)
+        self.assertEqual(offloader.num_prefetched, 0)
+
+        out.sum().backward()
+        self.assertEqual(offloader.num_prefetched, 3)
+        self.assertEqual(offloader.fetched_bytes, offloader.offloaded_bytes)
+        self.assertEqual(input_var.grad, expected_input_grad)
+        for p, expected in zip(model.parameters(), expected_grads):
+            self.assertEqual(p.grad, expected)
+
+        del out
+        self.assertEqual(offloader.host_bytes, 0)
+        self.assertEqual(offloader.peak_host_bytes, offloader.offloaded_bytes)
+
+    def test_checkpoint_offload_activations_threshold(self):
+        inp = torch.randn(10, requires_grad=True)
+        with offload_activations(min_bytes=1024) as offloader:
+            out = checkpoint(lambda x: x * 2, inp)
+        out.sum().backward()
+        self.assertEqual(offloader.num_offloaded, 0)
+        self.assertEqual(inp.grad, torch.full_like(inp, 2))
+
+        with self.assertRaisesRegex(ValueError, "prefetch must be non-negative"):
+            offload_activations(prefetch=-1)
+
 
 class TestDataLoader(TestCase):
     def setUp(self):
@@ -1,7 +1,13 @@
+import gzip
 import itertools
+import json
+import random
+import sys
+import threading
 import torch
 
-from collections import defaultdict, namedtuple
+from collections import defaultdict, namedtuple, OrderedDict
+from enum import Enum
 from operator import attrgetter
 
 try:
@@ -121,66 +127,135 @@ class EventList(list):
             use_cuda=self._use_cuda,
             profile_memory=self._profile_memory)
 
-    def export_chrome_trace(self, path):
+    def export_chrome_trace(self, path, memory_timeline=None):
         """Exports an EventList as a Chrome tracing tools file.
 
         The checkpoint can be later loaded and inspected under ``chrome://tracing`` URL.
+        If ``path`` ends with ``.gz``, the trace is compressed with gzip while
+        it is written.
 
         Arguments:
             path (str): Path where the trace will be written.
+            memory_timeline (MemoryTimeline, optional): If given, the memory
+                usage of every device type is added to the trace as a counter
+                track.
         """
-        import os
-        with open(path, 'w') as f:
-            chrome_events = []
+        # JSON-escaped names, with quotes, by name
+        names = _JSONStringTable()
+        with _open_trace(path, 'w') as f:
             next_id = 0
             # Use file IO over using json.dump since JSON dumping is very slow and
             # this technique is proven to give a 4x speedup.
             f.write("[")
+            separator = ""
             for evt in self:
-                f.write('{"name": "%s", '
+                f.write('%s{"name": %s, '
                         '"ph": "X", '
                         '"ts": %s, '
                         '"dur": %s, '
                         '"tid": %s, '
                         '"pid": "CPU functions", '
-                        '"args": {}}, ' % (evt.name, evt.cpu_interval.start,
-                                           evt.cpu_interval.elapsed_us(), evt.thread))
+                        '"args": {}}' % (separator, names[evt.name], evt.cpu_interval.start,
+                                         evt.cpu_interval.elapsed_us(), evt.thread))
+                separator = ", "
                 for k in evt.kernels:
                     # 's' and 'f' draw Flow arrows from
                     # the CPU launch to the GPU kernel
-                    f.write('{"name": "%s", '
+                    f.write(', {"name": %s, '
                             '"ph": "s", '
                             '"ts": %s, '
                             '"tid": %s, '
                             '"pid": "CPU functions", '
                             '"id": %s, '
                             '"cat": "cpu_to_cuda", '
-                            '"args": {}}, ' % (evt.name, evt.cpu_interval.start,
-                                               evt.thread, next_id))
-                    f.write('{"name": "%s", '
+                            '"args": {}}' % (names[evt.name], evt.cpu_interval.start,
+                                             evt.thread, next_id))
+                    f.write(', {"name": %s, '
                             '"ph": "f", '
                             '"ts": %s, '
                             '"tid": %s, '
                             '"pid": "CUDA functions", '
                             '"id": %s, '
                             '"cat": "cpu_to_cuda", '
-                            '"args": {}}, ' % (k.name, k.interval.start, k.device, next_id))
-                    f.write('{"name": "%s", '
+                            '"args": {}}' % (names[k.name], k.interval.start, k.device, next_id))
+                    f.write(', {"name": %s, '
                             '"ph": "X", '
                             '"ts": %s, '
                             '"dur": %s, '
                             '"tid": %s, '
                             '"pid": "CUDA functions", '
-                            '"args": {}}, ' % (k.name, k.interval.start,
-                                               k.interval.elapsed_us(), k.device))
+                            '"args": {}}' % (names[k.name], k.interval.start,
+                                             k.interval.elapsed_us(), k.device))
                     next_id += 1
 
-            # remove trailing whitespace and comma
-            f.seek(f.tell() - 2, os.SEEK_SET)
-            f.truncate()
+            if memory_timeline is not None:
+                for device in memory_timeline.devices:
+                    pid = "CPU functions" if device == 'cpu' else "CUDA functions"
+                    for time, usage in memory_timeline.usage(device):
+                        f.write('%s{"name": "%s memory", '
+                                '"ph": "C", '
+                                '"ts": %s, '
+                                '"pid": "%s", '
+                                '"args": {"allocated": %s}}' % (separator, device.upper(), time, pid, usage))
+                        separator = ", "
             f.write("]")
 
-    def key_averages(self, group_by_input_shapes=False):
+    def export_trace(self, path):
+        """Exports the events in a compact format, which
+        :func:`torch.autograd.profiler.load_trace` loads back as an EventList
+        with the same events, e.g. to analyze a profile collected on another
+        host.
+
+        The trace is written as it is encoded, as gzip-compressed lines of
+        JSON. The names of the events, kernels and modules and the frames of
+        the call stacks are written once, the events refer to them by index.
+
+        Arguments:
+            path (str): Path where the trace will be written.
+        """
+        # Events are formatted by hand, only strings go through the JSON
+        # encoder, and lines are written in batches, which is several times
+        # faster than encoding every event.
+        encoder = json.JSONEncoder(separators=(',', ':'))
+        with _open_trace(path, 'w', compress=True) as f:
+            f.write(encoder.encode({
+                "format": _TRACE_FORMAT,
+                "version": _TRACE_VERSION,
+                "use_cuda": self._use_cuda,
+                "profile_memory": self._profile_memory,
+            }))
+            f.write("\n")
+            lines = []
+            string_ids = {}
+
+            def string_id(string):
+                if string is None:
+                    return -1
+                index = string_ids.get(string)
+                if index is None:
+                    index = string_ids[string] = len(string_ids)
+                    lines.append('["s",%s]\n' % encoder.encode(string))
+                return index
+
+            for evt in self:
+                stack = [string_id(frame) for frame in evt.stack] if evt.stack is not None else None
+                kernels = [[string_id(k.name), k.device, k.interval.start, k.interval.end]
+                           for k in evt.kernels]
+                lines.append('["e",%d,%d,%d,%s,%s,%s,%d,%d,%s,%d,%s,%s]\n' % (
+                    evt.id, string_id(evt.name), evt.thread,
+                    evt.cpu_interval.start, evt.cpu_interval.end,
+                    "null" if evt.input_shapes is None else evt.input_shapes,
+                    evt.cpu_memory_usage, evt.cuda_memory_usage,
+                    "true" if evt.is_async else "false",
+                    string_id(evt.module_path),
+                    "null" if stack is None else stack,
+                    kernels))
+                if len(lines) >= _TRACE_WRITE_BATCH_SIZE:
+                    f.write("".join(lines))
+                    del lines[:]
+            f.write("".join(lines))
+
+    def key_averages(self, group_by_input_shapes=False, group_by_module=False):
         """Averages all function events over their keys.
 
         @param group_by_input_shapes The key would become
@@ -189,6 +264,10 @@ class EventList(list):
         the most and may help with dimension specific optimizations or
         choosing best candidates for quantization (aka fitting a roof line)
 
+        @param group_by_module The key would also contain the path of the
+        innermost ``nn.Module`` the event ran in, when profiling with
+        ``with_stack=True``.
+
         Returns:
             An EventList containing FunctionEventAvg objects.
         """
@@ -196,14 +275,49 @@ class EventList(list):
         stats = defaultdict(FunctionEventAvg)
 
         def get_key(event, group_by_input_shapes):
-            if not group_by_input_shapes:
-                return event.key
-            return (event.key, str(event.input_shapes))
+            key = event.key
+            if group_by_input_shapes:
+                key = (key, str(event.input_shapes))
+            if group_by_module:
+                key = (key, event.module_path)
+            return key
         for evt in self:
             stats[get_key(evt, group_by_input_shapes)].add(
-                evt, group_by_input_shapes)
+                evt, group_by_input_shapes, group_by_module)
         return EventList(stats.values(), use_cuda=self._use_cuda, profile_memory=self._profile_memory)
 
+    def export_stacks(self, path, metric="self_cpu_time_total"):
+        """Exports the events in the collapsed stack format of flame graph
+        tools, such as ``flamegraph.pl``.
+
+        Every line holds the Python call stack of the innermost ``nn.Module``
+        an event ran in, followed by the names of the ranges from that module
+        down to the event, and the sum of ``metric`` over the events with that
+        stack. Python stacks are only recorded with ``with_stack=True``.
+
+        Arguments:
+            path (str): Path where the stacks will be written.
+            metric (str, optional): Attribute of the events to sum, e.g.
+                ``self_cpu_time_total`` or ``self_cuda_time_total``.
+        """
+        self.populate_cpu_children()
+        totals = defaultdict(int)
+        for evt in self:
+            value = int(getattr(evt, metric))
+            if value <= 0:
+                continue
+            names = [evt.name]
+            parent = evt
+            while parent.cpu_parent is not None and not parent.name.startswith(_MODULE_RANGE_PREFIX):
+                parent = parent.cpu_parent
+                names.append(parent.name)
+            frames = list(evt.stack) if evt.stack is not None else []
+            frames.extend(reversed(names))
+            totals[";".join(frames)] += value
+        with open(path, 'w') as f:
+            for stack, value in totals.items():
+                f.write("{} {}\n".format(stack, value))
+
     def total_average(self):
         """Averages all events.
 
@@ -244,7 +358,36 @@ class profile(object):
             self cpu time might be artificially increased because of the shape
             collection.
 
-        profile_memory (bool, optional): Whether to report memory usage, default: ``False``
+        profile_memory (bool, optional): Whether to report memory usage. The
+            allocations and frees are also recorded in a :class:`MemoryTimeline`,
+            returned by ``memory_timeline``, and exported as counter tracks by
+            ``export_chrome_trace``. Default: ``False``
+
+        sampling_period (int, optional): Record only one in ``sampling_period``
+            top-level operations of every thread, together with the operations
+            they call. This reduces the overhead of profiling long-running jobs,
+            and the reported counts and times should be scaled by
+            ``sampling_period`` to estimate the totals. Default: ``1``
+
+        aggregate (bool, optional): Fold the events into the statistics of
+            :meth:`key_averages` as they are parsed, instead of keeping all of
+            them. This bounds the memory used to summarize long profiles by the
+            number of distinct operator names and input shapes. ``table`` then
+            prints the averages, and ``function_events`` only holds a uniform
+            sample of ``trace_sample_size`` events, e.g. for
+            ``export_chrome_trace``. Default: ``False``
+
+        trace_sample_size (int, optional): Number of events kept with
+            ``aggregate=True``. Default: ``0``
+
+        with_stack (bool, optional): Run every ``nn.Module`` call in a range
+            named after the path of the module in the module hierarchy, e.g.
+            ``nn.Module: ResNet.layer1.0.conv1``, and record the Python call
+            stack of the call. Every event gets the path of the innermost
+            module it ran in as ``module_path`` and the call stack of that
+            module as ``stack``, which can be used to group
+            ``key_averages`` by module and to export flame graphs with
+            ``export_stacks``. Default: ``False``
 
     .. warning:
         Enabling memory profiling incurs additional profiler overhead
@@ -283,15 +426,61 @@ class profile(object):
             enabled=True,
             use_cuda=False,
             record_shapes=False,
-            profile_memory=False):
+            profile_memory=False,
+            sampling_period=1,
+            aggregate=False,
+            trace_sample_size=0,
+            with_stack=False):
         self.enabled = enabled
         self.use_cuda = use_cuda
         self.function_events = None
+        self._event_stats = None
+        self._memory_timeline = None
         if not self.enabled:
             return
+        if sampling_period < 1:
+            raise ValueError("Invalid sampling_period value: {}".format(sampling_period))
+        if trace_sample_size < 0:
+            raise ValueError("Invalid trace_sample_size value: {}".format(trace_sample_size))
         self.entered = False
         self.record_shapes = record_shapes
         self.profile_memory = profile_memory
+        self.sampling_period = sampling_period
+        self.aggregate = aggregate
+        self.trace_sample_size = trace_sample_size
+        self.with_stack = with_stack
+        self._stack_recorder = None
+
+    def _start_trace(self):
+        profiler_kind = torch.autograd.ProfilerState.CUDA if self.use_cuda \
+            else torch.autograd.ProfilerState.CPU
+
+        config = torch.autograd.ProfilerConfig(
+            profiler_kind, self.record_shapes, self.profile_memory, self.sampling_period)
+        torch.autograd._enable_profiler(config)
+        if self.with_stack:
+            self._stack_recorder = _ModuleStackRecorder()
+
+    def _stop_trace(self):
+        stacks = None
+        if self._stack_recorder is not None:
+            stacks = self._stack_recorder.remove()
+            self._stack_recorder = None
+        records = torch.autograd._disable_profiler()
+        memory_records = [] if self.profile_memory else None
+        if self.aggregate:
+            self._event_stats = _StreamingEventStats(self.trace_sample_size)
+            self._event_stats.add_trace(records, stacks, memory_records)
+            events = sorted(self._event_stats.sampled_events,
+                            key=lambda evt: [evt.cpu_interval.start, -evt.cpu_interval.end])
+        else:
+            events = parse_cpu_trace(records, stacks, memory_records)
+        if memory_records is not None:
+            self._memory_timeline = MemoryTimeline(memory_records)
+        self.function_events = EventList(
+            events,
+            use_cuda=self.use_cuda,
+            profile_memory=self.profile_memory)
 
     def __enter__(self):
         if not self.enabled:
@@ -299,21 +488,13 @@ class profile(object):
         if self.entered:
             raise RuntimeError("autograd profiler traces are not reentrant")
         self.entered = True
-        profiler_kind = torch.autograd.ProfilerState.CUDA if self.use_cuda \
-            else torch.autograd.ProfilerState.CPU
-
-        config = torch.autograd.ProfilerConfig(profiler_kind, self.record_shapes, self.profile_memory)
-        torch.autograd._enable_profiler(config)
+        self._start_trace()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if not self.enabled:
             return
-        records = torch.autograd._disable_profiler()
-        self.function_events = EventList(
-            parse_cpu_trace(records),
-            use_cuda=self.use_cuda,
-            profile_memory=self.profile_memory)
+        self._stop_trace()
         return False
 
     def __repr__(self):
@@ -324,6 +505,8 @@ class profile(object):
     def __str__(self):
         if self.function_events is None:
             return '<unfinished torch.autograd.profile>'
+        if self._event_stats is not None:
+            return str(self.key_averages())
         self.function_events.populate_cpu_children()
         return str(self.function_events)
 
@@ -334,22 +517,49 @@ class profile(object):
 
     def table(self, sort_by=None, row_limit=100, header=None):
         self._check_finish()
+        if self._event_stats is not None:
+            return self.key_averages().table(
+                sort_by=sort_by, row_limit=row_limit, header=header)
         return self.function_events.table(
             sort_by=sort_by, row_limit=row_limit, header=header)
     table.__doc__ = EventList.table.__doc__
 
     def export_chrome_trace(self, path):
         self._check_finish()
-        return self.function_events.export_chrome_trace(path)
+        return self.function_events.export_chrome_trace(path, self._memory_timeline)
     export_chrome_trace.__doc__ = EventList.export_chrome_trace.__doc__
 
-    def key_averages(self, group_by_input_shape=False):
+    def export_trace(self, path):
+        self._check_finish()
+        return self.function_events.export_trace(path)
+    export_trace.__doc__ = EventList.export_trace.__doc__
+
+    def memory_timeline(self):
+        """Returns the :class:`MemoryTimeline` of the allocations and frees of
+        the profile, which requires ``profile_memory=True``."""
+        self._check_finish()
+        if self._memory_timeline is None:
+            raise RuntimeError("memory timeline requires profile_memory=True")
+        return self._memory_timeline
+
+    def export_stacks(self, path, metric="self_cpu_time_total"):
+        self._check_finish()
+        return self.function_events.export_stacks(path, metric)
+    export_stacks.__doc__ = EventList.export_stacks.__doc__
+
+    def key_averages(self, group_by_input_shape=False, group_by_module=False):
         self._check_finish()
-        return self.function_events.key_averages(group_by_input_shape)
+        if self._event_stats is not None:
+            return self._event_stats.key_averages(
+                group_by_input_shape, group_by_module,
+                use_cuda=self.use_cuda, profile_memory=self.profile_memory)
+        return self.function_events.key_averages(group_by_input_shape, group_by_module)
     key_averages.__doc__ = EventList.key_averages.__doc__
 
     def total_average(self):
         self._check_finish()
+        if self._event_stats is not None:
+            return self.key_averages().total_average()
         return self.function_events.total_average()
     total_average.__doc__ = EventList.total_average.__doc__
 
@@ -359,9 +569,158 @@ class profile(object):
         all self times across all the events.
         """
         self._check_finish()
+        if self._event_stats is not None:
+            return self.key_averages().self_cpu_time_total
         return self.function_events.self_cpu_time_total
 
 
+class ProfilerAction(Enum):
+    """What :class:`scheduled_profile` does during a step."""
+    NONE = 0
+    WARMUP = 1
+    RECORD = 2
+    RECORD_AND_SAVE = 3
+
+
+def schedule(wait, warmup, active, repeat=0):
+    """Returns a schedule for :class:`scheduled_profile` that repeats cycles
+    of ``wait`` steps without profiling, ``warmup`` steps of profiling whose
+    results are discarded and ``active`` recorded steps. The trace of the
+    active steps is passed to ``on_trace_ready`` at the end of the cycle.
+
+    Arguments:
+        wait (int): number of steps without profiling at the start of a cycle.
+        warmup (int): number of steps that are profiled but not recorded, to
+            exclude the startup overhead of the profiler from the trace.
+        active (int): number of recorded steps.
+        repeat (int, optional): number of cycles, after which no step is
+            profiled. If ``0``, the cycles are repeated until the profiler
+            exits. Default: ``0``
+
+    Returns:
+        A callable that maps a step number to a :class:`ProfilerAction`.
+    """
+    if wait < 0 or warmup < 0 or active < 1 or repeat < 0:
+        raise ValueError("Invalid schedule: wait={}, warmup={}, active={}, repeat={}".format(
+            wait, warmup, active, repeat))
+    num_steps = wait + warmup + active
+
+    def schedule_fn(step):
+        if repeat > 0 and step // num_steps >= repeat:
+            return ProfilerAction.NONE
+        step_in_cycle = step % num_steps
+        if step_in_cycle < wait:
+            return ProfilerAction.NONE
+        if step_in_cycle < wait + warmup:
+            return ProfilerAction.WARMUP
+        if step_in_cycle < num_steps - 1:
+            return ProfilerAction.RECORD
+        return ProfilerAction.RECORD_AND_SAVE
+    return schedule_fn
+
+
+class scheduled_profile(profile):
+    """Context manager that profiles the steps of a long-running job according
+    to a schedule, such as the one returned by :func:`schedule`.
+
+    The job calls :meth:`step` at the end of every step, e.g. of every
+    training iteration. Before every step the schedule is called with the
+    number of the step, and the profiler is enabled or disabled accordingly.
+    At the end of a recorded period, :attr:`function_events` is set to the
+    events of the recorded steps and ``on_trace_ready`` is called with the
+    profiler, which can be summarized and exported like :class:`profile`. A
+    recording that is interrupted by the exit of the context manager is
+    passed to ``on_trace_ready`` as well.
+
+    Arguments:
+        schedule (callable): maps a step number, starting at ``0``, to a
+            :class:`ProfilerAction`.
+        on_trace_ready (callable, optional): called with the profiler every
+            time a trace is recorded. Default: ``None``
+        use_cuda, record_shapes, profile_memory, sampling_period, aggregate,
+            trace_sample_size, with_stack: see :class:`profile`.
+
+    Example:
+        >>> def trace_handler(prof):
+        >>>     print(prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=10))
+        >>>
+        >>> with torch.autograd.profiler.scheduled_profile(
+        >>>         torch.autograd.profiler.schedule(wait=100, warmup=1, active=5),
+        >>>         on_trace_ready=trace_handler) as prof:
+        >>>     for batch in loader:
+        >>>         train(batch)
+        >>>         prof.step()
+    """
+    def __init__(
+            self,
+            schedule,
+            on_trace_ready=None,
+            use_cuda=False,
+            record_shapes=False,
+            profile_memory=False,
+            sampling_period=1,
+            aggregate=False,
+            trace_sample_size=0,
+            with_stack=False):
+        super(scheduled_profile, self).__init__(
+            use_cuda=use_cuda,
+            record_shapes=record_shapes,
+            profile_memory=profile_memory,
+            sampling_period=sampling_period,
+            aggregate=aggregate,
+            trace_sample_size=trace_sample_size,
+            with_stack=with_stack)
+        self.schedule = schedule
+        self.on_trace_ready = on_trace_ready
+        self.step_num = 0
+        self.current_action = ProfilerAction.NONE
+
+    def __enter__(self):
+        if self.entered:
+            raise RuntimeError("autograd profiler traces are not reentrant")
+        self.entered = True
+        self.step_num = 0
+        self.current_action = self.schedule(self.step_num)
+        if self.current_action != ProfilerAction.NONE:
+            self._start_trace()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._transition(self.current_action, ProfilerAction.NONE)
+        self.current_action = ProfilerAction.NONE
+        self.entered = False
+        return False
+
+    def step(self):
+        """Signals the end of a step, and prepares the profiler for the next
+        one according to the schedule."""
+        prev_action = self.current_action
+        self.step_num += 1
+        self.current_action = self.schedule(self.step_num)
+        self._transition(prev_action, self.current_action)
+
+    def _transition(self, prev_action, action):
+        if prev_action == ProfilerAction.NONE:
+            if action != ProfilerAction.NONE:
+                self._start_trace()
+        elif prev_action == ProfilerAction.WARMUP:
+            if action != ProfilerAction.WARMUP:
+                # Discard the events of the warmup steps.
+                torch.autograd._disable_profiler()
+                if action != ProfilerAction.NONE:
+                    self._start_trace()
+        elif prev_action == ProfilerAction.RECORD_AND_SAVE or action not in (
+                ProfilerAction.RECORD, ProfilerAction.RECORD_AND_SAVE):
+            self._save_trace()
+            if action != ProfilerAction.NONE:
+                self._start_trace()
+
+    def _save_trace(self):
+        self._stop_trace()
+        if self.on_trace_ready is not None:
+            self.on_trace_ready(self)
+
+
 class record_function(ContextDecorator):
     """Context manager/function decorator that adds a label to a block of
     Python code (or function) when running autograd profiler. It is
@@ -437,6 +796,130 @@ class record_function(ContextDecorator):
         return profiled_future
 
 
+RangeStats = namedtuple('RangeStats', ['count', 'total_us', 'mean_us', 'min_us', 'max_us'])
+
+
+def enable_range_metrics(record_ops=False):
+    """Starts counting the calls and the wall time of the
+    :class:`record_function` ranges of all threads, by label, without running
+    the profiler. The counts are aggregated by every thread separately and
+    read with :func:`range_metrics_snapshot`.
+
+    This lets a long-running job such as a service keep track of the time
+    spent in each of its stages continuously, e.g. by labelling them with
+    :class:`record_function` and reporting the snapshots periodically with
+    :class:`RangeMetricsReporter`.
+
+    The first call registers global callbacks, which should be done before
+    other threads run operators. Later calls only switch the metrics on.
+
+    Arguments:
+        record_ops (bool, optional): also count the operators and autograd
+            functions run by the current thread and the threads it hands work
+            to, such as the autograd engine threads. Operators then go
+            through the profiling dispatch of the profiler, which adds
+            overhead to every call. Default: ``False``
+    """
+    torch.autograd._enable_range_metrics(record_ops)
+
+
+def disable_range_metrics():
+    """Stops counting the ranges enabled with :func:`enable_range_metrics`.
+    The counts aggregated so far are kept."""
+    torch.autograd._disable_range_metrics()
+
+
+def range_metrics_enabled():
+    """Returns whether the range metrics are enabled."""
+    return torch.autograd._range_metrics_enabled()
+
+
+def range_metrics_snapshot(reset=False):
+    """Returns the ranges counted since the metrics were enabled, or since
+    the last reset.
+
+    Arguments:
+        reset (bool, optional): restart the counts once they are read, so
+            that successive snapshots cover disjoint periods. Default: ``False``
+
+    Returns:
+        A dictionary from range labels to :class:`RangeStats` with the number
+        of calls of the range (``count``) and their total, mean, minimum and
+        maximum wall time in microseconds, sorted by decreasing total time.
+    """
+    snapshot = torch.autograd._range_metrics_snapshot(reset)
+    result = OrderedDict()
+    for name, stats in sorted(snapshot.items(), key=lambda kv: -kv[1].total_ns):
+        result[name] = RangeStats(
+            count=stats.count,
+            total_us=stats.total_ns / 1000.0,
+            mean_us=stats.total_ns / 1000.0 / stats.count,
+            min_us=stats.min_ns / 1000.0,
+            max_us=stats.max_ns / 1000.0)
+    return result
+
+
+class RangeMetricsReporter(object):
+    """Calls ``callback`` with the :func:`range_metrics_snapshot` of every
+    period of ``interval`` seconds, from a background thread. The counts are
+    reset after every snapshot, so there should be a single reporter.
+
+    Arguments:
+        interval (float): number of seconds between the snapshots.
+        callback (callable): called with the snapshot, e.g. to export it to
+            a monitoring system.
+
+    Example:
+        >>> torch.autograd.profiler.enable_range_metrics()
+        >>> def report(snapshot):
+        ...     for name, stats in snapshot.items():
+        ...         print("{}: {} calls, {:.1f}us mean".format(name, stats.count, stats.mean_us))
+        >>> with torch.autograd.profiler.RangeMetricsReporter(60, report):
+        ...     for request in requests:
+        ...         with torch.autograd.profiler.record_function("preprocess"):
+        ...             input = preprocess(request)
+        ...         with torch.autograd.profiler.record_function("model"):
+        ...             output = model(input)
+    """
+    def __init__(self, interval, callback):
+        if interval <= 0:
+            raise ValueError("Invalid interval value: {}".format(interval))
+        self.interval = interval
+        self.callback = callback
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError("range metrics reporter is already started")
+        self._stop_event.clear()
+        range_metrics_snapshot(reset=True)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the reporter, after reporting the last partial period."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.callback(range_metrics_snapshot(reset=True))
+        self.callback(range_metrics_snapshot(reset=True))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+
 class emit_nvtx(object):
     """Context manager that makes every autograd operation emit an NVTX range.
 
@@ -556,6 +1039,56 @@ def load_nvprof(path):
     return EventList(parse_nvprof_trace(path))
 
 
+def _iter_trace_records(f):
+    # Decoding the lines in batches, as elements of one JSON list, is much
+    # faster than decoding them one by one.
+    while True:
+        lines = list(itertools.islice(f, _TRACE_WRITE_BATCH_SIZE))
+        if not lines:
+            return
+        for record in json.loads("[" + ",".join(lines) + "]"):
+            yield record
+
+
+def load_trace(path):
+    """Opens a trace written by :meth:`EventList.export_trace`.
+
+    Arguments:
+        path (str): path to the trace
+    """
+    with _open_trace(path, 'r', compress=True) as f:
+        header = json.loads(f.readline())
+        if not isinstance(header, dict) or header.get("format") != _TRACE_FORMAT:
+            raise RuntimeError("{} is not a trace written by export_trace".format(path))
+        if header["version"] > _TRACE_VERSION:
+            raise RuntimeError("Unsupported trace version {}, expected at most {}".format(
+                header["version"], _TRACE_VERSION))
+        strings = []
+        events = []
+        for record in _iter_trace_records(f):
+            if record[0] == "s":
+                strings.append(record[1])
+                continue
+            (_, id, name, thread, cpu_start, cpu_end, input_shapes, cpu_memory_usage,
+             cuda_memory_usage, is_async, module_path, stack, kernels) = record
+            fe = FunctionEvent(
+                id=id,
+                name=strings[name],
+                thread=thread,
+                cpu_start=cpu_start,
+                cpu_end=cpu_end,
+                input_shapes=input_shapes,
+                cpu_memory_usage=cpu_memory_usage,
+                cuda_memory_usage=cuda_memory_usage,
+                is_async=is_async,
+                module_path=strings[module_path] if module_path >= 0 else None,
+                stack=[strings[frame] for frame in stack] if stack is not None else None)
+            for kernel_name, device, start, end in kernels:
+                fe.append_kernel(strings[kernel_name], device, start, end)
+            events.append(fe)
+    return EventList(events, use_cuda=header["use_cuda"], profile_memory=header["profile_memory"])
+
+
 ################################################################################
 # FunctionEvent
 
@@ -625,13 +1158,18 @@ class Interval(object):
 
 
 Kernel = namedtuple('Kernel', ['name', 'device', 'interval'])
+# An allocation (positive nbytes) or free (negative nbytes) of the block at
+# address ptr, with the names of the ranges open on the thread at the time.
+MemoryRecord = namedtuple('MemoryRecord', ['time', 'ptr', 'nbytes', 'device', 'thread', 'ranges'])
+MemoryOpStats = namedtuple('MemoryOpStats', ['ranges', 'allocated', 'num_allocations', 'live_at_peak'])
 
 
 class FunctionEvent(FormattedTimesMixin):
     """Profiling information about a single function."""
     def __init__(
             self, id, name, thread, cpu_start, cpu_end, input_shapes=None,
-            cpu_memory_usage=0, cuda_memory_usage=0, is_async=False):
+            cpu_memory_usage=0, cuda_memory_usage=0, is_async=False,
+            module_path=None, stack=None):
         self.id = id
         self.name = name
         self.cpu_interval = Interval(cpu_start, cpu_end)
@@ -643,6 +1181,9 @@ class FunctionEvent(FormattedTimesMixin):
         self.cpu_memory_usage = cpu_memory_usage
         self.cuda_memory_usage = cuda_memory_usage
         self.is_async = is_async
+        self.module_path = module_path
+        self.stack = stack
+        self.cpu_parent = None
 
     def append_kernel(self, name, device, start, end):
         self.kernels.append(Kernel(name, device, Interval(start, end)))
@@ -655,6 +1196,7 @@ class FunctionEvent(FormattedTimesMixin):
         """
         assert(isinstance(child, FunctionEvent))
         self.cpu_children.append(child)
+        child.cpu_parent = self
 
     # Note: async events don't have children, are not used when computing 'self'
     # metrics of other events, have only total cpu time
@@ -699,7 +1241,7 @@ class FunctionEvent(FormattedTimesMixin):
         return (
             '<FunctionEvent id={} cpu_time={} cpu_start={} cpu_end={} '
             'cpu_children={} cuda_time={} name={} thread={} input_shapes={} '
-            'cpu_memory_usage={} cuda_memory_usage={} is_async={}>'.format(
+            'cpu_memory_usage={} cuda_memory_usage={} is_async={} module_path={}>'.format(
                 self.id,
                 self.cpu_time_str,
                 self.cpu_interval.start,
@@ -712,6 +1254,7 @@ class FunctionEvent(FormattedTimesMixin):
                 self.cpu_memory_usage,
                 self.cuda_memory_usage,
                 self.is_async,
+                self.module_path,
             )
         )
 
@@ -729,17 +1272,21 @@ class FunctionEventAvg(FormattedTimesMixin):
         self.cuda_memory_usage = 0
         self.self_cpu_memory_usage = 0
         self.self_cuda_memory_usage = 0
+        self.module_path = None
 
-    def add(self, other, group_by_input_shapes=False):
+    def add(self, other, group_by_input_shapes=False, group_by_module=False):
         if self.key is None:
             self.key = other.key
             if group_by_input_shapes:
                 self.input_shapes = other.input_shapes
+            if group_by_module:
+                self.module_path = other.module_path
 
         assert (
             not group_by_input_shapes or
             other.input_shapes == self.input_shapes
         )
+        assert not group_by_module or other.module_path == self.module_path
         assert isinstance(other, (FunctionEvent, FunctionEventAvg))
         assert other.key == self.key
         self.cpu_time_total += other.cpu_time_total
@@ -771,6 +1318,132 @@ class FunctionEventAvg(FormattedTimesMixin):
         )
 
 
+class MemoryTimeline(object):
+    """Memory usage over time of a profile run with ``profile_memory=True``,
+    built from the allocations and frees recorded by the profiler.
+
+    Usage is counted from the start of the profile, per device type
+    (``'cpu'`` or ``'cuda'``, summed over all CUDA devices): blocks that were
+    allocated before the profile started and freed during it make the usage
+    negative. The memory allocated by an op is attributed to the ranges that
+    were open on the thread when it was allocated, from the outermost
+    ``record_function`` or module down to the innermost op, e.g.
+    ``('root', 'mul', 'empty')``. Blocks are tracked by their address, so
+    allocations that are live at the peak correspond to the storages of the
+    tensors that were alive at that time.
+    """
+    def __init__(self, records):
+        self.records = sorted(records, key=attrgetter('time'))
+        # device -> peak usage, and index in records of the record that
+        # reached it
+        self._peaks = defaultdict(int)
+        self._peak_indices = {}
+        usage = defaultdict(int)
+        for index, record in enumerate(self.records):
+            usage[record.device] += record.nbytes
+            if usage[record.device] > self._peaks[record.device]:
+                self._peaks[record.device] = usage[record.device]
+                self._peak_indices[record.device] = index
+
+    @property
+    def devices(self):
+        """Device types that have memory records, e.g. ``['cpu', 'cuda']``."""
+        return sorted(set(record.device for record in self.records))
+
+    def usage(self, device='cpu'):
+        """Returns the list of ``(time, usage)`` pairs after every allocation
+        and free on ``device``, with the time in microseconds since the start
+        of the profile and the usage in bytes."""
+        result = []
+        total = 0
+        for record in self.records:
+            if record.device == device:
+                total += record.nbytes
+                result.append((record.time, total))
+        return result
+
+    def peak_usage(self, device='cpu'):
+        """Returns the highest usage of ``device`` in bytes."""
+        return self._peaks.get(device, 0)
+
+    def peak_time(self, device='cpu'):
+        """Returns the time in microseconds since the start of the profile at
+        which the usage of ``device`` peaked, or ``None`` if it never exceeded
+        the usage at the start."""
+        index = self._peak_indices.get(device)
+        return self.records[index].time if index is not None else None
+
+    def live_at_peak(self, device='cpu'):
+        """Returns the MemoryRecords of the allocations on ``device`` that
+        were not freed at the peak, the largest first."""
+        index = self._peak_indices.get(device)
+        if index is None:
+            return []
+        live = {}
+        for record in self.records[:index + 1]:
+            if record.device != device:
+                continue
+            if record.nbytes > 0:
+                live[record.ptr] = record
+            else:
+                live.pop(record.ptr, None)
+        return sorted(live.values(), key=attrgetter('nbytes'), reverse=True)
+
+    def top_allocating_ops(self, device='cpu', row_limit=10):
+        """Returns MemoryOpStats for the ``row_limit`` range stacks that
+        allocated the most memory on ``device``, with the total number of
+        bytes they allocated, the number of their allocations and the number
+        of bytes of their allocations that were live at the peak."""
+        stats = OrderedDict()
+        for record in self.records:
+            if record.device == device and record.nbytes > 0:
+                allocated, num_allocations = stats.get(record.ranges, (0, 0))
+                stats[record.ranges] = (allocated + record.nbytes, num_allocations + 1)
+        live_at_peak = defaultdict(int)
+        for record in self.live_at_peak(device):
+            live_at_peak[record.ranges] += record.nbytes
+        result = [MemoryOpStats(ranges, allocated, num_allocations, live_at_peak[ranges])
+                  for ranges, (allocated, num_allocations) in stats.items()]
+        result.sort(key=attrgetter('allocated'), reverse=True)
+        return result[:row_limit] if row_limit >= 0 else result
+
+    def table(self, device='cpu', row_limit=10):
+        """Prints the peak usage of ``device`` and the ops that allocated the
+        most memory on it as a nicely formatted table.
+
+        Returns:
+            A string containing the table.
+        """
+        MAX_RANGES_COLUMN_WIDTH = 80
+
+        header = 'Peak {} memory usage: {}'.format(
+            device.upper(), format_memory(self.peak_usage(device)))
+        peak_time = self.peak_time(device)
+        if peak_time is not None:
+            header += ' at {}'.format(format_time(peak_time))
+        rows = [(' > '.join(stats.ranges) or '[no range]',
+                 format_memory(stats.allocated),
+                 str(stats.num_allocations),
+                 format_memory(stats.live_at_peak))
+                for stats in self.top_allocating_ops(device, row_limit)]
+        headers = ['Ranges', 'Allocated', 'Allocations', 'Live at peak']
+        name_width = max([len(headers[0])] + [len(row[0]) for row in rows])
+        name_width = min(name_width, MAX_RANGES_COLUMN_WIDTH)
+        row_format = '{:<' + str(name_width + 2) + '}' + '{:>15}' * 3
+        line = '-' * (name_width + 2 + 15 * 3)
+        result = [header, line, row_format.format(*headers), line]
+        for row in rows:
+            ranges = row[0]
+            if len(ranges) > name_width:
+                ranges = '...' + ranges[-(name_width - 3):]
+            result.append(row_format.format(ranges, *row[1:]))
+        result.append(line)
+        return '\n'.join(result)
+
+    def __str__(self):
+        return '\n\n'.join(self.table(device) for device in self.devices)
+
+
 ################################################################################
 # Utilities
 
@@ -780,15 +1453,140 @@ class StringTable(defaultdict):
         return self[key]
 
 
+class _JSONStringTable(defaultdict):
+    def __missing__(self, key):
+        self[key] = json.dumps(key)
+        return self[key]
+
+
+_TRACE_FORMAT = "torch.autograd.profiler"
+_TRACE_VERSION = 1
+_TRACE_WRITE_BATCH_SIZE = 10000
+# Faster than the default level 9, for traces only slightly larger.
+_TRACE_COMPRESS_LEVEL = 6
+
+
+def _open_trace(path, mode, compress=None):
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, mode + 't', compresslevel=_TRACE_COMPRESS_LEVEL)
+    return open(path, mode)
+
+
+_MODULE_RANGE_PREFIX = "nn.Module: "
+# Separates the path of a module from the id of its call stack in the names
+# of the ranges recorded by _ModuleStackRecorder.
+_STACK_ID_SEPARATOR = "\x1f"
+
+
+class _ModuleStackRecorder(object):
+    """Runs every ``nn.Module`` call in a range named after the path of the
+    module, and interns the Python call stacks of the calls. The names of the
+    ranges carry the index of the stack in :attr:`stacks`."""
+    def __init__(self):
+        from torch.nn.modules import module
+        self._module_file = module.__file__
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._child_names = {}
+        self._frame_names = {}
+        self._stack_ids = {}
+        self.stacks = []
+        self._handles = [
+            module.register_module_forward_pre_hook(self._pre_hook),
+            module.register_module_forward_hook(self._hook),
+        ]
+
+    def remove(self):
+        for handle in self._handles:
+            handle.remove()
+        return self.stacks
+
+    def _modules(self):
+        modules = getattr(self._local, "modules", None)
+        if modules is None:
+            modules = self._local.modules = []
+        return modules
+
+    def _child_name(self, parent, child):
+        key = (id(parent), id(child))
+        name = self._child_names.get(key)
+        if name is None:
+            name = next((name for name, m in parent._modules.items() if m is child),
+                        type(child).__name__)
+            self._child_names[key] = name
+        return name
+
+    def _stack_id(self, frame):
+        # Module.__call__ frames are skipped, the calling forward() of the
+        # parent modules are kept.
+        key = []
+        while frame is not None:
+            if frame.f_code.co_filename != self._module_file:
+                key.append((frame.f_code, frame.f_lineno))
+            frame = frame.f_back
+        key = tuple(key)
+        stack_id = self._stack_ids.get(key)
+        if stack_id is None:
+            with self._lock:
+                stack_id = self._stack_ids.get(key)
+                if stack_id is None:
+                    stack = []
+                    for code, lineno in reversed(key):
+                        frame_key = (code, lineno)
+                        if frame_key not in self._frame_names:
+                            self._frame_names[frame_key] = "{}({}): {}".format(
+                                code.co_filename, lineno, code.co_name)
+                        stack.append(self._frame_names[frame_key])
+                    stack_id = len(self.stacks)
+                    self.stacks.append(stack)
+                    self._stack_ids[key] = stack_id
+        return stack_id
+
+    def _pre_hook(self, module, input):
+        modules = self._modules()
+        if modules:
+            parent, parent_path, _ = modules[-1]
+            path = parent_path + "." + self._child_name(parent, module)
+        else:
+            path = type(module).__name__
+        name = "{}{}{}{}".format(
+            _MODULE_RANGE_PREFIX, path, _STACK_ID_SEPARATOR, self._stack_id(sys._getframe(1)))
+        modules.append((module, path, torch.ops.profiler._record_function_enter(name)))
+
+    def _hook(self, module, input, output):
+        modules = self._modules()
+        # The ranges of modules whose forward raised were not closed.
+        while modules:
+            entered_module, _, handle = modules.pop()
+            if entered_module is module:
+                torch.ops.profiler._record_function_exit(handle)
+                break
+
+
 ################################################################################
 # CPU checkpoints
 
-def parse_cpu_trace(thread_records):
-    next_id = 0
+def _iter_cpu_trace(thread_records, stacks=None, memory_records=None):
+    """Yields the FunctionEvents of a CPU trace as their ranges end, together
+    with the CPU time, CPU memory and CUDA memory used by their direct
+    children, without keeping the events.
+
+    The children of a range are the ranges that start and end while it is
+    the innermost open range of its thread, as in
+    :meth:`EventList.populate_cpu_children`. The usage of the children of
+    async ranges is attributed to their enclosing range.
+
+    ``stacks`` are the call stacks recorded by a _ModuleStackRecorder. Every
+    event gets the module path and call stack of the innermost module range
+    it is nested in.
+
+    If ``memory_records`` is a list, a MemoryRecord is appended to it for
+    every allocation and free of the trace.
+    """
     start_record = None
     cuda_records = {}
-    functions = []
-    record_stack = []
     string_table = StringTable()
 
     # ignoring the following utility ops
@@ -825,6 +1623,14 @@ def parse_cpu_trace(thread_records):
         cuda_memory_allocs = {}
         # ranges per handle
         range_starts = {}
+        # usage of the direct children per handle, and open ranges in the
+        # order they started
+        children_usage = {}
+        open_handles = []
+        # (module path, stack) per handle
+        module_contexts = {}
+        # names of the ranges per handle
+        range_names = {}
 
         filtered_handles = set()
         prev_record = None
@@ -843,9 +1649,23 @@ def parse_cpu_trace(thread_records):
                         filtered_handles.add(record.handle())
                         continue
 
+                name = record.name()
+                if name.startswith(_MODULE_RANGE_PREFIX) and _STACK_ID_SEPARATOR in name:
+                    path, stack_id = name[len(_MODULE_RANGE_PREFIX):].split(_STACK_ID_SEPARATOR)
+                    stack = stacks[int(stack_id)] if stacks is not None else None
+                    module_contexts[record.handle()] = (path, stack)
+                    name = _MODULE_RANGE_PREFIX + path
+                elif open_handles:
+                    module_contexts[record.handle()] = module_contexts[open_handles[-1]]
+                else:
+                    module_contexts[record.handle()] = (None, None)
+
+                range_names[record.handle()] = string_table[name]
                 range_starts[record.handle()] = record
                 cpu_memory_allocs[record.handle()] = 0
                 cuda_memory_allocs[record.handle()] = 0
+                children_usage[record.handle()] = [0, 0, 0]
+                open_handles.append(record.handle())
             elif record.kind() == 'pop':
                 assert record.handle() in range_starts
 
@@ -854,17 +1674,20 @@ def parse_cpu_trace(thread_records):
                 cpu_memory_usage = cpu_memory_allocs[record.handle()]
                 cuda_memory_usage = cuda_memory_allocs[record.handle()]
                 is_async = start.thread_id() != record.thread_id()
+                module_path, stack = module_contexts.pop(record.handle())
 
                 fe = FunctionEvent(
                     id=record.handle(),
-                    name=string_table[start.name()],
+                    name=range_names.pop(record.handle()),
                     thread=start.thread_id(),
                     cpu_start=start_record.cpu_elapsed_us(start),
                     cpu_end=start_record.cpu_elapsed_us(record),
                     input_shapes=start.shapes(),
                     cpu_memory_usage=cpu_memory_usage,
                     cuda_memory_usage=cuda_memory_usage,
-                    is_async=is_async)
+                    is_async=is_async,
+                    module_path=module_path,
+                    stack=stack)
                 # note: async events have only cpu total time
                 if not is_async and start.has_cuda():
                     cuda_start = adjusted_time(start)
@@ -874,7 +1697,19 @@ def parse_cpu_trace(thread_records):
                         start.device(),
                         cuda_start,
                         cuda_end)
-                functions.append(fe)
+
+                usage = children_usage.pop(record.handle())
+                index = open_handles.index(record.handle())
+                del open_handles[index]
+                if index > 0:
+                    parent_usage = children_usage[open_handles[index - 1]]
+                    if is_async:
+                        own_usage = usage
+                    else:
+                        own_usage = (fe.cpu_time_total, cpu_memory_usage, cuda_memory_usage)
+                    for i, value in enumerate(own_usage):
+                        parent_usage[i] += value
+                yield fe, usage
                 del range_starts[record.handle()]
                 del cpu_memory_allocs[record.handle()]
                 del cuda_memory_allocs[record.handle()]
@@ -883,8 +1718,24 @@ def parse_cpu_trace(thread_records):
                     cpu_memory_allocs[handle] += record.cpu_memory_usage()
                 for handle in cuda_memory_allocs.keys():
                     cuda_memory_allocs[handle] += record.cuda_memory_usage()
+                if memory_records is not None:
+                    if record.cuda_memory_usage() != 0:
+                        device, nbytes = 'cuda', record.cuda_memory_usage()
+                    else:
+                        device, nbytes = 'cpu', record.cpu_memory_usage()
+                    memory_records.append(MemoryRecord(
+                        time=start_record.cpu_elapsed_us(record),
+                        ptr=record.memory_ptr(),
+                        nbytes=nbytes,
+                        device=device,
+                        thread=record.thread_id(),
+                        ranges=tuple(range_names[handle] for handle in open_handles)))
             prev_record = record
 
+
+def parse_cpu_trace(thread_records, stacks=None, memory_records=None):
+    functions = [fe for fe, _ in _iter_cpu_trace(thread_records, stacks, memory_records)]
+
     # Sort functions by start time then by end time ascending.
     # This ensures that--in the case of nested events which
     # have the same start time (which may happen due to the
@@ -895,6 +1746,62 @@ def parse_cpu_trace(thread_records):
     return functions
 
 
+class _StreamingEventStats(object):
+    """Folds the events of CPU traces into FunctionEventAvg buckets keyed by
+    name, input shapes and module path as they are parsed, and keeps a
+    uniform reservoir sample of at most ``max_events`` raw events."""
+    def __init__(self, max_events=0):
+        self.max_events = max_events
+        self.num_events = 0
+        self.stats = {}
+        self.sampled_events = []
+        self._random = random.Random()
+
+    def add_trace(self, thread_records, stacks=None, memory_records=None):
+        for event, children_usage in _iter_cpu_trace(thread_records, stacks, memory_records):
+            self.add(event, children_usage)
+
+    def add(self, event, children_usage):
+        key = (event.key, str(event.input_shapes), event.module_path)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = FunctionEventAvg()
+            stats.key = event.key
+            stats.input_shapes = event.input_shapes
+            stats.module_path = event.module_path
+        stats.count += 1
+        stats.cpu_time_total += event.cpu_time_total
+        stats.cuda_time_total += event.cuda_time_total
+        stats.cpu_memory_usage += event.cpu_memory_usage
+        stats.cuda_memory_usage += event.cuda_memory_usage
+        # note: async events have no self time nor self memory usage
+        if not event.is_async:
+            stats.self_cpu_time_total += event.cpu_time_total - children_usage[0]
+            stats.self_cpu_memory_usage += event.cpu_memory_usage - children_usage[1]
+            stats.self_cuda_memory_usage += event.cuda_memory_usage - children_usage[2]
+
+        self.num_events += 1
+        if len(self.sampled_events) < self.max_events:
+            self.sampled_events.append(event)
+        elif self.max_events > 0:
+            index = self._random.randrange(self.num_events)
+            if index < self.max_events:
+                self.sampled_events[index] = event
+
+    def key_averages(self, group_by_input_shapes=False, group_by_module=False,
+                     use_cuda=True, profile_memory=False):
+        averages = OrderedDict()
+        for stats in self.stats.values():
+            key = (stats.key,
+                   str(stats.input_shapes) if group_by_input_shapes else None,
+                   stats.module_path if group_by_module else None)
+            if key not in averages:
+                averages[key] = FunctionEventAvg()
+            averages[key].add(stats, group_by_input_shapes, group_by_module)
+        averages = list(averages.values())
+        return EventList(averages, use_cuda=use_cuda, profile_memory=profile_memory)
+
+
 ################################################################################
 # CUDA checkpoints
 
@@ -994,9 +1901,12 @@ def build_table(
 
     has_input_shapes = any(
         [event.input_shapes is not None for event in events])
+    has_module_paths = any(
+        [event.module_path is not None for event in events])
     name_column_width = max([len(evt.key) for evt in events]) + 4
     DEFAULT_COLUMN_WIDTH = 15
     SHAPES_COLUMN_WIDTH = 35
+    MODULE_COLUMN_WIDTH = 45
 
     headers = [
         'Name',
@@ -1044,6 +1954,9 @@ def build_table(
     if has_input_shapes:
         headers.append('Input Shapes')
         add_column(SHAPES_COLUMN_WIDTH)
+    if has_module_paths:
+        headers.append('Module')
+        add_column(MODULE_COLUMN_WIDTH)
 
     row_format = row_format[0]
     header_sep = header_sep[0]
@@ -1107,6 +2020,9 @@ def build_table(
         )
         if has_input_shapes:
             row_values.append(str(evt.input_shapes)[:SHAPES_COLUMN_WIDTH])
+        if has_module_paths:
+            # Keep the innermost modules of long paths
+            row_values.append((evt.module_path or '')[-MODULE_COLUMN_WIDTH:])
         append(row_format.format(*row_values))
 
     append(header_sep)
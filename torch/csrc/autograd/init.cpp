@@ -37,7 +37,12 @@ PyObject* THPAutograd_initExtension(PyObject* _unused, PyObject *unused) {
       .value("NVTX", ProfilerState::NVTX);
 
   py::class_<ProfilerConfig>(m, "ProfilerConfig")
-      .def(py::init<ProfilerState, bool, bool>());
+      .def(
+          py::init<ProfilerState, bool, bool, uint64_t>(),
+          py::arg("state"),
+          py::arg("report_input_shapes"),
+          py::arg("profile_memory"),
+          py::arg("sampling_period") = 1);
 
   py::class_<Event>(m, "ProfilerEvent")
       .def("kind", &Event::kind)
@@ -50,12 +55,24 @@ PyObject* THPAutograd_initExtension(PyObject* _unused, PyObject *unused) {
       .def("shapes", &Event::shapes)
       .def("cpu_memory_usage", &Event::cpu_memory_usage)
       .def("cuda_memory_usage", &Event::cuda_memory_usage)
+      .def("memory_ptr", &Event::memory_ptr)
       .def("handle", &Event::handle);
 
   m.def("_enable_profiler", enableProfiler);
   m.def("_disable_profiler", disableProfiler);
   m.def("_profiler_enabled", profilerEnabled);
 
+  py::class_<RangeStats>(m, "_RangeStats")
+      .def_readonly("count", &RangeStats::count)
+      .def_readonly("total_ns", &RangeStats::total_ns)
+      .def_readonly("min_ns", &RangeStats::min_ns)
+      .def_readonly("max_ns", &RangeStats::max_ns);
+
+  m.def("_enable_range_metrics", enableRangeMetrics, py::arg("record_ops") = false);
+  m.def("_disable_range_metrics", disableRangeMetrics);
+  m.def("_range_metrics_enabled", rangeMetricsEnabled);
+  m.def("_range_metrics_snapshot", rangeMetricsSnapshot, py::arg("reset") = false);
+
   Py_RETURN_TRUE;
 }
 
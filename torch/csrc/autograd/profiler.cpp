@@ -7,11 +7,13 @@
 #include <ATen/core/op_registration/op_registration.h>
 #include <torch/library.h>
 
+#include <atomic>
 #include <fstream>
 #include <list>
 #include <mutex>
 #include <sstream>
 #include <string>
+#include <unordered_map>
 #include <vector>
 
 #include <ATen/record_function.h>
@@ -210,8 +212,34 @@ struct ProfilerThreadLocalState
     return handle_;
   }
 
+  // Returns whether a range starting on the given thread is recorded when
+  // sampling top-level ranges. Nested ranges share the decision of their
+  // top-level range.
+  bool sampleRangeStart(uint64_t thread_id) {
+    std::lock_guard<std::mutex> guard(state_mutex_);
+    auto& sampling = sampling_states_[thread_id];
+    if (sampling.depth++ == 0) {
+      sampling.recorded =
+          sampling.num_top_level_ranges++ % config_.sampling_period == 0;
+    }
+    return sampling.recorded;
+  }
+
+  // Returns whether a range that started on the given thread was recorded.
+  // Async ranges end on another thread, so the state is kept per start
+  // thread rather than in thread local variables.
+  bool sampleRangeEnd(uint64_t thread_id) {
+    std::lock_guard<std::mutex> guard(state_mutex_);
+    auto& sampling = sampling_states_[thread_id];
+    bool recorded = sampling.recorded;
+    if (sampling.depth > 0) {
+      --sampling.depth;
+    }
+    return recorded;
+  }
+
   void reportMemoryUsage(
-      void* /* unused */, int64_t alloc_size, c10::Device device) override {
+      void* ptr, int64_t alloc_size, c10::Device device) override {
     if (config_.profile_memory && config_.state != ProfilerState::Disabled) {
       uint64_t thread_id = at::RecordFunction::currentThreadId();
       Event evt(
@@ -219,7 +247,7 @@ struct ProfilerThreadLocalState
           at::StringView(""),
           thread_id,
           config_.state == ProfilerState::CUDA);
-      evt.updateMemoryStats(alloc_size, device);
+      evt.updateMemoryStats(ptr, alloc_size, device);
       getEventList(thread_id).record(evt);
     }
   }
@@ -287,6 +315,13 @@ struct ProfilerThreadLocalState
   std::unordered_map<uint64_t, std::shared_ptr<RangeEventList>>
       event_lists_map_;
 
+  struct SamplingState {
+    uint64_t depth = 0;
+    uint64_t num_top_level_ranges = 0;
+    bool recorded = true;
+  };
+  std::unordered_map<uint64_t, SamplingState> sampling_states_;
+
   ProfilerConfig config_ = ProfilerConfig(ProfilerState::Disabled, false, false);
   at::CallbackHandle handle_ = 0;
 };
@@ -305,6 +340,10 @@ void pushProfilingCallbacks() {
         if (!state_ptr || state_ptr->config().state == ProfilerState::Disabled) {
           return;
         }
+        if (state_ptr->config().sampling_period > 1 &&
+            !state_ptr->sampleRangeStart(fn.getStartCallbacksThreadId())) {
+          return;
+        }
 
         auto* msg = (fn.seqNr() >= 0) ? ", seq = " : "";
         if (state_ptr->config().report_input_shapes) {
@@ -333,6 +372,10 @@ void pushProfilingCallbacks() {
         if (!state_ptr || state_ptr->config().state == ProfilerState::Disabled) {
           return;
         }
+        if (state_ptr->config().sampling_period > 1 &&
+            !state_ptr->sampleRangeEnd(fn.getStartCallbacksThreadId())) {
+          return;
+        }
         state_ptr->popRange(fn.getStartCallbacksThreadId(), fn.handle());
       })
     .needsInputs(state_ptr->config().report_input_shapes)
@@ -361,6 +404,8 @@ bool profilerEnabled() {
 void enableProfiler(const ProfilerConfig& new_config) {
   TORCH_CHECK(new_config.state != ProfilerState::NVTX || cuda_stubs->enabled(),
     "Can't use NVTX profiler - PyTorch was compiled without CUDA");
+  TORCH_CHECK(new_config.sampling_period >= 1,
+    "Profiler sampling period should be at least 1");
 
   auto state_ptr = getProfilerTLSState();
   TORCH_CHECK(!state_ptr, "Profiler is already enabled on this thread");
@@ -410,6 +455,170 @@ thread_event_lists disableProfiler() {
   return state_ptr->consolidate();
 }
 
+namespace {
+
+// Stats and pending range starts of one thread. The mutex is only contended
+// when a snapshot is taken, or when a range ends on another thread than it
+// started on (e.g. with _call_end_callbacks_on_future).
+struct ThreadRangeMetrics {
+  std::mutex mutex;
+  range_stats_map stats;
+  std::unordered_map<at::RecordFunctionHandle, int64_t> starts;
+};
+
+struct RangeMetricsRegistry {
+  std::mutex mutex;
+  // By RecordFunction thread id
+  std::unordered_map<uint64_t, std::shared_ptr<ThreadRangeMetrics>> threads;
+  // Stats of the threads that exited
+  range_stats_map retired;
+};
+
+RangeMetricsRegistry& rangeMetricsRegistry() {
+  // Leaked, as threads can exit during static destruction
+  static auto* registry = new RangeMetricsRegistry();
+  return *registry;
+}
+
+void mergeRangeStats(range_stats_map& into, const range_stats_map& stats) {
+  for (const auto& kv : stats) {
+    into[kv.first].merge(kv.second);
+  }
+}
+
+struct ThreadRangeMetricsHolder {
+  ~ThreadRangeMetricsHolder() {
+    if (!metrics) {
+      return;
+    }
+    auto& registry = rangeMetricsRegistry();
+    std::lock_guard<std::mutex> guard(registry.mutex);
+    registry.threads.erase(thread_id);
+    std::lock_guard<std::mutex> metrics_guard(metrics->mutex);
+    mergeRangeStats(registry.retired, metrics->stats);
+  }
+
+  uint64_t thread_id = 0;
+  std::shared_ptr<ThreadRangeMetrics> metrics;
+};
+
+ThreadRangeMetrics& threadRangeMetrics() {
+  static thread_local ThreadRangeMetricsHolder holder;
+  if (!holder.metrics) {
+    holder.thread_id = at::RecordFunction::currentThreadId();
+    holder.metrics = std::make_shared<ThreadRangeMetrics>();
+    auto& registry = rangeMetricsRegistry();
+    std::lock_guard<std::mutex> guard(registry.mutex);
+    registry.threads[holder.thread_id] = holder.metrics;
+  }
+  return *holder.metrics;
+}
+
+std::shared_ptr<ThreadRangeMetrics> findThreadRangeMetrics(uint64_t thread_id) {
+  auto& registry = rangeMetricsRegistry();
+  std::lock_guard<std::mutex> guard(registry.mutex);
+  auto it = registry.threads.find(thread_id);
+  return it != registry.threads.end() ? it->second : nullptr;
+}
+
+void rangeMetricsStart(const at::RecordFunction& fn) {
+  auto& metrics = threadRangeMetrics();
+  std::lock_guard<std::mutex> guard(metrics.mutex);
+  metrics.starts[fn.handle()] = getTime();
+}
+
+void rangeMetricsEnd(const at::RecordFunction& fn) {
+  auto end = getTime();
+  auto& metrics = threadRangeMetrics();
+  int64_t start = 0;
+  if (fn.getStartCallbacksThreadId() == at::RecordFunction::currentThreadId()) {
+    std::lock_guard<std::mutex> guard(metrics.mutex);
+    auto it = metrics.starts.find(fn.handle());
+    if (it == metrics.starts.end()) {
+      return;
+    }
+    start = it->second;
+    metrics.starts.erase(it);
+  } else {
+    auto start_metrics = findThreadRangeMetrics(fn.getStartCallbacksThreadId());
+    if (!start_metrics) {
+      return;
+    }
+    std::lock_guard<std::mutex> guard(start_metrics->mutex);
+    auto it = start_metrics->starts.find(fn.handle());
+    if (it == start_metrics->starts.end()) {
+      return;
+    }
+    start = it->second;
+    start_metrics->starts.erase(it);
+  }
+  std::lock_guard<std::mutex> guard(metrics.mutex);
+  metrics.stats[fn.name().str()].add(end - start);
+}
+
+std::atomic<bool> range_metrics_enabled{false};
+std::atomic<bool> range_metrics_record_ops{false};
+
+} // namespace
+
+void enableRangeMetrics(bool record_ops) {
+  static std::once_flag callbacks_registered;
+  std::call_once(callbacks_registered, []() {
+    at::addGlobalCallback(at::RecordFunctionCallback(
+        &rangeMetricsStart, &rangeMetricsEnd)
+        .needsIds(true)
+        .scopes({at::RecordScope::USER_SCOPE})
+        .setShouldRun([](const at::RecordFunctionCallback&) {
+          return range_metrics_enabled.load(std::memory_order_relaxed);
+        }));
+    at::addGlobalCallback(at::RecordFunctionCallback(
+        &rangeMetricsStart, &rangeMetricsEnd)
+        .needsIds(true)
+        .scopes({at::RecordScope::FUNCTION, at::RecordScope::TORCHSCRIPT_FUNCTION})
+        .setShouldRun([](const at::RecordFunctionCallback&) {
+          return range_metrics_enabled.load(std::memory_order_relaxed) &&
+              range_metrics_record_ops.load(std::memory_order_relaxed);
+        }));
+  });
+  range_metrics_record_ops = record_ops;
+  range_metrics_enabled = true;
+  if (record_ops) {
+    // Ops only create RecordFunctions on the threads with RecordFunction
+    // enabled, i.e. this thread and the threads it propagates its thread
+    // local state to, such as autograd and at::launch threads.
+    at::enableRecordFunction(true);
+  }
+}
+
+void disableRangeMetrics() {
+  if (range_metrics_record_ops && !profilerEnabled()) {
+    at::enableRecordFunction(false);
+  }
+  range_metrics_enabled = false;
+  range_metrics_record_ops = false;
+}
+
+bool rangeMetricsEnabled() {
+  return range_metrics_enabled.load(std::memory_order_relaxed);
+}
+
+range_stats_map rangeMetricsSnapshot(bool reset) {
+  auto& registry = rangeMetricsRegistry();
+  std::lock_guard<std::mutex> guard(registry.mutex);
+  range_stats_map snapshot = registry.retired;
+  if (reset) {
+    registry.retired.clear();
+  }
+  for (auto& kv : registry.threads) {
+    std::lock_guard<std::mutex> metrics_guard(kv.second->mutex);
+    mergeRangeStats(snapshot, kv.second->stats);
+    if (reset) {
+      kv.second->stats.clear();
+    }
+  }
+  return snapshot;
+}
+
 void Event::record(bool record_cuda) {
   if (record_cuda) {
     cuda_stubs->record(&device_, &cuda_event, &cpu_ns_);
@@ -9,6 +9,9 @@
 #include <sstream>
 #include <forward_list>
 #include <tuple>
+#include <unordered_map>
+#include <limits>
+#include <algorithm>
 #include <ATen/ATen.h>
 #include <torch/csrc/WindowsTorchApiMacro.h>
 #ifndef _WIN32
@@ -104,14 +107,19 @@ struct TORCH_API ProfilerConfig {
   ProfilerConfig(
       ProfilerState state,
       bool report_input_shapes,
-      bool profile_memory)
+      bool profile_memory,
+      uint64_t sampling_period = 1)
       : state(state),
         report_input_shapes(report_input_shapes),
-        profile_memory(profile_memory) {}
+        profile_memory(profile_memory),
+        sampling_period(sampling_period) {}
   ~ProfilerConfig();
   ProfilerState state;
   bool report_input_shapes;
   bool profile_memory;
+  // Record only one in sampling_period top-level ranges of every thread,
+  // together with all their nested ranges
+  uint64_t sampling_period;
 };
 
 enum class TORCH_API EventKind : uint16_t {
@@ -170,7 +178,8 @@ struct TORCH_API Event final {
     return device_;
   }
 
-  void updateMemoryStats(int64_t alloc_size, c10::Device device) {
+  void updateMemoryStats(void* ptr, int64_t alloc_size, c10::Device device) {
+    memory_ptr_ = reinterpret_cast<uint64_t>(ptr);
     if (device.type() == c10::DeviceType::CUDA ||
         device.type() == c10::DeviceType::HIP) {
       cuda_memory_usage_ = alloc_size;
@@ -191,6 +200,12 @@ struct TORCH_API Event final {
     return cuda_memory_usage_;
   }
 
+  // Address of the allocated or freed block of a MemoryAlloc event, which
+  // pairs every free with its allocation.
+  uint64_t memory_ptr() const {
+    return memory_ptr_;
+  }
+
   at::RecordFunctionHandle handle() const {
     return handle_;
   }
@@ -205,6 +220,7 @@ private:
   std::vector<std::vector<int64_t>> shapes_;
   int64_t cpu_memory_usage_ = 0;
   int64_t cuda_memory_usage_ = 0;
+  uint64_t memory_ptr_ = 0;
   int device_ = -1;
   struct CUevent_st* cuda_event = nullptr;
 };
@@ -255,6 +271,43 @@ TORCH_API void enableProfiler(const ProfilerConfig&);
 TORCH_API thread_event_lists disableProfiler();
 TORCH_API bool profilerEnabled();
 
+// Always-on aggregation of the number of calls and the wall time of
+// RecordFunction ranges by name, independent of the profiler. The ranges of
+// each thread are aggregated in counters owned by the thread, which other
+// threads only read when a snapshot is taken.
+struct TORCH_API RangeStats {
+  int64_t count = 0;
+  int64_t total_ns = 0;
+  int64_t min_ns = std::numeric_limits<int64_t>::max();
+  int64_t max_ns = 0;
+
+  void add(int64_t ns) {
+    ++count;
+    total_ns += ns;
+    min_ns = std::min(min_ns, ns);
+    max_ns = std::max(max_ns, ns);
+  }
+
+  void merge(const RangeStats& other) {
+    count += other.count;
+    total_ns += other.total_ns;
+    min_ns = std::min(min_ns, other.min_ns);
+    max_ns = std::max(max_ns, other.max_ns);
+  }
+};
+
+using range_stats_map = std::unordered_map<std::string, RangeStats>;
+
+// Starts aggregating user scopes (record_function), and aten ops and
+// autograd nodes if record_ops is true. The RecordFunction callbacks are
+// registered the first time, which is not thread safe (see
+// at::addGlobalCallback), later calls only switch them on.
+TORCH_API void enableRangeMetrics(bool record_ops = false);
+TORCH_API void disableRangeMetrics();
+TORCH_API bool rangeMetricsEnabled();
+// Returns the stats aggregated over all threads since the last reset.
+TORCH_API range_stats_map rangeMetricsSnapshot(bool reset = false);
+
 // Usage:
 //   {
 //     RecordProfile guard("filename.trace");
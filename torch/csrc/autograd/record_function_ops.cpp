@@ -1,6 +1,7 @@
 #include <ATen/cpp_custom_type_hack.h>
 #include <ATen/record_function.h>
 #include <ATen/ThreadLocalState.h>
+#include <torch/csrc/autograd/profiler.h>
 
 #include <torch/csrc/jit/runtime/custom_operator.h>
 
@@ -17,7 +18,15 @@ namespace profiler {
 // Creates a new profiling scope using RecordFunction and invokes its starting
 // callbacks.
 at::Tensor record_function_enter(const std::string& name) {
-  auto rec = std::make_unique<at::RecordFunction>(at::RecordScope::USER_SCOPE);
+  std::unique_ptr<at::RecordFunction> rec;
+  if (rangeMetricsEnabled()) {
+    // Range metrics observe user scopes on all threads, RecordFunction is
+    // only enabled on the threads that run the profiler.
+    at::RecordFunctionGuard guard;
+    rec = std::make_unique<at::RecordFunction>(at::RecordScope::USER_SCOPE);
+  } else {
+    rec = std::make_unique<at::RecordFunction>(at::RecordScope::USER_SCOPE);
+  }
   if (auto* current = rec->current()) {
     if (current->name().str() == std::string("profiler::_record_function_enter")) {
       // RecordFunction requires parent_ to be alive for it's entire lifetime.
@@ -369,6 +369,25 @@ PyObject* rpc_init(PyObject* /* unused */) {
                   Set future that is completed when the profiling event corresponding
                   to the creation of this RRef on the remote node has been recorded.
               )")
+          .def(
+              "_value_generation",
+              &PyRRef::valueGeneration,
+              py::arg("tensors"),
+              py::call_guard<py::gil_scoped_release>(),
+              R"(
+                  Returns the generation of the local value, given its
+                  tensors, for :class:`~torch.distributed.rpc.RRefCache`. It
+                  changes when the value is marked as modified or when the
+                  tensors are not the ones of the previous call.
+              )")
+          .def(
+              "_mark_value_modified",
+              &PyRRef::markValueModified,
+              py::call_guard<py::gil_scoped_release>(),
+              R"(
+                  Bumps the generation of the local value, for
+                  :class:`~torch.distributed.rpc.RRefCache`.
+              )")
           // not releasing GIL to avoid context switch
           .def("__str__", &PyRRef::str);
 
@@ -198,6 +198,23 @@ py::object PyRRef::localValue() const {
   return res;
 }
 
+int64_t PyRRef::valueGeneration(const std::vector<at::Tensor>& tensors) const {
+  TORCH_CHECK(
+      rref_->isOwner(),
+      "Cannot get the value generation of a non-local reference. Call it on ",
+      owner().name_);
+  return c10::static_intrusive_pointer_cast<OwnerRRef>(rref_)->valueGeneration(
+      tensors);
+}
+
+void PyRRef::markValueModified() const {
+  TORCH_CHECK(
+      rref_->isOwner(),
+      "Cannot mark the value of a non-local reference as modified. Call it on ",
+      owner().name_);
+  c10::static_intrusive_pointer_cast<OwnerRRef>(rref_)->markValueModified();
+}
+
 std::string PyRRef::str() const {
   if (rref_->isOwner()) {
     return c10::str("OwnerRRef(", rref_->rrefId(), ")");
@@ -27,6 +27,8 @@ class PyRRef {
       const float timeoutSeconds =
           torch::distributed::rpc::kUnsetRpcTimeout) const;
   py::object localValue() const;
+  int64_t valueGeneration(const std::vector<at::Tensor>& tensors) const;
+  void markValueModified() const;
   std::string str() const;
   py::tuple pickle() const;
   static PyRRef unpickle(const py::tuple& t);
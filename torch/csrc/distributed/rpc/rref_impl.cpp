@@ -259,6 +259,29 @@ void OwnerRRef::setError(const std::string& error) {
   future_->setErrorIfNeeded(error);
 }
 
+int64_t OwnerRRef::valueGeneration(const std::vector<at::Tensor>& tensors) {
+  std::lock_guard<std::mutex> lock(valueGenerationMutex_);
+  bool sameTensors = tensors.size() == generationTensors_.size();
+  for (size_t i = 0; sameTensors && i < tensors.size(); ++i) {
+    sameTensors = generationTensors_[i]._unsafe_get_target() ==
+        tensors[i].unsafeGetTensorImpl();
+  }
+  if (!sameTensors) {
+    ++valueGeneration_;
+    generationTensors_.clear();
+    generationTensors_.reserve(tensors.size());
+    for (const auto& tensor : tensors) {
+      generationTensors_.emplace_back(tensor.getIntrusivePtr());
+    }
+  }
+  return valueGeneration_;
+}
+
+void OwnerRRef::markValueModified() {
+  std::lock_guard<std::mutex> lock(valueGenerationMutex_);
+  ++valueGeneration_;
+}
+
 } // namespace rpc
 } // namespace distributed
 } // namespace torch
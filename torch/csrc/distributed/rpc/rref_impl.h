@@ -386,10 +386,26 @@ class TORCH_API OwnerRRef final : public RRef {
   // Gets a future that is satisfied when the value or error is set.
   std::shared_ptr<JitFuture> getFuture();
 
+  // Generation of the value, used by ``RRefCache`` together with the version
+  // counters of ``tensors``, the tensors of the value, to tell whether the
+  // value changed. It is bumped by ``markValueModified()``, and when
+  // ``tensors`` are not the tensors of the previous call, e.g. because a
+  // tensor of a container was replaced. The TensorImpls of the previous call
+  // are held by weak pointers, which keep them allocated so that new tensors
+  // cannot reuse their addresses.
+  int64_t valueGeneration(const std::vector<at::Tensor>& tensors);
+  void markValueModified();
+
  private:
   friend class RRefContext;
 
   std::shared_ptr<JitFuture> future_;
+
+  std::mutex valueGenerationMutex_;
+  int64_t valueGeneration_{0};
+  std::vector<
+      c10::weak_intrusive_ptr<c10::TensorImpl, c10::UndefinedTensorImpl>>
+      generationTensors_;
 };
 
 } // namespace rpc
@@ -16,12 +16,19 @@ void initThroughputBenchmarkBindings(PyObject* module) {
           "num_calling_threads", &BenchmarkConfig::num_calling_threads)
       .def_readwrite("num_worker_threads", &BenchmarkConfig::num_worker_threads)
       .def_readwrite("num_warmup_iters", &BenchmarkConfig::num_warmup_iters)
+      .def_readwrite("warmup_tolerance", &BenchmarkConfig::warmup_tolerance)
+      .def_readwrite("max_warmup_iters", &BenchmarkConfig::max_warmup_iters)
       .def_readwrite("num_iters", &BenchmarkConfig::num_iters)
+      .def_readwrite("target_qps", &BenchmarkConfig::target_qps)
       .def_readwrite("profiler_output_path", &BenchmarkConfig::profiler_output_path);
 
   py::class_<BenchmarkExecutionStats>(m, "BenchmarkExecutionStats")
       .def_readonly("latency_avg_ms", &BenchmarkExecutionStats::latency_avg_ms)
-      .def_readonly("num_iters", &BenchmarkExecutionStats::num_iters);
+      .def_readonly("num_iters", &BenchmarkExecutionStats::num_iters)
+      .def_readonly("total_time_ms", &BenchmarkExecutionStats::total_time_ms)
+      .def_readonly("latencies_ms", &BenchmarkExecutionStats::latencies_ms)
+      .def_readonly(
+          "num_warmup_iters", &BenchmarkExecutionStats::num_warmup_iters);
 
   py::class_<ThroughputBenchmark>(m, "ThroughputBenchmark", py::dynamic_attr())
       .def(py::init<jit::Module>())
@@ -1,5 +1,11 @@
 #pragma once
 
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cmath>
+#include <condition_variable>
+#include <mutex>
 #include <random>
 #include <thread>
 
@@ -20,14 +26,30 @@ BenchmarkExecutionStats BenchmarkHelper<Input, Output, Model>::benchmark(
   TORCH_CHECK(
       config.num_worker_threads == 1,
       "Only parallelization by callers is supported");
+  TORCH_CHECK(config.target_qps >= 0, "target_qps must be non-negative");
+  TORCH_CHECK(
+      config.warmup_tolerance >= 0, "warmup_tolerance must be non-negative");
+  TORCH_CHECK(
+      config.warmup_tolerance == 0 || config.num_warmup_iters > 0,
+      "num_warmup_iters must be positive to warm up until steady state");
 
   LOG(INFO) << at::get_parallel_info();
 
+  const bool open_loop = config.target_qps > 0;
+  const int64_t max_warmup_iters = config.warmup_tolerance > 0
+      ? std::max<int64_t>(config.max_warmup_iters, config.num_warmup_iters)
+      : config.num_warmup_iters;
+
   // We pre-generate inputs here for each of the threads. This allows us to
   // safely move inputs out for each of the threads independently and thus avoid
-  // overhead from the benchmark runner itself
+  // overhead from the benchmark runner itself. Warmup inputs are cloned by the
+  // threads one window at a time, as the number of warmup iterations is only
+  // bounded by max_warmup_iters
   std::vector<std::vector<Input>> thread_inputs(config.num_calling_threads);
   std::vector<size_t> input_iters(config.num_calling_threads);
+  // Arrival times of the requests since the start of the benchmark, in
+  // seconds, in the open-loop mode
+  std::vector<double> arrival_times;
   {
     std::random_device seeder;
     std::mt19937 engine(seeder());
@@ -41,13 +63,32 @@ BenchmarkExecutionStats BenchmarkHelper<Input, Output, Model>::benchmark(
          ++thread_id) {
       // Just in case we generate num_iters inputs for each of the threads
       // This was if one thread does all the work we will be fine
-      for (int i = 0; i < config.num_iters + config.num_warmup_iters; ++i) {
+      for (int64_t i = 0; i < config.num_iters; ++i) {
         thread_inputs[thread_id].push_back(cloneInput(inputs_[dist(engine)]));
       }
       input_iters[thread_id] = 0;
     }
+
+    if (open_loop) {
+      std::exponential_distribution<double> interarrival(config.target_qps);
+      double time = 0;
+      arrival_times.reserve(config.num_iters);
+      for (int64_t i = 0; i < config.num_iters; ++i) {
+        time += interarrival(engine);
+        arrival_times.push_back(time);
+      }
+    }
   }
 
+  using Clock = std::chrono::high_resolution_clock;
+  using TimePoint = std::chrono::time_point<Clock>;
+  auto elapsed_ms = [](TimePoint start, TimePoint end) {
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(end - start)
+               .count() /
+        1000.0 / 1000.0;
+  };
+  TimePoint start_time;
+
   std::mutex m;
   std::condition_variable worker_main_cv;
   std::condition_variable main_worker_cv;
@@ -57,16 +98,60 @@ BenchmarkExecutionStats BenchmarkHelper<Input, Output, Model>::benchmark(
   bool start{false};
   std::atomic<int64_t> num_attempted_iters{0};
   std::vector<std::thread> callers;
+  std::vector<std::vector<float>> thread_latencies(config.num_calling_threads);
+  std::vector<int64_t> thread_warmup_iters(config.num_calling_threads);
 
   for (auto thread_id = 0; thread_id < config.num_calling_threads;
        ++thread_id) {
     callers.emplace_back([&, thread_id]() {
-      // We use conditional variable as a barrier to make sure each thread
-      // performs required warmeup iterations before we start measuring
-      for (auto j = 0; j < config.num_warmup_iters; ++j) {
+      // Use the number of intra-op threads set by the caller of the
+      // benchmark, e.g. with torch.set_num_threads
+      at::init_num_threads();
+      auto run = [&]() {
         runOnce(std::move(thread_inputs[thread_id][input_iters[thread_id]]));
         ++input_iters[thread_id];
+      };
+
+      // Runs a window of warmup iterations and returns its duration. Its
+      // inputs are cloned before the window is timed
+      std::vector<Input> warmup_inputs;
+      size_t next_warmup_input = thread_id;
+      auto run_warmup_window = [&](int64_t window_iters) {
+        warmup_inputs.clear();
+        for (int64_t i = 0; i < window_iters; ++i) {
+          warmup_inputs.push_back(
+              cloneInput(inputs_[next_warmup_input++ % inputs_.size()]));
+        }
+        auto window_start = Clock::now();
+        for (auto& input : warmup_inputs) {
+          runOnce(std::move(input));
+        }
+        return elapsed_ms(window_start, Clock::now());
+      };
+
+      // We use conditional variable as a barrier to make sure each thread
+      // performs required warmeup iterations before we start measuring
+      int64_t warmup_iters = 0;
+      if (config.warmup_tolerance > 0) {
+        double prev_window_ms = -1;
+        while (warmup_iters < max_warmup_iters) {
+          int64_t window_iters = std::min<int64_t>(
+              config.num_warmup_iters, max_warmup_iters - warmup_iters);
+          double window_ms = run_warmup_window(window_iters) / window_iters;
+          warmup_iters += window_iters;
+          if (prev_window_ms > 0 &&
+              std::abs(window_ms - prev_window_ms) <
+                  config.warmup_tolerance * prev_window_ms) {
+            break;
+          }
+          prev_window_ms = window_ms;
+        }
+      } else if (config.num_warmup_iters > 0) {
+        run_warmup_window(config.num_warmup_iters);
+        warmup_iters = config.num_warmup_iters;
       }
+      warmup_inputs.clear();
+      thread_warmup_iters[thread_id] = warmup_iters;
       {
         std::unique_lock<std::mutex> lock(m);
         ++initialized;
@@ -76,9 +161,25 @@ BenchmarkExecutionStats BenchmarkHelper<Input, Output, Model>::benchmark(
         }
       }
       LOG(INFO) << "Starting forward thread " << thread_id;
-      while (num_attempted_iters.fetch_add(1) < config.num_iters) {
-        runOnce(std::move(thread_inputs[thread_id][input_iters[thread_id]]));
-        ++input_iters[thread_id];
+      auto& latencies = thread_latencies[thread_id];
+      if (open_loop) {
+        // Requests are taken in order of arrival, the latency of a request
+        // includes the time it waited for a free calling thread
+        int64_t i;
+        while ((i = num_attempted_iters.fetch_add(1)) < config.num_iters) {
+          auto arrival = start_time +
+              std::chrono::duration_cast<Clock::duration>(
+                             std::chrono::duration<double>(arrival_times[i]));
+          std::this_thread::sleep_until(arrival);
+          run();
+          latencies.push_back(elapsed_ms(arrival, Clock::now()));
+        }
+      } else {
+        while (num_attempted_iters.fetch_add(1) < config.num_iters) {
+          auto iter_start = Clock::now();
+          run();
+          latencies.push_back(elapsed_ms(iter_start, Clock::now()));
+        }
       }
 
       {
@@ -92,10 +193,6 @@ BenchmarkExecutionStats BenchmarkHelper<Input, Output, Model>::benchmark(
     });
   }
 
-  using Clock = std::chrono::high_resolution_clock;
-  using TimePoint = std::chrono::time_point<Clock>;
-  TimePoint start_time;
-
   std::unique_ptr<torch::autograd::profiler::RecordProfile> profiler_guard;
   {
     std::unique_lock<std::mutex> lock(m);
@@ -119,25 +216,38 @@ BenchmarkExecutionStats BenchmarkHelper<Input, Output, Model>::benchmark(
     worker_main_cv.wait(
         lock, [&]() { return finished == config.num_calling_threads; });
   }
-  auto end_time = std::chrono::high_resolution_clock::now();
+  auto end_time = Clock::now();
   profiler_guard.reset();
   LOG(INFO) << "Finished benchmark";
 
-  BenchmarkExecutionStats stats;
-  float total_time_ms = std::chrono::duration_cast<std::chrono::nanoseconds>(
-                            end_time - start_time)
-                            .count() /
-      1000.0 / 1000.0;
-  // We use config.num_iters instead of num_attempted_iters as it is
-  // repsesatative of the real work done. Last attempted iteration on each
-  // calling threads doesn't represent the real work (i.e. running the model)
-  stats.latency_avg_ms =
-      total_time_ms * config.num_calling_threads / config.num_iters;
-  stats.num_iters = config.num_iters;
-
   for (auto& t : callers) {
     t.join();
   }
+
+  BenchmarkExecutionStats stats;
+  float total_time_ms = elapsed_ms(start_time, end_time);
+  stats.total_time_ms = total_time_ms;
+  for (auto& latencies : thread_latencies) {
+    stats.latencies_ms.insert(
+        stats.latencies_ms.end(), latencies.begin(), latencies.end());
+  }
+  stats.num_warmup_iters = std::move(thread_warmup_iters);
+  if (open_loop) {
+    // The calling threads are idle between requests, so the average latency
+    // is not derived from the total time
+    double total_latency_ms = 0;
+    for (auto latency : stats.latencies_ms) {
+      total_latency_ms += latency;
+    }
+    stats.latency_avg_ms = total_latency_ms / config.num_iters;
+  } else {
+    // We use config.num_iters instead of num_attempted_iters as it is
+    // repsesatative of the real work done. Last attempted iteration on each
+    // calling threads doesn't represent the real work (i.e. running the model)
+    stats.latency_avg_ms =
+        total_time_ms * config.num_calling_threads / config.num_iters;
+  }
+  stats.num_iters = config.num_iters;
   return stats;
 }
 
@@ -88,7 +88,10 @@ template <>
 void ModuleBenchmark::runOnce(ModuleInput&& input) const {
   CHECK(initialized_);
   pybind11::gil_scoped_acquire gil_guard;
-  model_(*input.args, **input.kwargs);
+  // Consume the input so that its references are released with the GIL held,
+  // the calling threads destroy the inputs they ran
+  ModuleInput consumed_input(std::move(input));
+  model_(*consumed_input.args, **consumed_input.kwargs);
 }
 
 template <>
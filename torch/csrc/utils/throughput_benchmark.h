@@ -23,6 +23,14 @@ namespace throughput_benchmark {
 struct BenchmarkExecutionStats {
   float latency_avg_ms{-1};
   int64_t num_iters{-1};
+  // Wall time of the measured part of the benchmark
+  float total_time_ms{-1};
+  // Latency of every measured iteration, in the order they finished. In the
+  // open-loop mode the latency of an iteration includes the time its request
+  // waited for a free calling thread
+  std::vector<float> latencies_ms;
+  // Number of warmup iterations run by each of the calling threads
+  std::vector<int64_t> num_warmup_iters;
 };
 
 std::ostream& operator<<(std::ostream& os, const BenchmarkExecutionStats& value);
@@ -50,9 +58,22 @@ struct BenchmarkConfig {
   // actually measuring things. This way we avoid cold caches and any other
   // similar problems
   int num_warmup_iters{1};
+  // If positive, each calling thread keeps running windows of
+  // num_warmup_iters warmup iterations until the average latency of a window
+  // differs from the one of the previous window by less than this fraction,
+  // or max_warmup_iters iterations were run. Otherwise exactly
+  // num_warmup_iters warmup iterations are run
+  double warmup_tolerance{0};
+  int64_t max_warmup_iters{10000};
   // Number of iterations the benchmark should run with. This number is separate
   // from the warmup iterations
   int64_t num_iters{100};
+  // If positive, the benchmark runs open-loop: requests arrive as a Poisson
+  // process with this average number of requests per second across all the
+  // calling threads, and are served in order of arrival by the first free
+  // calling thread. Otherwise every calling thread runs the next iteration
+  // as soon as the previous one finished
+  double target_qps{0};
   // If set autograd profiler will be enabled. I.e. this variable would be created
   // before the main benchmark loop (but after the warmup):
   // RecordProfile guard(profiler_output_path);
@@ -0,0 +1,8 @@
+"""
+:mod:`torch.distributed.algorithms.ddp_comm_hooks` contains communication
+hooks for :meth:`~torch.nn.parallel.DistributedDataParallel.register_comm_hook`
+that compress the gradient buckets before they are reduced.
+"""
+from .default_hooks import allreduce_hook, fp16_compress_hook, hierarchical_allreduce_hook
+from .topk_hook import TopKState, topk_hook
+from .powerSGD_hook import PowerSGDState, powerSGD_hook
@@ -0,0 +1,120 @@
+import torch
+from torch.distributed.distributed_c10d import _get_default_group
+
+
+class _Future(object):
+    r"""Future over asynchronous collectives. ``wait_fn`` waits for them and
+    returns the result; it is only called on the first :meth:`wait`.
+
+    :class:`~torch.distributed.ProcessGroup` work handles cannot run callbacks
+    on completion, so callbacks chained with :meth:`then` run when the result
+    is waited on. DDP waits on the futures of all buckets in bucket order,
+    so collectives launched by callbacks are issued in the same order on
+    every process.
+    """
+    def __init__(self, wait_fn):
+        self._wait_fn = wait_fn
+        self._done = False
+        self._result = None
+
+    def wait(self):
+        if not self._done:
+            self._result = self._wait_fn()
+            self._wait_fn = None
+            self._done = True
+        return self._result
+
+    def then(self, callback):
+        return _Future(lambda: callback(self))
+
+
+def _get_process_group(process_group):
+    return process_group if process_group is not None else _get_default_group()
+
+
+def _allreduce_fut(process_group, tensor):
+    work = process_group.allreduce([tensor])
+
+    def wait():
+        work.wait()
+        return [tensor]
+
+    return _Future(wait)
+
+
+def allreduce_hook(process_group, bucket):
+    r"""
+    Averages the gradient bucket over the processes with an all-reduce, which
+    is what :class:`~torch.nn.parallel.DistributedDataParallel` does without
+    a communication hook.
+
+    Arguments:
+        process_group (ProcessGroup): process group to reduce over, or
+            ``None`` for the default process group
+        bucket (GradBucket): gradient bucket
+
+    Example::
+        >>> ddp.register_comm_hook(None, allreduce_hook)
+    """
+    process_group = _get_process_group(process_group)
+    tensor = bucket.get_tensors()[0]
+    tensor.div_(process_group.size())
+    return _allreduce_fut(process_group, tensor)
+
+
+def fp16_compress_hook(process_group, bucket):
+    r"""
+    Casts the gradient bucket to ``float16`` before all-reducing it and casts
+    the average back to the dtype of the gradients, which halves the
+    communicated bytes of ``float32`` gradients.
+
+    The gradients are divided by the world size before the cast to reduce
+    the risk of overflow.
+
+    Arguments:
+        process_group (ProcessGroup): process group to reduce over, or
+            ``None`` for the default process group
+        bucket (GradBucket): gradient bucket
+
+    Example::
+        >>> ddp.register_comm_hook(None, fp16_compress_hook)
+    """
+    process_group = _get_process_group(process_group)
+    tensor = bucket.get_tensors()[0]
+    compressed = tensor.div(process_group.size()).to(torch.float16)
+
+    def decompress(fut):
+        tensor.copy_(fut.wait()[0])
+        return [tensor]
+
+    return _allreduce_fut(process_group, compressed).then(decompress)
+
+
+def hierarchical_allreduce_hook(hierarchical_group, bucket):
+    r"""
+    Averages the gradient bucket with the two-level all-reduce of
+    :class:`~torch.distributed.algorithms.hierarchical.HierarchicalGroup`,
+    which reduces the traffic over the inter-node links on clusters with
+    several processes per node. DDP has to run on the default process group.
+
+    The reductions inside the node are launched by the hook, the rest of the
+    all-reduce runs when DDP waits for the bucket.
+
+    Arguments:
+        hierarchical_group (HierarchicalGroup): local and cross-node groups
+            to reduce over
+        bucket (GradBucket): gradient bucket
+
+    Example::
+        >>> hierarchical_group = HierarchicalGroup()
+        >>> ddp.register_comm_hook(hierarchical_group, hierarchical_allreduce_hook)
+    """
+    tensor = bucket.get_tensors()[0]
+    tensor.div_(sum(len(node) for node in hierarchical_group.nodes))
+    work = hierarchical_group.all_reduce(tensor, async_op=True)
+
+    def wait():
+        work.wait()
+        return [tensor]
+
+    return _Future(wait)
@@ -0,0 +1,151 @@
+import torch
+
+from .default_hooks import _Future, _allreduce_fut, _get_process_group
+
+
+def _orthogonalize(matrix, epsilon=1e-8):
+    r"""Orthonormalizes the columns of ``matrix`` in place with Gram-Schmidt."""
+    num_cols = matrix.shape[1]
+    for i in range(num_cols):
+        col = matrix[:, i:i + 1]
+        col.div_(col.norm() + epsilon)
+        if i + 1 < num_cols:
+            rest = matrix[:, i + 1:]
+            rest.sub_(torch.sum(col * rest, dim=0) * col)
+
+
+class PowerSGDState(object):
+    r"""
+    State of :func:`powerSGD_hook`, to be passed to
+    :meth:`~torch.nn.parallel.DistributedDataParallel.register_comm_hook`.
+
+    Arguments:
+        process_group (ProcessGroup, optional): process group to reduce over
+            (default: the default process group)
+        matrix_approximation_rank (int, optional): rank of the approximation
+            of the gradient matrices. Higher ranks are more accurate and
+            send more data (default: 1)
+        error_feedback (bool, optional): if ``True``, the approximation
+            error is added to the gradients of the next iteration
+            (default: ``True``)
+        random_seed (int, optional): seed of the initial low-rank factors,
+            which has to be the same on all processes (default: 0)
+    """
+    def __init__(self, process_group=None, matrix_approximation_rank=1,
+                 error_feedback=True, random_seed=0):
+        if matrix_approximation_rank < 1:
+            raise ValueError("Invalid matrix_approximation_rank value: {}".format(
+                matrix_approximation_rank))
+        self.process_group = process_group
+        self.matrix_approximation_rank = matrix_approximation_rank
+        self.error_feedback = error_feedback
+        self.rng = torch.Generator()
+        self.rng.manual_seed(random_seed)
+        # Approximation errors of the previous iteration and the Q factors,
+        # which are reused as warm start, keyed by bucket index.
+        self.error_dict = {}
+        self.q_memory_dict = {}
+
+
+def powerSGD_hook(state, bucket):
+    r"""
+    Reduces the gradient bucket with the low-rank compression of PowerSGD
+    (Vogels et al., 2019).
+
+    Every gradient with more than one dimension is viewed as an ``n x m``
+    matrix ``M`` and approximated as ``P Q^T`` with ``P`` of size ``n x r``
+    and ``Q`` of size ``m x r``, where ``r`` is the
+    ``matrix_approximation_rank`` of ``state``:
+
+    1. ``P = M Q`` is all-reduced and orthonormalized,
+    2. ``Q = M^T P`` is all-reduced,
+    3. ``M`` is replaced with ``P Q^T / world_size``.
+
+    ``Q`` is kept in ``state`` as warm start for the next iteration. Vectors,
+    and matrices for which the factors would not be smaller, are all-reduced
+    uncompressed. With error feedback, the difference between the gradients
+    and their approximation is added to the bucket in the next iteration.
+
+    Arguments:
+        state (PowerSGDState): state of the hook
+        bucket (GradBucket): gradient bucket
+
+    Example::
+        >>> state = PowerSGDState(matrix_approximation_rank=2)
+        >>> ddp.register_comm_hook(state, powerSGD_hook)
+    """
+    process_group = _get_process_group(state.process_group)
+    world_size = process_group.size()
+    tensor = bucket.get_tensors()[0]
+    index = bucket.get_index()
+
+    if state.error_feedback:
+        if index in state.error_dict:
+            tensor.add_(state.error_dict[index])
+        input_tensor = tensor.clone()
+
+    matrices = []
+    uncompressed = []
+    for grad in bucket.get_per_parameter_tensors():
+        if grad.dim() > 1:
+            matrix = grad.view(grad.shape[0], -1)
+            n, m = matrix.shape
+            rank = min(n, m, state.matrix_approximation_rank)
+            if (n + m) * rank < n * m:
+                matrices.append((matrix, rank))
+                continue
+        uncompressed.append(grad)
+
+    uncompressed_fut = None
+    if uncompressed:
+        uncompressed_flat = torch.cat([grad.view(-1) for grad in uncompressed])
+        uncompressed_fut = _allreduce_fut(process_group, uncompressed_flat)
+
+    p_flat = tensor.new_empty(sum(matrix.shape[0] * rank for matrix, rank in matrices))
+    if index not in state.q_memory_dict:
+        q_flat = torch.randn(sum(matrix.shape[1] * rank for matrix, rank in matrices),
+                             generator=state.rng)
+        state.q_memory_dict[index] = q_flat.to(tensor)
+    q_flat = state.q_memory_dict[index]
+
+    ps = []
+    qs = []
+    p_offset = 0
+    q_offset = 0
+    for matrix, rank in matrices:
+        n, m = matrix.shape
+        ps.append(p_flat[p_offset:p_offset + n * rank].view(n, rank))
+        qs.append(q_flat[q_offset:q_offset + m * rank].view(m, rank))
+        p_offset += n * rank
+        q_offset += m * rank
+
+    def compute_q(fut):
+        fut.wait()
+        for p in ps:
+            _orthogonalize(p)
+        for (matrix, _), p, q in zip(matrices, ps, qs):
+            torch.mm(matrix.t(), p, out=q)
+        return _allreduce_fut(process_group, q_flat).wait()
+
+    def decompress(fut):
+        fut.wait()
+        for (matrix, _), p, q in zip(matrices, ps, qs):
+            torch.mm(p, q.t(), out=matrix)
+            matrix.div_(world_size)
+        if uncompressed_fut is not None:
+            uncompressed_flat = uncompressed_fut.wait()[0]
+            uncompressed_flat.div_(world_size)
+            offset = 0
+            for grad in uncompressed:
+                grad.copy_(uncompressed_flat[offset:offset + grad.numel()].view_as(grad))
+                offset += grad.numel()
+        if state.error_feedback:
+            state.error_dict[index] = input_tensor.sub_(tensor)
+        return [tensor]
+
+    if not matrices:
+        return _Future(lambda: None).then(decompress)
+
+    for (matrix, _), p, q in zip(matrices, ps, qs):
+        torch.mm(matrix, q, out=p)
+    return _allreduce_fut(process_group, p_flat).then(compute_q).then(decompress)
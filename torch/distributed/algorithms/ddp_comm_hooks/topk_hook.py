@@ -0,0 +1,79 @@
+import torch
+
+from .default_hooks import _Future, _get_process_group
+
+
+class TopKState(object):
+    r"""
+    State of :func:`topk_hook`, to be passed to
+    :meth:`~torch.nn.parallel.DistributedDataParallel.register_comm_hook`.
+
+    Arguments:
+        process_group (ProcessGroup, optional): process group to reduce over
+            (default: the default process group)
+        ratio (float, optional): fraction of the gradients of a bucket that
+            is communicated (default: 0.01)
+        error_feedback (bool, optional): if ``True``, the gradients that are
+            not communicated are added to the gradients of the next
+            iteration (default: ``True``)
+    """
+    def __init__(self, process_group=None, ratio=0.01, error_feedback=True):
+        if not 0.0 < ratio <= 1.0:
+            raise ValueError("Invalid ratio value: {}".format(ratio))
+        self.process_group = process_group
+        self.ratio = ratio
+        self.error_feedback = error_feedback
+        # Residuals of the previous iteration, keyed by bucket index.
+        self.error_dict = {}
+
+
+def topk_hook(state, bucket):
+    r"""
+    Sparsifies the gradient bucket to the entries of largest magnitude before
+    reducing it. Every process sends the values and indices of its top
+    ``ratio`` fraction of entries with an all-gather, and the average is
+    formed from the gathered entries, so a process sends
+    ``2 * ratio * numel`` elements instead of ``numel``.
+
+    With error feedback, the residual that was not sent is kept in ``state``
+    and added to the bucket in the next iteration, so that every gradient
+    entry is eventually applied.
+
+    Arguments:
+        state (TopKState): state of the hook
+        bucket (GradBucket): gradient bucket
+
+    Example::
+        >>> state = TopKState(ratio=0.01)
+        >>> ddp.register_comm_hook(state, topk_hook)
+    """
+    process_group = _get_process_group(state.process_group)
+    world_size = process_group.size()
+    tensor = bucket.get_tensors()[0]
+    index = bucket.get_index()
+
+    if state.error_feedback and index in state.error_dict:
+        tensor.add_(state.error_dict[index])
+
+    k = max(1, int(tensor.numel() * state.ratio))
+    _, indices = tensor.abs().topk(k, sorted=False)
+    values = tensor.index_select(0, indices)
+
+    if state.error_feedback:
+        state.error_dict[index] = tensor.index_fill(0, indices, 0)
+
+    all_values = [torch.empty_like(values) for _ in range(world_size)]
+    all_indices = [torch.empty_like(indices) for _ in range(world_size)]
+    values_work = process_group.allgather([all_values], [values])
+    indices_work = process_group.allgather([all_indices], [indices])
+
+    def wait():
+        values_work.wait()
+        indices_work.wait()
+        tensor.zero_()
+        for rank_values, rank_indices in zip(all_values, all_indices):
+            tensor.index_add_(0, rank_indices, rank_values)
+        tensor.div_(world_size)
+        return [tensor]
+
+    return _Future(wait)
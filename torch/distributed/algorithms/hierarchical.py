@@ -0,0 +1,198 @@
+import socket
+from collections import OrderedDict
+
+import torch
+import torch.distributed as dist
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+
+
+class _HierarchicalWork(object):
+    r"""Work handle of a hierarchical collective. The collectives of the
+    first stage are launched asynchronously; ``finish`` runs the remaining
+    stages on the first :meth:`wait`."""
+    def __init__(self, works, finish):
+        self._works = works
+        self._finish = finish
+
+    def is_completed(self):
+        return self._finish is None
+
+    def wait(self):
+        if self._finish is not None:
+            for work in self._works:
+                work.wait()
+            finish, self._finish = self._finish, None
+            finish()
+        return True
+
+
+class HierarchicalGroup(object):
+    r"""
+    Runs collectives over the default process group in two levels: inside
+    each node, and across nodes.
+
+    A flat :func:`~torch.distributed.all_reduce` sends every byte over the
+    inter-node links once per process. :meth:`all_reduce` instead
+    reduce-scatters the tensor inside each node, so that every process of a
+    node owns one shard of the node's sum. Then it all-reduces every shard
+    across nodes among the processes that own it, and all-gathers the
+    shards inside each node. The inter-node traffic is thus divided by the
+    number of processes per node.
+
+    If the nodes have different numbers of processes, the tensor is reduced
+    on the first process of every node instead, all-reduced across these
+    leaders and broadcast inside each node.
+
+    The local and cross-node subgroups are created with
+    :func:`~torch.distributed.new_group`, so the group has to be created on
+    all processes of the default group, in the same order with respect to
+    other subgroups.
+
+    Args:
+        local_size (int, optional): number of processes per node, with the
+            processes of a node having consecutive ranks. If ``None``, the
+            processes are assigned to nodes by their host name (default:
+            ``None``).
+
+    Example::
+        >>> dist.init_process_group("gloo", ...)
+        >>> hierarchical_group = HierarchicalGroup()
+        >>> hierarchical_group.all_reduce(tensor)
+    """
+    def __init__(self, local_size=None):
+        world_size = dist.get_world_size()
+        self.rank = dist.get_rank()
+        self.backend = dist.get_backend()
+        if local_size is None:
+            hosts = [None] * world_size
+            dist.all_gather_object(hosts, socket.gethostname())
+            nodes = OrderedDict()
+            for rank, host in enumerate(hosts):
+                nodes.setdefault(host, []).append(rank)
+            self.nodes = list(nodes.values())
+        else:
+            if local_size < 1 or world_size % local_size != 0:
+                raise ValueError("Invalid local_size value: {}, expected a divisor "
+                                 "of the world size {}".format(local_size, world_size))
+            self.nodes = [list(range(start, start + local_size))
+                          for start in range(0, world_size, local_size)]
+        self.local_ranks = next(node for node in self.nodes if self.rank in node)
+        self.local_rank = self.local_ranks.index(self.rank)
+
+        self.local_group = None
+        self.cross_group = None
+        self.leader_group = None
+        node_sizes = set(len(node) for node in self.nodes)
+        if len(self.nodes) == 1 or node_sizes == {1}:
+            # A single level, collectives run over the default group.
+            return
+        for node in self.nodes:
+            group = dist.new_group(node)
+            if self.rank in node:
+                self.local_group = group
+        if len(node_sizes) == 1:
+            for local_rank in range(len(self.local_ranks)):
+                group = dist.new_group([node[local_rank] for node in self.nodes])
+                if local_rank == self.local_rank:
+                    self.cross_group = group
+        else:
+            self.leader_group = dist.new_group([node[0] for node in self.nodes])
+
+    def all_reduce(self, tensor, op=dist.ReduceOp.SUM, async_op=False):
+        r"""Reduces the tensor data across all processes in place, like
+        :func:`~torch.distributed.all_reduce`.
+
+        Args:
+            tensor (Tensor): Input and output of the collective.
+            op (optional): One of the values from
+                ``torch.distributed.ReduceOp`` enum.
+            async_op (bool, optional): Whether this op should be an async op.
+                Only the collectives inside the nodes are launched before
+                the handle is waited on.
+
+        Returns:
+            Async work handle, if async_op is set to True.
+            None, if not async_op.
+        """
+        if self.local_group is None:
+            return dist.all_reduce(tensor, op, async_op=async_op)
+        if tensor.numel() == 0:
+            work = _HierarchicalWork([], lambda: None)
+        elif self.cross_group is None:
+            work = self._leader_all_reduce(tensor, op)
+        else:
+            work = self._sharded_all_reduce(tensor, op)
+        if async_op:
+            return work
+        work.wait()
+
+    def _leader_all_reduce(self, tensor, op):
+        leader = self.local_ranks[0]
+        works = [dist.reduce(tensor, leader, op, group=self.local_group, async_op=True)]
+
+        def finish():
+            if self.rank == leader:
+                dist.all_reduce(tensor, op, group=self.leader_group)
+            dist.broadcast(tensor, leader, group=self.local_group)
+
+        return _HierarchicalWork(works, finish)
+
+    def _sharded_all_reduce(self, tensor, op):
+        local_size = len(self.local_ranks)
+        numel = tensor.numel()
+        shard_numel = (numel + local_size - 1) // local_size
+        in_place = tensor.is_contiguous() and shard_numel * local_size == numel
+        if in_place:
+            flat = tensor.view(-1)
+        else:
+            flat = tensor.new_zeros(shard_numel * local_size)
+            flat[:numel].copy_(tensor.reshape(-1))
+        shards = list(flat.split(shard_numel))
+
+        # Reduce-scatter inside the node. Gloo and MPI have no
+        # reduce_scatter, so the shards are reduced on their owners.
+        if self.backend == dist.Backend.NCCL:
+            shard = torch.empty_like(shards[self.local_rank])
+            works = [dist.reduce_scatter(shard, shards, op, group=self.local_group, async_op=True)]
+        else:
+            shard = shards[self.local_rank]
+            works = [dist.reduce(s, owner, op, group=self.local_group, async_op=True)
+                     for s, owner in zip(shards, self.local_ranks)]
+
+        def finish():
+            dist.all_reduce(shard, op, group=self.cross_group)
+            dist.all_gather(shards, shard, group=self.local_group)
+            if not in_place:
+                tensor.copy_(flat[:numel].view_as(tensor))
+
+        return _HierarchicalWork(works, finish)
+
+    def all_gather(self, tensor_list, tensor):
+        r"""Gathers tensors from all processes in a list, like
+        :func:`~torch.distributed.all_gather`.
+
+        The tensors are first all-gathered across nodes among the processes
+        with the same local rank, then inside each node, so that every
+        tensor crosses the inter-node links once per node. If the nodes have
+        different numbers of processes, a flat all-gather is used.
+
+        Args:
+            tensor_list (list[Tensor]): Output list. It should contain
+                correctly-sized tensors to be used for output of the
+                collective, one per process.
+            tensor (Tensor): Tensor to be gathered from the current process.
+        """
+        if self.cross_group is None:
+            dist.all_gather(tensor_list, tensor)
+            return
+        if len(tensor_list) != sum(len(node) for node in self.nodes):
+            raise ValueError("Expected argument ``tensor_list`` to have one "
+                             "tensor per process, but got {}".format(len(tensor_list)))
+        node_tensors = [torch.empty_like(tensor) for _ in self.nodes]
+        dist.all_gather(node_tensors, tensor, group=self.cross_group)
+        flat = _flatten_dense_tensors(node_tensors)
+        local_flats = [torch.empty_like(flat) for _ in self.local_ranks]
+        dist.all_gather(local_flats, flat, group=self.local_group)
+        for local_rank, local_flat in enumerate(local_flats):
+            for node, gathered in zip(self.nodes, _unflatten_dense_tensors(local_flat, node_tensors)):
+                tensor_list[node[local_rank]].copy_(gathered)
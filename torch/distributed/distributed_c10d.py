@@ -1,3 +1,6 @@
+import io
+import pickle
+import threading
 import torch
 import warnings
 from torch._six import string_classes
@@ -1259,6 +1262,411 @@ def all_gather_coalesced(output_tensor_lists,
         work.wait()
 
 
+# Byte buffers reused across object collectives to receive payloads, one per
+# thread and device, so that concurrent collectives of different threads do
+# not receive into the same memory. They only grow.
+_object_buffers = threading.local()
+
+
+def _object_buffer(size, device):
+    """
+    Helper that returns a byte tensor of ``size`` elements on ``device``,
+    backed by memory that is reused by later object collectives of the
+    calling thread
+
+    """
+    buffers = getattr(_object_buffers, 'buffers', None)
+    if buffers is None:
+        buffers = _object_buffers.buffers = {}
+    buffer = buffers.get(device)
+    if buffer is None or buffer.numel() < size:
+        capacity = size if buffer is None else max(size, 2 * buffer.numel())
+        buffer = torch.empty(capacity, dtype=torch.uint8, device=device)
+        buffers[device] = buffer
+    return buffer[:size]
+
+
+def _object_device(group):
+    """
+    Helper that returns the device that object payloads are exchanged on
+
+    """
+    if get_backend(group) == Backend.NCCL:
+        return torch.device('cuda', torch.cuda.current_device())
+    return torch.device('cpu')
+
+
+def _out_of_band_device_types(group, point_to_point=False):
+    """
+    Helper that returns the device types of tensors that object collectives
+    send with tensor collectives instead of pickling them
+
+    """
+    if get_backend(group) == Backend.NCCL:
+        # NCCL has no point-to-point operations in this version.
+        return () if point_to_point else ('cuda',)
+    return ('cpu',)
+
+
+def _group_to_global_rank(group, group_rank):
+    if group is GroupMember.WORLD:
+        return group_rank
+    return _get_global_rank(group, group_rank)
+
+
+# Types of tensors that all backends can send.
+_out_of_band_dtypes = {torch.float16, torch.float32, torch.float64, torch.int8,
+                       torch.uint8, torch.int32, torch.int64}
+
+
+class _ObjectPickler(pickle.Pickler):
+    """
+    Pickler that leaves the data of dense tensors on ``device_types`` out of
+    the pickle, so that they can be sent without copying them into the byte
+    payload. The tensors are collected in ``tensors``.
+
+    """
+    def __init__(self, file, device_types):
+        super(_ObjectPickler, self).__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.device_types = device_types
+        self.tensors = []
+        self.tensor_ids = {}
+
+    def persistent_id(self, obj):
+        if (not isinstance(obj, torch.Tensor) or obj.layout != torch.strided or
+                obj.dtype not in _out_of_band_dtypes or
+                obj.device.type not in self.device_types):
+            return None
+        index = self.tensor_ids.get(id(obj))
+        if index is None:
+            index = len(self.tensors)
+            self.tensor_ids[id(obj)] = index
+            self.tensors.append(obj)
+        return ('tensor', index, obj.dtype, obj.shape, obj.device.type,
+                obj.requires_grad, isinstance(obj, torch.nn.Parameter))
+
+
+class _ObjectUnpickler(pickle.Unpickler):
+    """
+    Unpickler for the payloads of :class:`_ObjectPickler`. The out-of-band
+    tensors are taken from ``tensors`` if given, which is the case on the
+    sending process, and are otherwise allocated and collected in ``tensors``
+    to be received.
+
+    """
+    def __init__(self, file, tensors=None):
+        super(_ObjectUnpickler, self).__init__(file)
+        self.received = tensors is None
+        self.tensors = [] if tensors is None else tensors
+
+    def persistent_load(self, pid):
+        _, index, dtype, shape, device_type, requires_grad, is_parameter = pid
+        if not self.received or index < len(self.tensors):
+            return self.tensors[index]
+        if device_type == 'cuda':
+            device = torch.device('cuda', torch.cuda.current_device())
+        else:
+            device = torch.device(device_type)
+        tensor = torch.empty(shape, dtype=dtype, device=device)
+        if is_parameter:
+            tensor = torch.nn.Parameter(tensor, requires_grad)
+        else:
+            tensor.requires_grad_(requires_grad)
+        self.tensors.append(tensor)
+        return tensor
+
+
+def _serialize_object(obj, device_types):
+    """
+    Helper that pickles ``obj`` into a byte tensor, and returns it together
+    with the tensors left out of the pickle
+
+    """
+    buffer = io.BytesIO()
+    pickler = _ObjectPickler(buffer, device_types)
+    pickler.dump(obj)
+    payload = torch.ByteTensor(torch.ByteStorage.from_buffer(buffer.getvalue()))
+    return payload, pickler.tensors
+
+
+def _deserialize_object(payload, tensors=None):
+    """
+    Helper that unpickles a byte tensor of :func:`_serialize_object`, and
+    returns the object together with its out-of-band tensors, which still
+    have to be received unless ``tensors`` is given
+
+    """
+    unpickler = _ObjectUnpickler(io.BytesIO(payload.cpu().numpy().tobytes()), tensors)
+    return unpickler.load(), unpickler.tensors
+
+
+def _contiguous_tensors(tensors):
+    return [tensor.detach().contiguous() for tensor in tensors]
+
+
+def all_gather_object(object_list, obj, group=group.WORLD):
+    """
+    Gathers picklable objects from the whole group in a list.
+
+    The objects are pickled into byte tensors, which are exchanged with two
+    collectives: an all-gather of their sizes, and an all-gather of the
+    payloads padded to the largest size. Dense tensors contained in the
+    objects are not pickled. They are flattened into one buffer per dtype on
+    every process, which is exchanged with one more all-gather per dtype.
+    The gathered object of the current process holds its original tensors.
+
+    Arguments:
+        object_list (list[Any]): Output list. It should be of the size of the
+            group, and will hold the gathered objects.
+        obj (Any): Picklable object to be gathered from current process.
+        group (ProcessGroup, optional): The process group to work on
+
+    Returns:
+        None. If the calling rank is part of this group, the objects of all
+        ranks are in ``object_list``. If the calling rank is not part of the
+        group, ``object_list`` is unmodified.
+
+    .. warning::
+        This function uses :mod:`pickle`, which is known to be insecure. Only
+        call it with data you trust.
+
+    Example::
+        >>> # Note: Process group initialization omitted on each rank.
+        >>> import torch.distributed as dist
+        >>> output = [None] * dist.get_world_size()
+        >>> dist.all_gather_object(output, {'rank': dist.get_rank()})
+        >>> output
+        [{'rank': 0}, {'rank': 1}]
+    """
+    if _rank_not_in_group(group):
+        return
+    world_size = get_world_size(group)
+    if len(object_list) != world_size:
+        raise ValueError("Expected argument ``object_list`` to be a list of "
+                         "the size of the group ({}), but got {} elements".format(
+                             world_size, len(object_list)))
+
+    group_rank = get_rank(group)
+    device = _object_device(group)
+    payload, tensors = _serialize_object(obj, _out_of_band_device_types(group))
+    payload = payload.to(device)
+    local_size = torch.tensor([payload.numel()], dtype=torch.long, device=device)
+    sizes = [torch.empty_like(local_size) for _ in range(world_size)]
+    all_gather(sizes, local_size, group=group)
+    sizes = [int(size.item()) for size in sizes]
+
+    max_size = max(sizes)
+    if payload.numel() < max_size:
+        padded = payload.new_zeros(max_size)
+        padded[:payload.numel()].copy_(payload)
+        payload = padded
+    output = _object_buffer(world_size * max_size, device).view(world_size, max_size)
+    all_gather(list(output), payload, group=group)
+
+    rank_tensors = []
+    for rank, size in enumerate(sizes):
+        own_tensors = tensors if rank == group_rank else None
+        object_list[rank], received = _deserialize_object(output[rank, :size], own_tensors)
+        rank_tensors.append(received)
+    _all_gather_object_tensors(rank_tensors, group_rank, device, group)
+
+
+def _all_gather_object_tensors(rank_tensors, group_rank, device, group):
+    """
+    Helper that receives the out-of-band tensors of the objects of
+    :func:`all_gather_object`. ``rank_tensors`` holds the tensors of every
+    rank, the received ones being allocated but not filled. The tensors of
+    every dtype are exchanged with a single all-gather of flat buffers,
+    padded to the largest number of elements of a rank.
+
+    """
+    dtypes = []
+    for received in rank_tensors:
+        for tensor in received:
+            if tensor.dtype not in dtypes:
+                dtypes.append(tensor.dtype)
+    world_size = len(rank_tensors)
+    for dtype in dtypes:
+        dtype_tensors = [[t for t in received if t.dtype == dtype] for received in rank_tensors]
+        numels = [sum(t.numel() for t in ts) for ts in dtype_tensors]
+        flat = torch.zeros(max(numels), dtype=dtype, device=device)
+        local = dtype_tensors[group_rank]
+        if local:
+            flat[:numels[group_rank]].copy_(torch.cat([t.detach().reshape(-1).to(device) for t in local]))
+        gathered = [torch.empty_like(flat) for _ in range(world_size)]
+        all_gather(gathered, flat, group=group)
+        with torch.no_grad():
+            for rank, ts in enumerate(dtype_tensors):
+                if rank == group_rank:
+                    continue
+                offset = 0
+                for tensor in ts:
+                    tensor.copy_(gathered[rank][offset:offset + tensor.numel()].view_as(tensor))
+                    offset += tensor.numel()
+
+
+def broadcast_object_list(object_list, src, group=group.WORLD):
+    """
+    Broadcasts picklable objects in ``object_list`` to the whole group.
+
+    The objects are pickled into a single byte tensor, which is exchanged
+    with two collectives: a broadcast of its size and a broadcast of the
+    payload. Dense tensors contained in the objects are not pickled but
+    broadcast as tensors, without copying them on the source rank.
+
+    Arguments:
+        object_list (List[Any]): List of input objects to broadcast. Each
+            object must be picklable. Only objects on the ``src`` rank will
+            be broadcast, but each rank must provide a list of equal size.
+        src (int): Source rank from which to broadcast ``object_list``.
+        group (ProcessGroup, optional): The process group to work on
+
+    Returns:
+        None. If the calling rank is part of this group, ``object_list``
+        holds the broadcast objects from the ``src`` rank. If the calling
+        rank is not part of the group, ``object_list`` is unmodified.
+
+    .. warning::
+        This function uses :mod:`pickle`, which is known to be insecure. Only
+        call it with data you trust.
+
+    Example::
+        >>> # Note: Process group initialization omitted on each rank.
+        >>> import torch.distributed as dist
+        >>> if dist.get_rank() == 0:
+        >>>     objects = ["foo", 12, {1: 2}]
+        >>> else:
+        >>>     objects = [None, None, None]
+        >>> dist.broadcast_object_list(objects, src=0)
+        >>> objects
+        ['foo', 12, {1: 2}]
+    """
+    if _rank_not_in_group(group):
+        return
+
+    device = _object_device(group)
+    is_src = get_rank() == src
+    if is_src:
+        payload, tensors = _serialize_object(list(object_list), _out_of_band_device_types(group))
+        payload = payload.to(device)
+        size = torch.tensor([payload.numel()], dtype=torch.long, device=device)
+    else:
+        size = torch.zeros(1, dtype=torch.long, device=device)
+    broadcast(size, src, group=group)
+
+    if not is_src:
+        payload = _object_buffer(int(size.item()), device)
+    broadcast(payload, src, group=group)
+
+    if is_src:
+        tensors = _contiguous_tensors(tensors)
+    else:
+        objects, tensors = _deserialize_object(payload)
+        if len(objects) != len(object_list):
+            raise ValueError("Expected argument ``object_list`` to have {} "
+                             "elements as on the source rank, but got {}".format(
+                                 len(objects), len(object_list)))
+    for tensor in tensors:
+        broadcast(tensor, src, group=group)
+    if not is_src:
+        object_list[:] = objects
+
+
+def scatter_object_list(scatter_object_output_list, scatter_object_input_list,
+                        src=0, group=group.WORLD):
+    """
+    Scatters picklable objects in ``scatter_object_input_list`` to the whole
+    group. Each rank receives exactly one object and stores it as the first
+    element of ``scatter_object_output_list``.
+
+    The objects are pickled into byte tensors, which are exchanged with two
+    collectives: a scatter of their sizes, and a scatter of the payloads
+    padded to the largest size. On backends with point-to-point operations,
+    dense tensors contained in the objects are not pickled but sent to their
+    destination rank as tensors.
+
+    Arguments:
+        scatter_object_output_list (List[Any]): Non-empty list whose first
+            element will store the object scattered to this rank.
+        scatter_object_input_list (List[Any]): List of input objects to
+            scatter, with one object per rank of the group. Each object must
+            be picklable. Only objects on the ``src`` rank will be scattered,
+            and the argument can be ``None`` for non-src ranks.
+        src (int): Source rank from which to scatter
+            ``scatter_object_input_list``.
+        group (ProcessGroup, optional): The process group to work on
+
+    Returns:
+        None. If the calling rank is part of this group, its scattered
+        object is the first element of ``scatter_object_output_list``. If the
+        calling rank is not part of the group, the list is unmodified.
+
+    .. warning::
+        This function uses :mod:`pickle`, which is known to be insecure. Only
+        call it with data you trust.
+
+    Example::
+        >>> # Note: Process group initialization omitted on each rank.
+        >>> import torch.distributed as dist
+        >>> if dist.get_rank() == 0:
+        >>>     objects = ["foo", 12, {1: 2}]
+        >>> else:
+        >>>     objects = None
+        >>> output_list = [None]
+        >>> dist.scatter_object_list(output_list, objects, src=0)
+        >>> # Rank i gets objects[i]. For example, on rank 2:
+        >>> output_list
+        [{1: 2}]
+    """
+    if _rank_not_in_group(group):
+        return
+    if not isinstance(scatter_object_output_list, list) or len(scatter_object_output_list) < 1:
+        raise ValueError("Expected argument ``scatter_object_output_list`` to be "
+                         "a list of size at least 1")
+
+    world_size = get_world_size(group)
+    device = _object_device(group)
+    device_types = _out_of_band_device_types(group, point_to_point=True)
+    is_src = get_rank() == src
+    if is_src:
+        if len(scatter_object_input_list) != world_size:
+            raise ValueError("Expected argument ``scatter_object_input_list`` to "
+                             "be a list of the size of the group ({}), but got "
+                             "{} elements".format(world_size, len(scatter_object_input_list)))
+        serialized = [_serialize_object(obj, device_types) for obj in scatter_object_input_list]
+        max_size = max(payload.numel() for payload, _ in serialized)
+        sizes = [torch.tensor([payload.numel(), max_size], dtype=torch.long, device=device)
+                 for payload, _ in serialized]
+        payloads = []
+        for payload, _ in serialized:
+            padded = torch.zeros(max_size, dtype=torch.uint8, device=device)
+            padded[:payload.numel()].copy_(payload)
+            payloads.append(padded)
+    else:
+        sizes = None
+        payloads = None
+
+    local_size = torch.zeros(2, dtype=torch.long, device=device)
+    scatter(local_size, sizes, src=src, group=group)
+    size, max_size = local_size.tolist()
+    payload = _object_buffer(max_size, device)
+    scatter(payload, payloads, src=src, group=group)
+
+    if is_src:
+        group_rank = get_rank(group)
+        obj, _ = _deserialize_object(payload[:size], serialized[group_rank][1])
+        for rank, (_, tensors) in enumerate(serialized):
+            if rank != group_rank:
+                dst = _group_to_global_rank(group, rank)
+                for tensor in _contiguous_tensors(tensors):
+                    send(tensor, dst, group=group)
+    else:
+        obj, tensors = _deserialize_object(payload[:size])
+        for tensor in tensors:
+            recv(tensor, src, group=group)
+    scatter_object_output_list[0] = obj
+
+
 def gather(tensor,
            gather_list=None,
            dst=0,
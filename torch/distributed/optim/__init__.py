@@ -3,6 +3,12 @@
 of remote parameters (:class:`~torch.distributed.rpc.RRef`) and runs the
 optimizer locally on the workers where the parameters live.  The distributed
 optimizer can use any of the local optimizer :ref:`optimizer-algorithms` to
-apply the gradients on each worker.
+apply the gradients on each worker. ParameterServerOptimizer shares the
+optimizer of every parameter across trainers, and batches the gradients of
+concurrent trainers into one step.
+
+It also exposes ZeroRedundancyOptimizer, which shards the state of a local
+optimizer across the ranks of a data-parallel process group.
 """
-from .optimizer import DistributedOptimizer
+from .optimizer import DistributedOptimizer, ParameterServerOptimizer
+from .zero_redundancy_optimizer import ZeroRedundancyOptimizer
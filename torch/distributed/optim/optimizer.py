@@ -35,11 +35,133 @@ def _new_local_optimizer(optim_cls, local_params_rref, *args, **kwargs):
         _LocalOptimizer(optim_cls, local_params_rref, *args, **kwargs))
 
 
+class _ShardOptimizer:
+    """
+    Optimizer of a single parameter on a parameter server, shared by all
+    trainers that optimize the parameter.
+
+    Gradients submitted by trainers are summed into a pending gradient.
+    Only one thread at a time steps the optimizer; it applies the pending
+    gradients of all trainers that arrived in the meantime in one step, and
+    keeps doing so until no gradient is pending.
+    """
+    def __init__(self, optim_cls, param, args, kwargs):
+        self.param = param
+        self.config = (optim_cls, args, kwargs)
+        self.optim = optim_cls([param], *args, **kwargs)
+        # Number of parameter server optimizers sharing this optimizer,
+        # guarded by _shard_optimizers_lock.
+        self.num_users = 0
+        # Guards the pending gradient.
+        self.lock = Lock()
+        # Held by the thread that steps the optimizer.
+        self.step_lock = Lock()
+        self.pending_grad = None
+        self.pending_count = 0
+
+    def submit(self, grad, asynchronous, average):
+        with self.lock:
+            if self.pending_grad is None:
+                self.pending_grad = grad.clone()
+            else:
+                self.pending_grad.add_(grad)
+            self.pending_count += 1
+        # The thread holding the step lock applies all pending gradients
+        # before releasing it, so waiting for the lock also waits for this
+        # gradient to be applied.
+        if asynchronous:
+            if not self.step_lock.acquire(False):
+                return
+        else:
+            self.step_lock.acquire()
+        while True:
+            with self.lock:
+                grad, count = self.pending_grad, self.pending_count
+                self.pending_grad, self.pending_count = None, 0
+                if grad is None:
+                    self.step_lock.release()
+                    return
+            if average and count > 1:
+                grad.div_(count)
+            self.param.grad = grad
+            self.optim.step()
+
+
+# Optimizers of the parameters of this worker, by parameter. They are
+# created by the first parameter server optimizer over a parameter, and
+# removed once all parameter server optimizers over it are released.
+_shard_optimizers = {}
+_shard_optimizers_lock = Lock()
+
+
+def _acquire_shard_optimizer(optim_cls, param, args, kwargs):
+    with _shard_optimizers_lock:
+        shard = _shard_optimizers.get(param)
+        if shard is None:
+            shard = _ShardOptimizer(optim_cls, param, args, kwargs)
+            _shard_optimizers[param] = shard
+        elif shard.config != (optim_cls, args, kwargs):
+            raise ValueError(
+                "A parameter is already optimized by a ParameterServerOptimizer "
+                "with a different configuration: {} with args {} and kwargs {}, "
+                "got {} with args {} and kwargs {}".format(
+                    *(shard.config + (optim_cls, args, kwargs))))
+        shard.num_users += 1
+        return shard
+
+
+def _release_shard_optimizer(shard):
+    with _shard_optimizers_lock:
+        shard.num_users -= 1
+        if shard.num_users == 0:
+            del _shard_optimizers[shard.param]
+
+
+class _ParameterServerOptimizer:
+    def __init__(self, asynchronous, average, optim_cls, local_params_rref, *args, **kwargs):
+        self.asynchronous = asynchronous
+        self.average = average
+        self.shards = []
+        try:
+            for rref in local_params_rref:
+                self.shards.append(_acquire_shard_optimizer(
+                    optim_cls, rref.local_value(), args, kwargs))
+        except Exception:
+            self.release()
+            raise
+
+    def step(self, autograd_ctx_id):
+        all_local_grads = dist_autograd.get_gradients(autograd_ctx_id)
+        for shard in self.shards:
+            grad = all_local_grads.get(shard.param)
+            if grad is not None:
+                shard.submit(grad, self.asynchronous, self.average)
+
+    def release(self):
+        shards, self.shards = self.shards, []
+        for shard in shards:
+            _release_shard_optimizer(shard)
+
+    def __del__(self):
+        # Runs once the owner RRef is deleted, when the trainer drops its
+        # reference without calling close().
+        self.release()
+
+
+def _new_parameter_server_optimizer(asynchronous, average, optim_cls, local_params_rref, *args, **kwargs):
+    return rpc.RRef(_ParameterServerOptimizer(
+        asynchronous, average, optim_cls, local_params_rref, *args, **kwargs))
+
+
 def _local_optimizer_step(local_optim_rref, autograd_ctx_id):
     local_optim = local_optim_rref.local_value()
     local_optim.step(autograd_ctx_id)
 
 
+def _release_parameter_server_optimizer(ps_optim_rref):
+    ps_optim_rref.local_value().release()
+
+
 def _wait_for_all(rpc_futs):
     # TODO: improve error propagation
     exception = None
@@ -55,6 +177,24 @@ def _wait_for_all(rpc_futs):
     return results
 
 
+def _create_remote_optimizers(new_optimizer, optimizer_class, params_rref, args, kwargs, options=()):
+    per_worker_params_rref = defaultdict(list)
+    for param in params_rref:
+        per_worker_params_rref[param.owner()].append(param)
+
+    remote_optim_futs = []
+    for worker, param_rrefs in per_worker_params_rref.items():
+        remote_optim_rref_fut = rpc.rpc_async(
+            worker,
+            new_optimizer,
+            args=options + (optimizer_class, param_rrefs) + args,
+            kwargs=kwargs,
+        )
+        remote_optim_futs.append(remote_optim_rref_fut)
+
+    return _wait_for_all(remote_optim_futs)
+
+
 class DistributedOptimizer:
     """
     DistributedOptimizer takes remote references to parameters scattered
@@ -105,21 +245,8 @@ class DistributedOptimizer:
         >>>   dist_optim.step(context_id)
     """
     def __init__(self, optimizer_class, params_rref, *args, **kwargs):
-        per_worker_params_rref = defaultdict(list)
-        for param in params_rref:
-            per_worker_params_rref[param.owner()].append(param)
-
-        remote_optim_futs = []
-        for worker, param_rrefs in per_worker_params_rref.items():
-            remote_optim_rref_fut = rpc.rpc_async(
-                worker,
-                _new_local_optimizer,
-                args=(optimizer_class, param_rrefs) + args,
-                kwargs=kwargs,
-            )
-            remote_optim_futs.append(remote_optim_rref_fut)
-
-        self.remote_optimizers = _wait_for_all(remote_optim_futs)
+        self.remote_optimizers = _create_remote_optimizers(
+            _new_local_optimizer, optimizer_class, params_rref, args, kwargs)
 
     def step(self, context_id):
         """
@@ -144,3 +271,79 @@ class DistributedOptimizer:
                 args=(optim, context_id),
             ))
         _wait_for_all(rpc_futs)
+
+
+class ParameterServerOptimizer(DistributedOptimizer):
+    """
+    ParameterServerOptimizer is a :class:`DistributedOptimizer` for workers
+    that serve parameters to many trainers.
+
+    Every parameter has a single optimizer on the worker that owns it,
+    shared by all ParameterServerOptimizer instances over the parameter, on
+    any trainer. There is no lock across parameters: trainers step
+    different parameters of a worker concurrently, so the steps of several
+    trainers are pipelined over the parameters rather than serialized.
+
+    While the optimizer of a parameter runs a step, the gradients that other
+    trainers submit for the parameter are summed, and are applied together
+    in the next step. So under contention, one optimizer step applies the
+    gradients of several trainers.
+
+    By default, :meth:`step` returns once the gradients of this trainer have
+    been applied. With ``asynchronous=True``, it returns once they have been
+    submitted: if another trainer is stepping the parameter, that trainer
+    applies them in its next step. The parameters are thus updated with
+    bounded staleness, as every gradient is applied at most one step after
+    it was submitted.
+
+    The optimizer of a parameter is freed once all ParameterServerOptimizer
+    instances over it are closed with :meth:`close` or garbage collected.
+
+    Args:
+        optimizer_class (optim.Optimizer): the class of optimizer to
+            instantiate for each parameter. All ParameterServerOptimizer
+            instances over a parameter must pass the same ``optimizer_class``,
+            ``args`` and ``kwargs``, otherwise a ``ValueError`` is raised.
+        params_rref (list[RRef]): list of RRefs to local or remote parameters
+            to optimize.
+        args: arguments to pass to the optimizer constructor on each worker.
+        asynchronous (bool, optional): whether :meth:`step` returns before
+            the gradients are applied (default: ``False``).
+        average_batched_gradients (bool, optional): whether the gradients of
+            several trainers applied in one step are averaged instead of
+            summed (default: ``False``).
+        kwargs: arguments to pass to the optimizer constructor on each worker.
+
+    Example::
+        >>> # On every trainer, with the parameters owned by "ps".
+        >>> params_rref = rpc.rpc_sync("ps", get_parameter_rrefs)
+        >>> ps_optim = ParameterServerOptimizer(
+        >>>     optim.SGD, params_rref, lr=0.05, asynchronous=True)
+        >>> with dist_autograd.context() as context_id:
+        >>>     loss = rpc.rpc_sync("ps", forward, args=(input,)).sum()
+        >>>     dist_autograd.backward(context_id, [loss])
+        >>>     ps_optim.step(context_id)
+        >>> ps_optim.close()
+    """
+    def __init__(self, optimizer_class, params_rref, *args, asynchronous=False,
+                 average_batched_gradients=False, **kwargs):
+        self.remote_optimizers = _create_remote_optimizers(
+            _new_parameter_server_optimizer, optimizer_class, params_rref, args, kwargs,
+            options=(asynchronous, average_batched_gradients))
+
+    def close(self):
+        """
+        Releases the optimizers of the parameters on their workers, and
+        blocks until all workers are done. The optimizer of a parameter is
+        freed once no other ParameterServerOptimizer uses it. This
+        ParameterServerOptimizer must not be stepped afterwards.
+        """
+        rpc_futs = []
+        for optim in self.remote_optimizers:
+            rpc_futs.append(rpc.rpc_async(
+                optim.owner(),
+                _release_parameter_server_optimizer,
+                args=(optim,),
+            ))
+        self.remote_optimizers = []
+        _wait_for_all(rpc_futs)
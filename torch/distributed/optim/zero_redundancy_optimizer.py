@@ -0,0 +1,281 @@
+import io
+from itertools import chain
+
+import torch
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+from torch.distributed.distributed_c10d import _get_default_group
+from torch.optim import Optimizer
+
+
+def _broadcast_object(obj, src_rank, process_group, device):
+    r"""Broadcasts a picklable object from ``src_rank``; the other ranks pass
+    ``None`` as ``obj`` and receive it as return value."""
+    if process_group.rank() == src_rank:
+        buffer = io.BytesIO()
+        torch.save(obj, buffer)
+        data = torch.ByteTensor(torch.ByteStorage.from_buffer(buffer.getvalue())).to(device)
+        length = torch.LongTensor([data.numel()]).to(device)
+        process_group.broadcast(length, src_rank).wait()
+        process_group.broadcast(data, src_rank).wait()
+        return obj
+    length = torch.LongTensor([0]).to(device)
+    process_group.broadcast(length, src_rank).wait()
+    data = torch.empty(int(length.item()), dtype=torch.uint8, device=device)
+    process_group.broadcast(data, src_rank).wait()
+    buffer = io.BytesIO(data.cpu().numpy().tobytes())
+    return torch.load(buffer, map_location=device)
+
+
+class ZeroRedundancyOptimizer(Optimizer):
+    r"""
+    Wraps an optimizer class and shards its state across the ranks of a
+    process group, as in stage 1 of ZeRO (Rajbhandari et al., 2019).
+
+    The parameters of every parameter group are partitioned across the ranks
+    so that each rank holds about the same number of elements. Every rank
+    creates a local ``optimizer_class`` over its own partition, so it only
+    holds the optimizer state (e.g. ``exp_avg`` and ``exp_avg_sq`` of
+    :class:`~torch.optim.Adam`) of that partition. :meth:`step` steps the
+    local optimizer and broadcasts the updated parameters of every rank to
+    the others, in buckets of at most ``bucket_cap_mb``.
+
+    The gradients of all parameters are expected to be the same on every
+    rank when :meth:`step` is called, e.g. because they were reduced by
+    :class:`~torch.nn.parallel.DistributedDataParallel`.
+
+    The options of :attr:`param_groups` are forwarded to the local optimizer
+    on every step, so learning rate schedulers can be attached to this
+    optimizer. The state dict is sharded as well: call
+    :meth:`consolidate_state_dict` on all ranks to gather it on one rank,
+    where :meth:`state_dict` then returns a regular state dict of
+    ``optimizer_class`` that :meth:`load_state_dict` accepts on any number of
+    ranks.
+
+    Args:
+        params (iterable): an iterable of :class:`torch.Tensor` s or
+            :class:`dict` s, with the same parameters on every rank.
+        optimizer_class (optim.Optimizer): the class of the local optimizer.
+        process_group (ProcessGroup, optional): process group to shard across
+            (default: the default process group).
+        bucket_cap_mb (float, optional): maximum size in megabytes of the
+            buckets the parameters are broadcast in (default: 16).
+        defaults: options of the local optimizer, such as ``lr``.
+
+    Example::
+        >>> ddp = torch.nn.parallel.DistributedDataParallel(model)
+        >>> optimizer = ZeroRedundancyOptimizer(
+        >>>     ddp.parameters(), torch.optim.Adam, lr=0.01)
+        >>> loss_fn(ddp(input), target).backward()
+        >>> optimizer.step()
+        >>> # Checkpoint on rank 0
+        >>> optimizer.consolidate_state_dict(to=0)
+        >>> if torch.distributed.get_rank() == 0:
+        >>>     torch.save(optimizer.state_dict(), "optimizer.pt")
+    """
+    def __init__(self, params, optimizer_class, process_group=None, bucket_cap_mb=16, **defaults):
+        self.process_group = process_group if process_group is not None else _get_default_group()
+        self.rank = self.process_group.rank()
+        self.world_size = self.process_group.size()
+        self.bucket_bytes_cap = int(bucket_cap_mb * 1024 * 1024)
+        self.optimizer_class = optimizer_class
+        self.optim = None
+        # Parameters of every rank, one list per parameter group, and the
+        # number of elements assigned to every rank.
+        self._partition = [[] for _ in range(self.world_size)]
+        self._partition_numel = [0] * self.world_size
+        self._consolidated_state_dict = None
+
+        super(ZeroRedundancyOptimizer, self).__init__(params, defaults)
+
+        self.optim = optimizer_class(
+            [self._local_param_group(i) for i in range(len(self.param_groups))],
+            **defaults)
+        for group, local_group in zip(self.param_groups, self.optim.param_groups):
+            self._complete_param_group(group, local_group)
+        self._build_buckets()
+
+    def _local_param_group(self, index):
+        local_group = {k: v for k, v in self.param_groups[index].items() if k != 'params'}
+        local_group['params'] = self._partition[self.rank][index]
+        return local_group
+
+    @staticmethod
+    def _complete_param_group(group, local_group):
+        # Add the defaults of the local optimizer that were not specified,
+        # so that the state dict holds all options.
+        for key, value in local_group.items():
+            if key != 'params':
+                group.setdefault(key, value)
+
+    def _partition_param_group(self, params):
+        shards = [[] for _ in range(self.world_size)]
+        for param in params:
+            rank = self._partition_numel.index(min(self._partition_numel))
+            shards[rank].append(param)
+            self._partition_numel[rank] += param.numel()
+        for rank, shard in enumerate(shards):
+            self._partition[rank].append(shard)
+
+    def _build_buckets(self):
+        # The parameters of every rank, bucketed by dtype and device.
+        self._buckets = []
+        for rank_groups in self._partition:
+            buckets = []
+            open_buckets = {}
+            for param in chain(*rank_groups):
+                key = (param.dtype, param.device)
+                param_bytes = param.numel() * param.element_size()
+                if key not in open_buckets or open_buckets[key][1] + param_bytes > self.bucket_bytes_cap:
+                    open_buckets[key] = [[], 0]
+                    buckets.append(open_buckets[key][0])
+                open_buckets[key][0].append(param)
+                open_buckets[key][1] += param_bytes
+            self._buckets.append(buckets)
+
+    def add_param_group(self, param_group):
+        r"""Adds a param group to the :class:`Optimizer` s ``param_groups``,
+        and its partition on this rank to the local optimizer.
+
+        Args:
+            param_group (dict): Specifies what Tensors should be optimized
+                along with group specific optimization options.
+        """
+        super(ZeroRedundancyOptimizer, self).add_param_group(param_group)
+        self._partition_param_group(self.param_groups[-1]['params'])
+        if self.optim is not None:
+            self.optim.add_param_group(self._local_param_group(len(self.param_groups) - 1))
+            self._complete_param_group(self.param_groups[-1], self.optim.param_groups[-1])
+            self._build_buckets()
+
+    def _sync_param_groups(self):
+        for group, local_group in zip(self.param_groups, self.optim.param_groups):
+            for key, value in group.items():
+                if key != 'params':
+                    local_group[key] = value
+
+    @torch.no_grad()
+    def _broadcast_params(self):
+        works = []
+        for rank, buckets in enumerate(self._buckets):
+            for params in buckets:
+                if len(params) == 1 and params[0].is_contiguous():
+                    flat = None
+                    tensor = params[0]
+                elif rank == self.rank:
+                    flat = tensor = _flatten_dense_tensors(params)
+                else:
+                    flat = tensor = params[0].new_empty(sum(p.numel() for p in params))
+                works.append((self.process_group.broadcast(tensor, rank), rank, params, flat))
+        for work, rank, params, flat in works:
+            work.wait()
+            if flat is not None and rank != self.rank:
+                for param, synced in zip(params, _unflatten_dense_tensors(flat, params)):
+                    param.copy_(synced)
+
+    def step(self, closure=None):
+        r"""Performs a single optimization step of the local optimizer, and
+        broadcasts the updated parameters of every rank.
+
+        Args:
+            closure (callable, optional): A closure that reevaluates the model
+                and returns the loss.
+        """
+        self._sync_param_groups()
+        loss = self.optim.step(closure)
+        self._broadcast_params()
+        return loss
+
+    def _local_to_global_indices(self):
+        global_index = {id(p): i for i, p in enumerate(
+            chain(*(group['params'] for group in self.param_groups)))}
+        return [global_index[id(p)] for p in chain(*(group['params'] for group in self.optim.param_groups))]
+
+    def consolidate_state_dict(self, to=0):
+        r"""Gathers the optimizer state of all ranks on rank ``to``, where it
+        is returned by :meth:`state_dict`. Has to be called on all ranks.
+
+        Args:
+            to (int, optional): rank that receives the state (default: 0)
+        """
+        self._sync_param_groups()
+        local_to_global = self._local_to_global_indices()
+        local_state = {local_to_global[index]: state
+                       for index, state in self.optim.state_dict()['state'].items()}
+
+        device = self.param_groups[0]['params'][0].device
+        state = {}
+        for rank in range(self.world_size):
+            rank_state = _broadcast_object(
+                local_state if rank == self.rank else None, rank, self.process_group, device)
+            if self.rank == to:
+                state.update(rank_state)
+
+        if self.rank != to:
+            self._consolidated_state_dict = None
+            return
+
+        param_groups = []
+        start_index = 0
+        for group in self.param_groups:
+            packed = {k: v for k, v in group.items() if k != 'params'}
+            packed['params'] = list(range(start_index, start_index + len(group['params'])))
+            start_index += len(group['params'])
+            param_groups.append(packed)
+        self._consolidated_state_dict = {
+            'state': state,
+            'param_groups': param_groups,
+        }
+
+    def state_dict(self):
+        r"""Returns the state of the optimizer gathered by the last call of
+        :meth:`consolidate_state_dict` as a :class:`dict`, in the format of
+        :meth:`torch.optim.Optimizer.state_dict`.
+        """
+        if self._consolidated_state_dict is None:
+            raise RuntimeError("The optimizer state has not been consolidated on "
+                               "rank {}, call consolidate_state_dict(to={}) on all "
+                               "ranks first".format(self.rank, self.rank))
+        return self._consolidated_state_dict
+
+    def load_state_dict(self, state_dict):
+        r"""Loads the optimizer state, and keeps the state of the parameters
+        of this rank.
+
+        Args:
+            state_dict (dict): optimizer state. Should be an object returned
+                from a call to :meth:`state_dict`, or of a regular optimizer
+                over the same parameters.
+        """
+        groups = self.param_groups
+        saved_groups = state_dict['param_groups']
+        if len(groups) != len(saved_groups):
+            raise ValueError("loaded state dict has a different number of "
+                             "parameter groups")
+        if any(len(g['params']) != len(sg['params']) for g, sg in zip(groups, saved_groups)):
+            raise ValueError("loaded state dict contains a parameter group "
+                             "that doesn't match the size of optimizer's group")
+
+        for group, saved_group in zip(groups, saved_groups):
+            for key, value in saved_group.items():
+                if key != 'params':
+                    group[key] = value
+        self._sync_param_groups()
+
+        saved_ids = list(chain(*(group['params'] for group in saved_groups)))
+        local_state = {}
+        for local_index, global_index in enumerate(self._local_to_global_indices()):
+            saved_id = saved_ids[global_index]
+            if saved_id in state_dict['state']:
+                local_state[local_index] = state_dict['state'][saved_id]
+
+        local_param_groups = []
+        start_index = 0
+        for local_group in self.optim.param_groups:
+            packed = {k: v for k, v in local_group.items() if k != 'params'}
+            packed['params'] = list(range(start_index, start_index + len(local_group['params'])))
+            start_index += len(local_group['params'])
+            local_param_groups.append(packed)
+        self.optim.load_state_dict({
+            'state': local_state,
+            'param_groups': local_param_groups,
+        })
@@ -33,6 +33,8 @@ from .internal import (
     RPCExecMode,
     _internal_rpc_pickler,
     _build_rpc_profiling_key,
+    _handle_exception,
+    _run_batch_function,
 )
 
 from .constants import UNSET_RPC_TIMEOUT
@@ -768,3 +770,94 @@ def rpc_async(to, func, args=None, kwargs=None, timeout=UNSET_RPC_TIMEOUT):
         >>> rpc.shutdown()
     """
     return _invoke_rpc(to, func, RPCExecMode.ASYNC, args, kwargs, timeout)
+
+
+def _get_batch_result(fut, index):
+    result = fut.wait()[index]
+    _handle_exception(result)
+    return result
+
+
+@_require_initialized
+def rpc_async_many(to, func, args_list, kwargs_list=None, batch_func=None, timeout=UNSET_RPC_TIMEOUT):
+    r"""
+    Make non-blocking RPC calls to run function ``func`` on worker ``to``
+    once for every element of ``args_list``. All calls are sent in a single
+    RPC message and their results are returned in a single response, which
+    amortizes the serialization, profiling and messaging overhead of each
+    RPC over the whole batch. This method is thread-safe. It immediately
+    returns one Future per call.
+
+    The calls are run one after the other on the callee. If ``batch_func`` is
+    given, it is called once instead with the whole ``args_list``, e.g. to
+    run a vectorized version of ``func``, and has to return a list with one
+    result per call.
+
+    Arguments:
+        to (str or WorkerInfo): id or name of the destination worker.
+        func (callable): a callable function, such as Python callables and
+                         builtin operators (e.g. :meth:`~torch.add`).
+                         TorchScript functions are not supported.
+        args_list (list[tuple]): the argument tuple of every ``func``
+                                 invocation.
+        kwargs_list (list[dict], optional): the dictionary of keyword
+                                            arguments of every ``func``
+                                            invocation.
+        batch_func (callable, optional): a Python function that takes
+                                         ``args_list`` and returns the list of
+                                         results of all calls. It has to be
+                                         picklable and defined on the callee.
+        timeout (float, optional): timeout in seconds to use for the batch.
+                                   If not provided, the default value set
+                                   during initialization or with
+                                   `_set_rpc_timeout` is used.
+
+    Returns:
+        Returns a list of Future objects, one per element of ``args_list``.
+        When completed, the return value of the call can be retrieved from
+        the Future object. An exception raised by one call without
+        ``batch_func`` only fails the Future of that call.
+
+    Example::
+        >>> # On worker 0:
+        >>> futs = rpc.rpc_async_many(
+        >>>     "worker1", torch.add, [(torch.ones(2), i) for i in range(100)])
+        >>> results = [fut.wait() for fut in futs]
+        >>>
+        >>> # Vectorized on the callee
+        >>> def batch_lookup(args_list):
+        >>>     indices = torch.cat([indices for indices, in args_list])
+        >>>     return list(embedding(indices).split([len(i) for i, in args_list]))
+        >>>
+        >>> futs = rpc.rpc_async_many(
+        >>>     "worker1", lookup, [(ids,) for ids in requests], batch_func=batch_lookup)
+    """
+    if not callable(func):
+        raise TypeError("function should be callable.")
+    if isinstance(func, torch.jit.ScriptFunction):
+        raise TypeError("rpc_async_many does not support TorchScript functions.")
+    args_list = [tuple(args) if args else () for args in args_list]
+    if kwargs_list is None:
+        kwargs_list = [{}] * len(args_list)
+    else:
+        if batch_func is not None:
+            raise ValueError("kwargs_list is not supported with batch_func")
+        if len(kwargs_list) != len(args_list):
+            raise ValueError(
+                "Expected kwargs_list to have {} elements, one per call, but "
+                "got {}".format(len(args_list), len(kwargs_list)))
+        kwargs_list = [kwargs if kwargs else {} for kwargs in kwargs_list]
+    if not args_list:
+        return []
+
+    fut = _invoke_rpc(
+        to,
+        _run_batch_function,
+        RPCExecMode.ASYNC,
+        args=(func, args_list, kwargs_list, batch_func),
+        rpc_timeout=timeout,
+    )
+    return [
+        fut.then(functools.partial(_get_batch_result, index=index))
+        for index in range(len(args_list))
+    ]
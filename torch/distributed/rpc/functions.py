@@ -1,4 +1,10 @@
 import functools
+import threading
+import time
+import traceback
+
+import torch
+from .internal import RemoteException
 
 
 def async_execution(fn):
@@ -81,3 +87,149 @@ def async_execution(fn):
         return fn(*args, **kwargs)
     wrapper._wrapped_async_rpc_function = fn
     return wrapper
+
+
+class _BatchQueue(object):
+    r"""
+    Queue of the pending calls of a function decorated with
+    :meth:`batched_execution`. A background thread runs the function on
+    batches of calls, when ``max_batch_size`` calls are pending or when the
+    oldest pending call has waited for ``max_delay_us`` microseconds.
+    """
+    def __init__(self, fn, max_batch_size, max_delay_us):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_us / 1e6
+        self.cond = threading.Condition()
+        # (args, future, enqueue time) of the pending calls
+        self.requests = []
+        self.thread = None
+        self.num_calls = 0
+        self.num_batches = 0
+        self.total_queueing_delay = 0.0
+        self.max_queueing_delay = 0.0
+
+    def submit(self, args):
+        fut = torch.futures.Future()
+        with self.cond:
+            self.requests.append((args, fut, time.time()))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            if len(self.requests) == 1 or len(self.requests) >= self.max_batch_size:
+                self.cond.notify()
+        return fut
+
+    def metrics(self):
+        with self.cond:
+            return {
+                "num_calls": self.num_calls,
+                "num_batches": self.num_batches,
+                "mean_batch_size": self.num_calls / self.num_batches if self.num_batches else 0.0,
+                "mean_queueing_delay_us": (
+                    self.total_queueing_delay / self.num_calls * 1e6 if self.num_calls else 0.0),
+                "max_queueing_delay_us": self.max_queueing_delay * 1e6,
+            }
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.requests:
+                    self.cond.wait()
+                deadline = self.requests[0][2] + self.max_delay
+                while len(self.requests) < self.max_batch_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                batch = self.requests[:self.max_batch_size]
+                del self.requests[:self.max_batch_size]
+
+                now = time.time()
+                self.num_calls += len(batch)
+                self.num_batches += 1
+                for _, _, enqueue_time in batch:
+                    self.total_queueing_delay += now - enqueue_time
+                    self.max_queueing_delay = max(self.max_queueing_delay, now - enqueue_time)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            results = self.fn([args for args, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    "Batched function returned {} results for {} calls".format(
+                        len(results), len(batch)))
+        except Exception as e:
+            # The exception is sent to every caller as the result of its
+            # call, and raised by the RPC layer on the caller.
+            except_str = "{}\n{}".format(repr(e), traceback.format_exc())
+            results = [RemoteException(except_str, type(e))] * len(batch)
+        for (_, fut, _), result in zip(batch, results):
+            fut.set_result(result)
+
+
+def batched_execution(max_batch_size=32, max_delay_us=1000):
+    r"""
+    A decorator for a function that runs concurrent RPC calls to it on the
+    callee as a single batched call. The decorated function takes the list
+    of the argument tuples of a batch of calls and returns the list of their
+    results, e.g. to run a single ``embedding_bag`` for the lookups of many
+    callers. The callers call it with the arguments of a single call, and
+    receive the result of their call.
+
+    Incoming calls are queued until ``max_batch_size`` calls are pending or
+    the oldest pending call has waited for ``max_delay_us`` microseconds,
+    whichever comes first. The batch is then run on a background thread, and
+    the calls pending meanwhile are queued for the next batch. If the
+    function raises an exception, it is raised for every call of the batch.
+
+    The decorated function is run with
+    :meth:`~torch.distributed.rpc.functions.async_execution` and returns a
+    ``torch.futures.Future`` when called locally. Its ``batching_metrics()``
+    method returns a dictionary with the number of calls and batches run so
+    far (``num_calls``, ``num_batches``), the mean batch size
+    (``mean_batch_size``), and the mean and maximum time calls have waited in
+    the queue (``mean_queueing_delay_us``, ``max_queueing_delay_us``).
+
+    Arguments:
+        max_batch_size (int): maximum number of calls per batch (default: 32).
+        max_delay_us (float): maximum time in microseconds that a call waits
+                              for other calls before its batch is run
+                              (default: 1000).
+
+    Example::
+        >>> from torch.distributed import rpc
+        >>>
+        >>> # omitting setup and shutdown RPC
+        >>>
+        >>> # On all workers
+        >>> @rpc.functions.batched_execution(max_batch_size=64, max_delay_us=500)
+        >>> def lookup(args_list):
+        >>>     indices = [indices for indices, in args_list]
+        >>>     embeddings = embedding(torch.cat(indices))
+        >>>     return list(embeddings.split([len(i) for i in indices]))
+        >>>
+        >>> # On each trainer, concurrent calls are batched on "ps"
+        >>> embeddings = rpc.rpc_sync("ps", lookup, args=(indices,))
+        >>>
+        >>> # On "ps"
+        >>> print(lookup.batching_metrics()["mean_batch_size"])
+    """
+    if max_batch_size < 1:
+        raise ValueError("Invalid max_batch_size value: {}".format(max_batch_size))
+    if max_delay_us < 0:
+        raise ValueError("Invalid max_delay_us value: {}".format(max_delay_us))
+
+    def decorator(fn):
+        queue = _BatchQueue(fn, max_batch_size, max_delay_us)
+
+        @async_execution
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return queue.submit(args)
+
+        wrapper.batching_metrics = queue.metrics
+        return wrapper
+
+    return decorator
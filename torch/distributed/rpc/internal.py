@@ -9,6 +9,11 @@ import traceback
 import torch
 import torch.distributed as dist
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 # Thread local tensor tables to store tensors while pickling torch.Tensor
 # objects
@@ -19,6 +24,24 @@ class RPCExecMode(Enum):
     ASYNC = "async"
     REMOTE = "remote"
 
+# Pickle protocol 5 (PEP 574) lets buffers of objects such as numpy arrays
+# be sent out-of-band, without copying them into the pickle.
+_PICKLE_PROTOCOL = min(pickle.HIGHEST_PROTOCOL, 5)
+_OUT_OF_BAND_PROTOCOL = 5
+# Smaller buffers are cheaper to copy than to send as separate tensors.
+_OUT_OF_BAND_MIN_BYTES = 64 * 1024
+
+# Types of the arguments of Python UDFs that take the fast serialization path.
+_PRIMITIVE_TYPES = (int, float, bool, str, bytes, type(None))
+
+
+class _PicklerState:
+    def __init__(self, pickler, buffer):
+        self.pickler = pickler
+        self.buffer = buffer
+        self.in_use = False
+
+
 class _InternalRPCPickler:
     r"""
     This class provides serialize() and deserialize() interfaces to serialize
@@ -28,11 +51,17 @@ class _InternalRPCPickler:
     tables, this serialization format is consistent with builtin operator and args
     using JIT pickler. This format will make tensor handling in C++ much easier,
     e.g. attach tensor to distributed autograd graph in C++
+
+    Every thread reuses one pickler and output buffer. With pickle protocol 5,
+    large contiguous buffers of non tensor data, e.g. numpy arrays, are not
+    copied into the binary string but appended to the tensor table as byte
+    tensors, in reverse order.
     """
 
     def __init__(self):
         self._dispatch_table = copyreg.dispatch_table.copy()
         self._dispatch_table[torch.Tensor] = self._tensor_reducer
+        self._thread_local = threading.local()
 
     @classmethod
     def _tensor_receiver(cls, tensor_index):
@@ -53,14 +82,36 @@ class _InternalRPCPickler:
         rref_fork_data = rref._serialize()
         return (_InternalRPCPickler._rref_receiver, (rref_fork_data, ))
 
-    def serialize(self, obj):
-        r"""
-        Serialize non tensor data into binary string, tensor data into
-        tensor table
-        """
-        f = io.BytesIO()
-        p = pickle.Pickler(f)
-        p.dispatch_table = self._dispatch_table
+    @classmethod
+    def _python_udf_receiver(cls, func, args, tensor_args, kwargs):
+        global _thread_local_tensor_tables
+        args = list(args)
+        for arg_index, tensor_index in tensor_args:
+            args[arg_index] = _thread_local_tensor_tables.recv_tables[tensor_index]
+        return PythonUDF(func, tuple(args), kwargs)
+
+    def _buffer_callback(self, buffer):
+        # Returning True keeps the buffer in-band.
+        if numpy is None:
+            return True
+        try:
+            raw = buffer.raw()
+        except BufferError:
+            # Not contiguous
+            return True
+        if raw.readonly or raw.nbytes < _OUT_OF_BAND_MIN_BYTES:
+            return True
+        global _thread_local_tensor_tables
+        _thread_local_tensor_tables.send_buffers.append(
+            torch.from_numpy(numpy.frombuffer(raw, dtype=numpy.uint8)))
+        return False
+
+    def _new_pickler_state(self):
+        buffer = io.BytesIO()
+        if _PICKLE_PROTOCOL >= _OUT_OF_BAND_PROTOCOL:
+            pickler = pickle.Pickler(buffer, _PICKLE_PROTOCOL, buffer_callback=self._buffer_callback)
+        else:
+            pickler = pickle.Pickler(buffer, _PICKLE_PROTOCOL)
 
         # rpc api could accept user picklers inheriting from _InternalRPCPickler to serialize rref,
         # user picklers could have different initialization function from _InternalRPCPickler,
@@ -68,27 +119,89 @@ class _InternalRPCPickler:
         # in python. also, when _internal_rpc_pickler is imported to rpc/api.py, rpc.RRef is not
         # compiled yet, it is not good place to acces rpc.RRef inside _InternalRPCPickler constructor,
         # so puting rref's dispatch table here
-        p.dispatch_table[dist.rpc.RRef] = self._rref_reducer
+        self._dispatch_table[dist.rpc.RRef] = self._rref_reducer
+        pickler.dispatch_table = self._dispatch_table
+        return _PicklerState(pickler, buffer)
+
+    def _acquire_pickler(self):
+        state = getattr(self._thread_local, "pickler_state", None)
+        if state is None:
+            state = self._new_pickler_state()
+            self._thread_local.pickler_state = state
+        elif state.in_use:
+            # Nested call, e.g. from a __getstate__ that serializes an RPC
+            # payload itself, which cannot reuse the pickler of the outer
+            # call.
+            state = self._new_pickler_state()
+        state.in_use = True
+        return state
+
+    def _release_pickler(self, state):
+        state.in_use = False
+        state.buffer.seek(0)
+        state.buffer.truncate()
+        state.pickler.clear_memo()
+
+    def _reduce_python_udf(self, python_udf, tensors):
+        # Fast path for Python UDFs whose arguments are all tensors or
+        # primitives: the tensors are reduced in one call instead of one
+        # call each. A tensor passed as several arguments is sent once.
+        if python_udf.kwargs:
+            for value in python_udf.kwargs.values():
+                if type(value) not in _PRIMITIVE_TYPES:
+                    return python_udf
+        args = list(python_udf.args)
+        # (argument index, tensor table index) of the tensor arguments.
+        tensor_args = []
+        unique_tensors = []
+        tensor_table_indices = {}
+        for index, arg in enumerate(args):
+            if type(arg) is torch.Tensor:
+                tensor_index = tensor_table_indices.get(id(arg))
+                if tensor_index is None:
+                    tensor_index = len(unique_tensors)
+                    tensor_table_indices[id(arg)] = tensor_index
+                    unique_tensors.append(arg)
+                tensor_args.append((index, tensor_index))
+                args[index] = None
+            elif type(arg) not in _PRIMITIVE_TYPES:
+                return python_udf
+        if not tensor_args:
+            return python_udf
+        tensors.extend(unique_tensors)
+        return _ReducedPythonUDF(
+            python_udf.func, tuple(args), tuple(tensor_args), python_udf.kwargs)
 
+    def serialize(self, obj):
+        r"""
+        Serialize non tensor data into binary string, tensor data into
+        tensor table
+        """
         # save _thread_local_tensor_tables.send_tables if it is in nested call
         global _thread_local_tensor_tables
-        if hasattr(_thread_local_tensor_tables, "send_tables"):
-            old_send_tables = _thread_local_tensor_tables.send_tables
-        else:
-            old_send_tables = None
-        _thread_local_tensor_tables.send_tables = []
-
-        p.dump(obj)
-
-        # restore _thread_local_tensor_tables.send_tables if return
-        # from nested call, otherwise clean up the table
-        tensors = _thread_local_tensor_tables.send_tables
-        if old_send_tables is not None:
+        old_send_tables = getattr(_thread_local_tensor_tables, "send_tables", None)
+        old_send_buffers = getattr(_thread_local_tensor_tables, "send_buffers", None)
+        tensors = []
+        buffers = []
+        _thread_local_tensor_tables.send_tables = tensors
+        _thread_local_tensor_tables.send_buffers = buffers
+
+        state = self._acquire_pickler()
+        try:
+            if type(obj) is PythonUDF and type(obj.args) in (tuple, list):
+                obj = self._reduce_python_udf(obj, tensors)
+            state.pickler.dump(obj)
+            binary_data = state.buffer.getvalue()
+        finally:
+            self._release_pickler(state)
+            # restore _thread_local_tensor_tables.send_tables if return
+            # from nested call
             _thread_local_tensor_tables.send_tables = old_send_tables
-        else:
-            del _thread_local_tensor_tables.send_tables
+            _thread_local_tensor_tables.send_buffers = old_send_buffers
 
-        return (f.getvalue(), tensors)
+        if buffers:
+            tensors.extend(reversed(buffers))
+        return (binary_data, tensors)
 
     def deserialize(self, binary_data, tensor_table):
         r"""
@@ -103,7 +216,13 @@ class _InternalRPCPickler:
         _thread_local_tensor_tables.recv_tables = tensor_table
 
         try:
-            ret = pickle.loads(binary_data)
+            if tensor_table and _PICKLE_PROTOCOL >= _OUT_OF_BAND_PROTOCOL:
+                # Out-of-band buffers are at the end of the tensor table, in
+                # reverse order.
+                buffers = (memoryview(tensor.numpy()) for tensor in reversed(tensor_table))
+                ret = pickle.loads(binary_data, buffers=buffers)
+            else:
+                ret = pickle.loads(binary_data)
         except AttributeError as e:
             # Occurs when function is not found on module/class during
             # unpickling.
@@ -122,6 +241,18 @@ class _InternalRPCPickler:
         return ret
 
 
+class _ReducedPythonUDF:
+    def __init__(self, func, args, tensor_args, kwargs):
+        self.func = func
+        self.args = args
+        self.tensor_args = tensor_args
+        self.kwargs = kwargs
+
+    def __reduce__(self):
+        return (_InternalRPCPickler._python_udf_receiver,
+                (self.func, self.args, self.tensor_args, self.kwargs))
+
+
 # Create _internal_rpc_pickler only once to initialize _dispatch_table only once
 _internal_rpc_pickler = _InternalRPCPickler()
 
@@ -153,6 +284,30 @@ def _run_function(python_udf):
     return result
 
 
+def _run_batch_function(func, args_list, kwargs_list, batch_func):
+    r"""
+    Runs the calls of :meth:`~torch.distributed.rpc.rpc_async_many` on the
+    callee and returns their results in a list. The exception raised by a
+    call is wrapped in ``RemoteException`` in its place in the list.
+    """
+    if batch_func is not None:
+        results = batch_func(args_list)
+        if len(results) != len(args_list):
+            raise ValueError(
+                "batch_func returned {} results for {} calls".format(
+                    len(results), len(args_list)))
+        return list(results)
+
+    results = []
+    for args, kwargs in zip(args_list, kwargs_list):
+        try:
+            results.append(func(*args, **kwargs))
+        except Exception as e:
+            except_str = "{}\n{}".format(repr(e), traceback.format_exc())
+            results.append(RemoteException(except_str, type(e)))
+    return results
+
+
 def _handle_exception(result):
     if isinstance(result, RemoteException):
         raise result.exception_type(result.msg)
@@ -0,0 +1,160 @@
+import collections
+import threading
+
+import torch
+
+from .api import rpc_sync
+from .constants import UNSET_RPC_TIMEOUT
+
+
+def _collect_tensors(value, tensors):
+    if isinstance(value, torch.Tensor):
+        tensors.append(value)
+    elif isinstance(value, torch.nn.Module):
+        tensors.extend(value.parameters())
+        tensors.extend(value.buffers())
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _collect_tensors(v, tensors)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _collect_tensors(v, tensors)
+
+
+def _value_version(rref, value):
+    r"""Version of the value of an OwnerRRef. It changes when the value is
+    marked as modified, when a tensor of the value is modified in place, which
+    bumps the tensor's version counter, or when a tensor of a container or
+    module is replaced. The generation is kept by the OwnerRRef, and so is
+    freed with it."""
+    tensors = []
+    _collect_tensors(value, tensors)
+    generation = rref._value_generation(tensors)
+    return (generation, tuple(t._version for t in tensors))
+
+
+def _fetch_if_modified(rref, version):
+    value = rref.local_value()
+    owner_version = _value_version(rref, value)
+    if owner_version == version:
+        return owner_version, False, None
+    return owner_version, True, value
+
+
+class RRefCache(object):
+    r"""
+    Caches local copies of the values of remote
+    :class:`~torch.distributed.rpc.RRef` s.
+
+    :meth:`to_here` fetches the value of an RRef from its owner on the first
+    call, like :meth:`~torch.distributed.rpc.RRef.to_here`, and keeps it
+    together with the version of the value on the owner. Later calls only
+    send the cached version to the owner, which sends the value back only if
+    its version changed, so that values that are rarely modified, such as
+    frozen embedding tables, are not pickled again on every fetch.
+
+    The owner tracks the version of tensors, of lists, tuples and dicts of
+    tensors and of :class:`~torch.nn.Module` s through the version counters
+    of their tensors, which are bumped by in-place operations. Other
+    modifications of the value, e.g. of the attributes of a Python object,
+    have to be reported on the owner with :meth:`mark_modified`.
+
+    The cache holds at most ``max_size`` values, and evicts the least
+    recently used ones. The cached RRefs are kept alive until they are
+    evicted or :meth:`clear` is called. The values returned by
+    :meth:`to_here` are shared by all callers and should not be modified.
+
+    Arguments:
+        max_size (int): maximum number of cached values (default: 128).
+
+    Example::
+        >>> import torch.distributed.rpc as rpc
+        >>> cache = rpc.RRefCache(max_size=16)
+        >>> rref = rpc.remote("worker1", torch.add, args=(torch.ones(1000, 64), 1))
+        >>> table = cache.to_here(rref)  # fetches the value
+        >>> table = cache.to_here(rref)  # only checks the version
+        >>> print(cache.stats())
+    """
+    def __init__(self, max_size=128):
+        if max_size < 1:
+            raise ValueError("Invalid max_size value: {}".format(max_size))
+        self.max_size = max_size
+        # RRef -> (owner version, value), in order of use.
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def to_here(self, rref, timeout=UNSET_RPC_TIMEOUT):
+        r"""
+        Returns the value of ``rref``, from the cache if the value did not
+        change on the owner since it was cached. If the current worker is the
+        owner, the local value is returned without caching.
+
+        Arguments:
+            rref (RRef): the RRef to fetch the value of.
+            timeout (float, optional): timeout in seconds of the RPC to the
+                owner. If not provided, the default RPC timeout is used.
+        """
+        if rref.is_owner():
+            return rref.local_value()
+        with self._lock:
+            entry = self._entries.get(rref)
+        version = entry[0] if entry is not None else None
+        owner_version, modified, value = rpc_sync(
+            rref.owner(), _fetch_if_modified, args=(rref, version), timeout=timeout)
+
+        with self._lock:
+            if not modified:
+                self._hits += 1
+                value = entry[1]
+            else:
+                self._misses += 1
+            self._entries[rref] = (owner_version, value)
+            self._entries.move_to_end(rref)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def invalidate(self, rref):
+        r"""Removes the cached value of ``rref``, if any."""
+        with self._lock:
+            self._entries.pop(rref, None)
+
+    def clear(self):
+        r"""Removes all cached values."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        r"""
+        Returns a dictionary with the number of calls of :meth:`to_here` that
+        were served from the cache (``hits``) and that fetched the value from
+        the owner (``misses``), the number of evicted values (``evictions``)
+        and the number of cached values (``size``).
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "size": len(self._entries),
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @staticmethod
+    def mark_modified(rref):
+        r"""
+        Reports on the owner of ``rref`` that its value was modified, so that
+        the cached copies of all workers are fetched again. Modifications of
+        tensors in place are detected without calling this method.
+
+        Arguments:
+            rref (RRef): an RRef owned by the current worker.
+        """
+        rref._mark_value_modified()
@@ -24,6 +24,60 @@ class ModuleAttributeError(AttributeError):
     fixes this issue."""
 
 
+# Forward hooks of all modules, called before the hooks of every module.
+_global_forward_pre_hooks = OrderedDict()
+_global_forward_hooks = OrderedDict()
+
+
+def register_module_forward_pre_hook(hook):
+    r"""Registers a forward pre-hook common to all modules.
+
+    The hook is called before the forward pre-hooks of the module, every time
+    before :func:`forward` of any module is invoked, with the same signature
+    and semantics as the hooks of :meth:`Module.register_forward_pre_hook`::
+
+        hook(module, input) -> None or modified input
+
+    .. warning ::
+
+        This adds global state to the `nn.module` module and is intended for
+        debugging and profiling tools.
+
+    Returns:
+        :class:`torch.utils.hooks.RemovableHandle`:
+            a handle that can be used to remove the added hook by calling
+            ``handle.remove()``
+    """
+    handle = hooks.RemovableHandle(_global_forward_pre_hooks)
+    _global_forward_pre_hooks[handle.id] = hook
+    return handle
+
+
+def register_module_forward_hook(hook):
+    r"""Registers a forward hook common to all modules.
+
+    The hook is called before the forward hooks of the module, every time
+    after :func:`forward` of any module has computed an output, with the same
+    signature and semantics as the hooks of
+    :meth:`Module.register_forward_hook`::
+
+        hook(module, input, output) -> None or modified output
+
+    .. warning ::
+
+        This adds global state to the `nn.module` module and is intended for
+        debugging and profiling tools.
+
+    Returns:
+        :class:`torch.utils.hooks.RemovableHandle`:
+            a handle that can be used to remove the added hook by calling
+            ``handle.remove()``
+    """
+    handle = hooks.RemovableHandle(_global_forward_hooks)
+    _global_forward_hooks[handle.id] = hook
+    return handle
+
+
 def _addindent(s_, numSpaces):
     s = s_.split('\n')
     # don't do anything for single-line stuff
@@ -565,7 +619,9 @@ class Module(object):
         return result
 
     def __call__(self, *input, **kwargs):
-        for hook in self._forward_pre_hooks.values():
+        for hook in itertools.chain(
+                _global_forward_pre_hooks.values(),
+                self._forward_pre_hooks.values()):
             result = hook(self, input)
             if result is not None:
                 if not isinstance(result, tuple):
@@ -575,7 +631,9 @@ class Module(object):
             result = self._slow_forward(*input, **kwargs)
         else:
             result = self.forward(*input, **kwargs)
-        for hook in self._forward_hooks.values():
+        for hook in itertools.chain(
+                _global_forward_hooks.values(),
+                self._forward_hooks.values()):
             hook_result = hook(self, input, result)
             if hook_result is not None:
                 result = hook_result
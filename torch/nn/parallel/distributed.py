@@ -1,11 +1,13 @@
 from contextlib import contextmanager
 import copy
 import itertools
+import weakref
 
 import torch
 
 import torch.cuda.comm
 import torch.distributed as dist
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
 
 if dist.is_available():
     from torch.distributed.distributed_c10d import _get_default_group
@@ -15,6 +17,7 @@ from .replicate import replicate
 from .scatter_gather import scatter_kwargs, gather
 from .parallel_apply import parallel_apply
 from torch.cuda._utils import _get_device_index
+from torch.autograd import Variable
 
 
 def _find_tensors(obj):
@@ -30,6 +33,211 @@ def _find_tensors(obj):
     return []
 
 
+class GradBucket(object):
+    r"""A bucket of gradients passed to a communication hook registered with
+    :meth:`DistributedDataParallel.register_comm_hook`.
+
+    The gradients of the parameters in the bucket are stored contiguously in a
+    single flat tensor, which holds the local gradients summed over the
+    backward pass and is not yet divided by the world size.
+    """
+    def __init__(self, index, tensor, parameters):
+        self._index = index
+        self._tensor = tensor
+        self._shapes = [(p.shape, p.numel()) for p in parameters]
+        self._views = self._unflatten(tensor)
+
+    def get_index(self):
+        r"""Returns the index of the bucket. Buckets are numbered in the order
+        in which they are reduced, and the numbering is the same on all
+        processes and across iterations."""
+        return self._index
+
+    def get_tensors(self):
+        r"""Returns a list holding the flat gradient tensor of the bucket."""
+        return [self._tensor]
+
+    def get_per_parameter_tensors(self):
+        r"""Returns views of the flat gradient tensor, one per parameter in
+        the bucket, with the shapes of the parameters."""
+        return list(self._views)
+
+    def _unflatten(self, tensor):
+        views = []
+        offset = 0
+        for shape, numel in self._shapes:
+            views.append(tensor[offset:offset + numel].view(shape))
+            offset += numel
+        return views
+
+
+class _CommHookReducer(object):
+    r"""Python counterpart of :class:`torch.distributed.Reducer` that hands
+    each gradient bucket to a communication hook instead of all-reducing it.
+
+    Buckets are passed to the hook as soon as all their gradients are ready,
+    in bucket order so that the collectives the hook launches are issued in
+    the same order on every process. The futures returned by the hook are
+    waited on at the end of the backward pass, and their results are written
+    to the gradients of the parameters.
+    """
+    def __init__(self, parameters, bucket_indices, process_group, state, hook):
+        self.parameters = parameters
+        self.bucket_indices = bucket_indices
+        self.process_group = process_group
+        self.state = state
+        self.hook = hook
+
+        self.buckets = []
+        self.locations = [None] * len(parameters)
+        for bucket_index, indices in enumerate(bucket_indices):
+            params = [parameters[i] for i in indices]
+            tensor = torch.zeros(sum(p.numel() for p in params),
+                                 dtype=params[0].dtype, device=params[0].device)
+            self.buckets.append(GradBucket(bucket_index, tensor, params))
+            for position, i in enumerate(indices):
+                self.locations[i] = (bucket_index, position)
+
+        # Register a hook on the gradient accumulator of every parameter. The
+        # hooks only hold a weak reference to the reducer, so the accumulators
+        # and their hooks are released together with it.
+        self_ref = weakref.ref(self)
+
+        def make_hook(index):
+            def hook(*unused):
+                reducer = self_ref()
+                if reducer is not None:
+                    reducer._autograd_hook(index)
+            return hook
+
+        self.grad_accumulators = []
+        for index, p in enumerate(parameters):
+            grad_accumulator = p.expand_as(p).grad_fn.next_functions[0][0]
+            grad_accumulator.register_hook(make_hook(index))
+            self.grad_accumulators.append(grad_accumulator)
+
+        self.expect_autograd_hooks = False
+
+    def prepare_for_backward(self, outputs):
+        self.expect_autograd_hooks = True
+        self.callback_queued = False
+        self.next_bucket = 0
+        self.futures = []
+        self.pending = [len(indices) for indices in self.bucket_indices]
+        self.ready = [False] * len(self.parameters)
+        self.find_unused = len(outputs) > 0
+        if not self.find_unused:
+            return
+
+        # Traverse the autograd graph from the outputs and mark the parameters
+        # that are not reached as ready, since they won't receive a gradient.
+        seen = set()
+        used = set()
+        stack = [t.grad_fn for t in outputs if t.grad_fn is not None]
+        while stack:
+            fn = stack.pop()
+            if fn in seen:
+                continue
+            seen.add(fn)
+            if hasattr(fn, 'variable'):
+                used.add(fn.variable)
+            stack.extend(next_fn for next_fn, _ in fn.next_functions if next_fn is not None)
+        self.locally_used = [p in used for p in self.parameters]
+        for index, is_used in enumerate(self.locally_used):
+            if not is_used:
+                self._mark_variable_ready(index)
+
+    def _autograd_hook(self, index):
+        if not self.expect_autograd_hooks:
+            return
+        if not self.callback_queued:
+            Variable._execution_engine.queue_callback(self._finalize_backward)
+            self.callback_queued = True
+        self._mark_variable_ready(index)
+
+    @torch.no_grad()
+    def _mark_variable_ready(self, index):
+        if self.ready[index]:
+            return
+        self.ready[index] = True
+        bucket_index, position = self.locations[index]
+        view = self.buckets[bucket_index].get_per_parameter_tensors()[position]
+        grad = self.parameters[index].grad
+        if grad is None:
+            view.zero_()
+        elif grad.is_sparse:
+            raise RuntimeError("DistributedDataParallel communication hooks "
+                               "do not support sparse gradients")
+        else:
+            view.copy_(grad)
+        self.pending[bucket_index] -= 1
+
+        while self.next_bucket < len(self.buckets) and self.pending[self.next_bucket] == 0:
+            bucket = self.buckets[self.next_bucket]
+            self.futures.append(self.hook(self.state, bucket))
+            self.next_bucket += 1
+
+    @torch.no_grad()
+    def _finalize_backward(self):
+        self.expect_autograd_hooks = False
+        if self.next_bucket < len(self.buckets):
+            raise RuntimeError(
+                "Expected to mark all parameters as ready for reduction, but "
+                "some did not receive a gradient. You can enable unused "
+                "parameter detection by passing the keyword argument "
+                "`find_unused_parameters=True` to "
+                "`torch.nn.parallel.DistributedDataParallel`.")
+
+        globally_used = None
+        if self.find_unused:
+            globally_used = torch.tensor(self.locally_used, dtype=torch.int32,
+                                         device=self.parameters[0].device)
+            self.process_group.allreduce([globally_used]).wait()
+            globally_used = globally_used.tolist()
+
+        for bucket, future, indices in zip(self.buckets, self.futures, self.bucket_indices):
+            result = future.wait()[0]
+            for index, grad in zip(indices, bucket._unflatten(result)):
+                # Leave the gradients of globally unused parameters untouched.
+                if globally_used is not None and not globally_used[index]:
+                    continue
+                p = self.parameters[index]
+                if p.grad is None:
+                    p.grad = grad.clone()
+                else:
+                    p.grad.copy_(grad)
+        self.futures = []
+
+
+def _buffer_checksum(buffer):
+    r"""Cheap fingerprint of a buffer: the sum of all its elements and the sum
+    of the elements at even positions, which also catches most permutations."""
+    flat = buffer.detach().reshape(-1)
+    return torch.stack([torch.sum(flat, dtype=torch.float64),
+                        torch.sum(flat[::2], dtype=torch.float64)])
+
+
+class _BufferBroadcast(object):
+    r"""Asynchronous broadcast of a bucket of buffers from rank 0, which is
+    waited on by the first module that uses one of the buffers."""
+    def __init__(self, process_group, buffers):
+        self.buffers = buffers
+        self.flat = _flatten_dense_tensors(buffers)
+        self.receive = process_group.rank() != 0
+        self.work = process_group.broadcast(self.flat, 0)
+
+    def wait(self):
+        if self.work is None:
+            return
+        self.work.wait()
+        self.work = None
+        if self.receive:
+            with torch.no_grad():
+                for buffer, synced in zip(self.buffers, _unflatten_dense_tensors(self.flat, self.buffers)):
+                    buffer.copy_(synced)
+        self.flat = None
+
+
 class DistributedDataParallel(Module):
     r"""Implements distributed data parallelism that is based on
     ``torch.distributed`` package at the module level.
@@ -166,6 +374,23 @@ class DistributedDataParallel(Module):
         broadcast_buffers (bool): flag that enables syncing (broadcasting) buffers of
                           the module at beginning of the forward function.
                           (default: ``True``)
+        buffer_sync_period (int): broadcast the buffers only every
+                          :attr:`buffer_sync_period` forward passes when
+                          :attr:`broadcast_buffers` is ``True``. (default: 1)
+        skip_unchanged_buffers (bool): only broadcast the buffers that changed
+                          on any process since the last broadcast, such that
+                          constant buffers, e.g. positional tables or masks, are
+                          not sent on every forward pass. Changes are detected
+                          by comparing a cheap checksum of every buffer, which
+                          costs one small all-reduce instead of the broadcast of
+                          all buffers. (default: ``False``)
+        overlap_buffer_sync (bool): broadcast the buffers asynchronously and
+                          only wait for the buffers of a submodule right before
+                          its ``forward`` runs, overlapping the broadcast with
+                          the start of the forward pass. Modules must then not
+                          read the buffers of other modules before those run.
+                          Only applies to single-device modules.
+                          (default: ``False``)
         process_group: the process group to be used for distributed data
                        all-reduction. If ``None``, the default process group, which
                        is created by ```torch.distributed.init_process_group```,
@@ -213,7 +438,10 @@ class DistributedDataParallel(Module):
                  process_group=None,
                  bucket_cap_mb=25,
                  find_unused_parameters=False,
-                 check_reduction=False):
+                 check_reduction=False,
+                 buffer_sync_period=1,
+                 skip_unchanged_buffers=False,
+                 overlap_buffer_sync=False):
 
         super(DistributedDataParallel, self).__init__()
 
@@ -257,9 +485,19 @@ class DistributedDataParallel(Module):
         else:
             self.process_group = process_group
 
+        if buffer_sync_period < 1:
+            raise ValueError("Invalid buffer_sync_period value: {}".format(buffer_sync_period))
+
         self.dim = dim
         self.module = module
         self.broadcast_buffers = broadcast_buffers
+        self.buffer_sync_period = buffer_sync_period
+        self.skip_unchanged_buffers = skip_unchanged_buffers
+        self.overlap_buffer_sync = overlap_buffer_sync
+        self._num_buffer_sync_calls = 0
+        self._buffer_checksums = None
+        self._pending_buffer_broadcasts = []
+        self._buffer_sync_hook_handles = []
         self.find_unused_parameters = find_unused_parameters
         self.require_backward_grad_sync = True
         self.require_forward_param_sync = True
@@ -385,9 +623,10 @@ class DistributedDataParallel(Module):
         # Note: reverse list of buckets because we want to approximate the
         # order in which their gradients are produced, and assume they
         # are used in the forward pass in the order they are defined.
+        self._bucket_indices = list(reversed(bucket_indices))
         self.reducer = dist.Reducer(
             parameters,
-            list(reversed(bucket_indices)),
+            self._bucket_indices,
             self.process_group,
             expect_sparse_gradient,
             self.bucket_bytes_cap)
@@ -400,6 +639,9 @@ class DistributedDataParallel(Module):
         attrs = copy.copy(self.__dict__)
         del attrs['process_group']
         del attrs['reducer']
+        del attrs['_buffer_checksums']
+        del attrs['_pending_buffer_broadcasts']
+        del attrs['_buffer_sync_hook_handles']
         return attrs
 
     def __setstate__(self, state):
@@ -408,6 +650,13 @@ class DistributedDataParallel(Module):
         super(DistributedDataParallel, self).__setstate__(state)
         self.__dict__.setdefault('require_forward_param_sync', True)
         self.__dict__.setdefault('require_backward_grad_sync', True)
+        self.__dict__.setdefault('buffer_sync_period', 1)
+        self.__dict__.setdefault('skip_unchanged_buffers', False)
+        self.__dict__.setdefault('overlap_buffer_sync', False)
+        self.__dict__.setdefault('_num_buffer_sync_calls', 0)
+        self._buffer_checksums = None
+        self._pending_buffer_broadcasts = []
+        self._buffer_sync_hook_handles = []
         self._ddp_init_helper()
 
     def _check_default_group(self):
@@ -448,19 +697,74 @@ class DistributedDataParallel(Module):
         finally:
             self.require_backward_grad_sync = old_require_backward_grad_sync
 
+    def register_comm_hook(self, state, hook):
+        r"""
+        Registers a communication hook that replaces the all-reduce of the
+        gradient buckets, e.g. to compress gradients before they are sent.
+
+        ``hook`` is called as ``hook(state, bucket)`` for every
+        :class:`GradBucket` once all its gradients are computed, and has to
+        return a future, such as a :class:`torch.futures.Future`, whose
+        ``wait()`` returns a list holding one tensor of the same size as the
+        flat tensor of the bucket. The tensor of the bucket holds the sum of
+        the local gradients, so the hook is responsible for averaging them
+        over the processes. Buckets are passed to the hook in the same order
+        on every process, so the hook can launch collectives on them. The
+        futures are waited on at the end of the backward pass and their
+        results are written to the gradients of the parameters.
+
+        Ready-made hooks, such as fp16 compression, top-k sparsification and
+        PowerSGD, are in :mod:`torch.distributed.algorithms.ddp_comm_hooks`.
+
+        .. warning::
+            The hook has to be registered before the first forward pass, can
+            only be registered once, and is not preserved when the module is
+            pickled. Single-process multi-device modules and sparse gradients
+            are not supported.
+
+        Arguments:
+            state (object): passed to every call of ``hook``, e.g. to keep
+                the error feedback of gradient compression across iterations
+            hook (callable): communication hook with signature
+                ``hook(state, bucket) -> future``
+
+        Example::
+
+            >>> from torch.distributed.algorithms.ddp_comm_hooks import fp16_compress_hook
+            >>> ddp = torch.nn.parallel.DistributedDataParallel(model)
+            >>> ddp.register_comm_hook(None, fp16_compress_hook)
+        """
+        if not callable(hook):
+            raise TypeError("Communication hook must be callable, but got {}".format(type(hook)))
+        if isinstance(self.reducer, _CommHookReducer):
+            raise RuntimeError("register_comm_hook can only be called once")
+        if len(self._module_copies) > 1:
+            raise RuntimeError("Communication hooks are not supported for "
+                               "single-process multi-device modules")
+        parameters = [p for p in self.modules_params[0] if p.requires_grad]
+        self.reducer = _CommHookReducer(
+            parameters,
+            self._bucket_indices,
+            self.process_group,
+            state,
+            hook)
+
     def forward(self, *inputs, **kwargs):
         if self.require_forward_param_sync:
             self._sync_params()
 
-        if self.device_ids:
-            inputs, kwargs = self.scatter(inputs, kwargs, self.device_ids)
-            if len(self.device_ids) == 1:
-                output = self.module(*inputs[0], **kwargs[0])
+        try:
+            if self.device_ids:
+                inputs, kwargs = self.scatter(inputs, kwargs, self.device_ids)
+                if len(self.device_ids) == 1:
+                    output = self.module(*inputs[0], **kwargs[0])
+                else:
+                    outputs = self.parallel_apply(self._module_copies[:len(inputs)], inputs, kwargs)
+                    output = self.gather(outputs, self.output_device)
             else:
-                outputs = self.parallel_apply(self._module_copies[:len(inputs)], inputs, kwargs)
-                output = self.gather(outputs, self.output_device)
-        else:
-            output = self.module(*inputs, **kwargs)
+                output = self.module(*inputs, **kwargs)
+        finally:
+            self._finish_buffer_sync()
 
         if torch.is_grad_enabled() and self.require_backward_grad_sync:
             self.require_forward_param_sync = True
@@ -519,23 +823,98 @@ class DistributedDataParallel(Module):
 
             # module buffer sync
             if self.broadcast_buffers and len(self.modules_buffers[0]) > 0:
+                indices = self._buffers_to_sync()
+                if not indices:
+                    return
+                buffers = [self.modules_buffers[0][i] for i in indices]
+                if self.overlap_buffer_sync and len(self._module_copies) == 1:
+                    self._launch_buffer_broadcasts(buffers)
+                    return
                 # Synchronize buffers across processes.
                 # The process with rank 0 is considered the authoritative copy.
                 self._distributed_broadcast_coalesced(
-                    self.modules_buffers[0],
+                    buffers,
                     self.broadcast_bucket_size)
                 # only do intra-node buffer sync for replicated single-device
                 # CUDA modules
                 if self.device_ids and len(self.device_ids) > 1:
                     # intra-node buffer sync
                     result = torch.cuda.comm.broadcast_coalesced(
-                        self.modules_buffers[0],
+                        buffers,
                         self.device_ids,
                         self.broadcast_bucket_size)
                     for tensors, module_buffers in zip(result[1:],
                                                        self.modules_buffers[1:]):
-                        for tensor, buffer in zip(tensors, module_buffers):
-                            buffer.set_(tensor)
+                        for tensor, i in zip(tensors, indices):
+                            module_buffers[i].set_(tensor)
+
+    def _buffers_to_sync(self):
+        r"""Returns the indices of the buffers to broadcast in this forward
+        pass, according to :attr:`buffer_sync_period` and
+        :attr:`skip_unchanged_buffers`."""
+        self._num_buffer_sync_calls += 1
+        if (self._num_buffer_sync_calls - 1) % self.buffer_sync_period != 0:
+            return []
+        buffers = self.modules_buffers[0]
+        if not self.skip_unchanged_buffers:
+            return list(range(len(buffers)))
+
+        # A single all-reduce tells every process which buffers changed on
+        # any process, and the checksums of rank 0, which all processes have
+        # after the broadcast.
+        device = buffers[0].device
+        checksums = torch.stack([_buffer_checksum(buffer).to(device) for buffer in buffers])
+        if self._buffer_checksums is None:
+            changed = torch.ones(len(buffers), dtype=torch.float64, device=device)
+        else:
+            changed = (checksums != self._buffer_checksums).any(dim=1).to(torch.float64)
+        if self.process_group.rank() != 0:
+            checksums.zero_()
+        reduced = torch.cat([changed, checksums.view(-1)])
+        self.process_group.allreduce([reduced]).wait()
+        self._buffer_checksums = reduced[len(buffers):].view(-1, 2)
+        return [i for i, is_changed in enumerate(reduced[:len(buffers)].tolist()) if is_changed]
+
+    def _launch_buffer_broadcasts(self, buffers):
+        # Bucket the buffers by device and type, as _broadcast_coalesced does.
+        buckets = []
+        open_buckets = {}
+        for buffer in buffers:
+            key = (buffer.device, buffer.dtype)
+            nbytes = buffer.numel() * buffer.element_size()
+            if key not in open_buckets or open_buckets[key][1] + nbytes > self.broadcast_bucket_size:
+                open_buckets[key] = [[], 0]
+                buckets.append(open_buckets[key][0])
+            open_buckets[key][0].append(buffer)
+            open_buckets[key][1] += nbytes
+        broadcasts = {}
+        for bucket in buckets:
+            broadcast = _BufferBroadcast(self.process_group, bucket)
+            self._pending_buffer_broadcasts.append(broadcast)
+            for buffer in bucket:
+                broadcasts[id(buffer)] = broadcast
+
+        # Wait for the buffers of a module right before its forward.
+        for module in self.module.modules():
+            module_broadcasts = []
+            for buffer in module.buffers(recurse=False):
+                broadcast = broadcasts.get(id(buffer))
+                if broadcast is not None and broadcast not in module_broadcasts:
+                    module_broadcasts.append(broadcast)
+            if module_broadcasts:
+                def wait_for_buffers(module, input, module_broadcasts=module_broadcasts):
+                    for broadcast in module_broadcasts:
+                        broadcast.wait()
+                self._buffer_sync_hook_handles.append(
+                    module.register_forward_pre_hook(wait_for_buffers))
+
+    def _finish_buffer_sync(self):
+        for broadcast in self._pending_buffer_broadcasts:
+            broadcast.wait()
+        for handle in self._buffer_sync_hook_handles:
+            handle.remove()
+        self._pending_buffer_broadcasts = []
+        self._buffer_sync_hook_handles = []
 
     def _passing_sync_batchnorm_handle(self, module_copies):
         for dev_idx, module in enumerate(module_copies):
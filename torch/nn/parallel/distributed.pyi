@@ -1,10 +1,19 @@
 from ..modules import Module
-from typing import Any, Optional, TypeVar
+from typing import Any, Callable, List, Optional, TypeVar
 from .common_types import _devices_t, _device_t
+from ... import Tensor
 
 T_co = TypeVar('T_co', covariant=True)
 
 
+class GradBucket:
+    def get_index(self) -> int: ...
+
+    def get_tensors(self) -> List[Tensor]: ...
+
+    def get_per_parameter_tensors(self) -> List[Tensor]: ...
+
+
 class DistributedDataParallel(Module[T_co]):
     process_group: Any = ...
     dim: int = ...
@@ -15,12 +24,18 @@ class DistributedDataParallel(Module[T_co]):
     check_reduction: bool = ...
     broadcast_bucket_size: float = ...
     bucket_bytes_cap: float = ...
+    buffer_sync_period: int = ...
+    skip_unchanged_buffers: bool = ...
+    overlap_buffer_sync: bool = ...
 
     # TODO type process_group once `distributed` module is stubbed
     def __init__(self, module: Module[T_co], device_ids: Optional[_devices_t] = ...,
                  output_device: Optional[_device_t] = ..., dim: int = ...,
                  broadcast_buffers: bool = ..., process_group: Optional[Any] = ..., bucket_cap_mb: float = ...,
-                 check_reduction: bool = ...) -> None: ...
+                 check_reduction: bool = ..., buffer_sync_period: int = ...,
+                 skip_unchanged_buffers: bool = ..., overlap_buffer_sync: bool = ...) -> None: ...
+
+    def register_comm_hook(self, state: Any, hook: Callable[[Any, GradBucket], Any]) -> None: ...
 
     def forward(self, *inputs: Any, **kwargs: Any) -> T_co: ...
 
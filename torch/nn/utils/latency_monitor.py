@@ -0,0 +1,325 @@
+r"""
+Per-module latency instrumentation of forward and backward passes.
+"""
+import collections
+import threading
+import time
+
+import torch
+from torch.utils.hooks import RemovableHandle
+
+
+class _Call(object):
+    """State of one call of an instrumented module, shared with the gradient
+    hooks that time its backward pass."""
+    __slots__ = ['start', 'start_event', 'backward_start', 'backward_start_event',
+                 'pending_input_grads']
+
+    def __init__(self, start, start_event):
+        self.start = start
+        self.start_event = start_event
+        self.backward_start = None
+        self.backward_start_event = None
+        self.pending_input_grads = 0
+
+
+class _LatencyWindow(object):
+    """Latencies of the last ``window_size`` calls, with the times at which
+    they started. With CUDA timing, the events of the calls are resolved
+    when the latencies are read."""
+    def __init__(self, window_size):
+        self.samples = collections.deque(maxlen=window_size)
+        self.pending = collections.deque()
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, start, latency_ms):
+        with self._lock:
+            self.samples.append((start, latency_ms))
+            self.count += 1
+
+    def add_events(self, start, start_event, end_event):
+        with self._lock:
+            self.pending.append((start, start_event, end_event))
+            self.count += 1
+            # Keep at most a window of unresolved events alive.
+            if len(self.pending) > self.samples.maxlen:
+                self._resolve_one()
+
+    def _resolve_one(self):
+        start, start_event, end_event = self.pending.popleft()
+        end_event.synchronize()
+        self.samples.append((start, start_event.elapsed_time(end_event)))
+
+    def summary(self):
+        with self._lock:
+            while self.pending:
+                self._resolve_one()
+            samples = list(self.samples)
+            count = self.count
+        if not samples:
+            return None
+        latencies = sorted(latency for _, latency in samples)
+        span = samples[-1][0] - samples[0][0]
+        return {
+            'count': count,
+            'mean_ms': sum(latencies) / len(latencies),
+            'p50_ms': _percentile(latencies, 50),
+            'p99_ms': _percentile(latencies, 99),
+            'max_ms': latencies[-1],
+            'calls_per_sec': (len(samples) - 1) / span if span > 0 else 0.0,
+        }
+
+
+def _percentile(sorted_values, q):
+    # nearest-rank percentile
+    index = max(0, (q * len(sorted_values) + 99) // 100 - 1)
+    return sorted_values[index]
+
+
+def _tensors(values):
+    if isinstance(values, torch.Tensor):
+        return [values]
+    if type(values) is tuple:
+        return [v for v in values if isinstance(v, torch.Tensor)]
+    return []
+
+
+def _register_grad_hook(tensor, hook):
+    """Registers ``hook`` to be called with the gradient of ``tensor`` at the
+    current grad_fn of ``tensor``. :meth:`~torch.Tensor.register_hook` adds
+    the hooks of a tensor to the grad_fn the tensor had when its first hook
+    was registered, which an in-place operation since then has replaced."""
+    hooks = tensor._backward_hooks
+    if tensor.grad_fn is None or hooks is None:
+        return tensor.register_hook(hook)
+    new_hooks = collections.OrderedDict()
+    tensor._backward_hooks = new_hooks
+    try:
+        tensor.grad_fn._register_hook_dict(tensor)
+    finally:
+        tensor._backward_hooks = hooks
+    handle = RemovableHandle(new_hooks)
+    new_hooks[handle.id] = hook
+    return handle
+
+
+def _register_grad_hook_once(tensor, fn, *args):
+    # The hook removes itself, as leaf tensors outlive the backward pass.
+    def hook(grad):
+        handle.remove()
+        fn(*args)
+    handle = _register_grad_hook(tensor, hook)
+
+
+class _ModuleTimer(object):
+    def __init__(self, module, window_size, backward, use_cuda):
+        self.module = module
+        self.backward = backward
+        self.use_cuda = use_cuda
+        self.forward_window = _LatencyWindow(window_size)
+        self.backward_window = _LatencyWindow(window_size)
+        self._local = threading.local()
+        self._handles = []
+
+    def attach(self):
+        self._handles = [
+            self.module.register_forward_pre_hook(self._pre_hook),
+            self.module.register_forward_hook(self._hook),
+        ]
+
+    def detach(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+    def _now(self):
+        event = None
+        if self.use_cuda:
+            event = torch.cuda.Event(enable_timing=True)
+            event.record()
+        return time.perf_counter(), event
+
+    def _calls(self):
+        calls = getattr(self._local, 'calls', None)
+        if calls is None:
+            calls = self._local.calls = []
+        return calls
+
+    def _pre_hook(self, module, input):
+        call = _Call(*self._now())
+        self._calls().append(call)
+        if self.backward and torch.is_grad_enabled():
+            for tensor in _tensors(input):
+                if tensor.requires_grad:
+                    call.pending_input_grads += 1
+                    _register_grad_hook_once(tensor, self._backward_ended, call)
+
+    def _hook(self, module, input, output):
+        end, end_event = self._now()
+        call = self._calls().pop()
+        if self.use_cuda:
+            self.forward_window.add_events(call.start, call.start_event, end_event)
+        else:
+            self.forward_window.add(call.start, (end - call.start) * 1000)
+        if self.backward and call.pending_input_grads > 0:
+            for tensor in _tensors(output):
+                if tensor.requires_grad:
+                    _register_grad_hook_once(tensor, self._backward_started, call)
+
+    def _backward_started(self, call):
+        # The gradients of the outputs can arrive in several backward calls
+        # when the outputs are used separately, the backward pass of the
+        # module starts with the first one.
+        if call.backward_start is None:
+            call.backward_start, call.backward_start_event = self._now()
+
+    def _backward_ended(self, call):
+        # The backward pass of the module ends with the gradient of its last
+        # input.
+        call.pending_input_grads -= 1
+        if call.pending_input_grads > 0 or call.backward_start is None:
+            return
+        end, end_event = self._now()
+        if self.use_cuda:
+            self.backward_window.add_events(call.backward_start, call.backward_start_event, end_event)
+        else:
+            self.backward_window.add(call.backward_start, (end - call.backward_start) * 1000)
+
+
+class ModuleLatencyMonitor(object):
+    r"""Measures the latency of the forward and backward passes of the
+    submodules of a module.
+
+    Every selected submodule gets a forward pre-hook and a forward hook,
+    which time its forward pass. The latencies of the last ``window_size``
+    calls of every submodule are kept, and :meth:`stats` returns their
+    count, mean, 50th and 99th percentiles, maximum and the rate of calls
+    over the window.
+
+    If ``backward`` is ``True``, the backward pass of a call is timed from
+    the moment the gradient of its first output is available to the moment
+    the gradients of its inputs are computed, with hooks on the gradients of
+    its outputs and inputs. It is thus only timed for calls with inputs that
+    require gradients, e.g. not for the first layer of a model applied to
+    data, and only for modules that take and return tensors or tuples of
+    tensors.
+
+    By default the latencies are measured on the host, which for CUDA
+    modules is the time to launch their kernels. With ``use_cuda=True``,
+    CUDA events are recorded on the current stream instead, and resolved
+    when the statistics are read, without synchronizing the calls.
+
+    The monitor can be enabled and disabled at runtime, which adds and
+    removes the hooks, so that a disabled monitor costs nothing.
+
+    Arguments:
+        module (Module): the module to instrument
+        submodules (iterable of str, optional): names of the submodules to
+            instrument, as returned by :meth:`~torch.nn.Module.named_modules`,
+            ``''`` being ``module`` itself. If ``None``, all submodules are
+            instrumented (default: ``None``)
+        window_size (int, optional): number of most recent calls the
+            statistics are computed over (default: 1000)
+        backward (bool, optional): whether to time the backward passes
+            (default: ``True``)
+        use_cuda (bool, optional): whether to time with CUDA events
+            (default: ``False``)
+        enabled (bool, optional): whether to enable the monitor when it is
+            created (default: ``True``)
+
+    Example::
+
+        >>> monitor = nn.utils.ModuleLatencyMonitor(model, submodules=['layer1', 'layer2', 'fc'])
+        >>> for input in loader:
+        >>>     model(input)
+        >>> monitor.stats()['fc']['forward']['p99_ms']
+        0.1235
+        >>> monitor.disable()
+    """
+    def __init__(self, module, submodules=None, window_size=1000, backward=True,
+                 use_cuda=False, enabled=True):
+        if window_size < 1:
+            raise ValueError("Invalid window_size value: {}".format(window_size))
+        named_modules = dict(module.named_modules())
+        if submodules is None:
+            submodules = list(named_modules.keys())
+        self._timers = collections.OrderedDict()
+        for name in submodules:
+            if name not in named_modules:
+                raise ValueError("{} has no submodule named '{}'".format(
+                    type(module).__name__, name))
+            self._timers[name] = _ModuleTimer(named_modules[name], window_size, backward, use_cuda)
+        self._enabled = False
+        if enabled:
+            self.enable()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def enable(self):
+        r"""Attaches the timers to the submodules."""
+        if not self._enabled:
+            for timer in self._timers.values():
+                timer.attach()
+            self._enabled = True
+
+    def disable(self):
+        r"""Detaches the timers from the submodules. The collected latencies
+        are kept."""
+        if self._enabled:
+            for timer in self._timers.values():
+                timer.detach()
+            self._enabled = False
+
+    def reset(self):
+        r"""Clears the collected latencies."""
+        for timer in self._timers.values():
+            window_size = timer.forward_window.samples.maxlen
+            timer.forward_window = _LatencyWindow(window_size)
+            timer.backward_window = _LatencyWindow(window_size)
+
+    def stats(self):
+        r"""Returns a dictionary from the names of the instrumented submodules
+        to dictionaries with ``'forward'`` and ``'backward'`` statistics, if
+        the submodule was called. The statistics are dictionaries with the
+        total number of calls (``count``), the mean, 50th and 99th percentile
+        and maximum latency in milliseconds over the window (``mean_ms``,
+        ``p50_ms``, ``p99_ms``, ``max_ms``), and the number of calls per
+        second over the window (``calls_per_sec``)."""
+        result = collections.OrderedDict()
+        for name, timer in self._timers.items():
+            module_stats = {}
+            for key, window in (('forward', timer.forward_window), ('backward', timer.backward_window)):
+                summary = window.summary()
+                if summary is not None:
+                    module_stats[key] = summary
+            if module_stats:
+                result[name] = module_stats
+        return result
+
+    def add_to_summary_writer(self, writer, global_step=None, tag='latency'):
+        r"""Adds the statistics to a
+        :class:`~torch.utils.tensorboard.SummaryWriter` as scalars tagged
+        ``'<tag>/<submodule>/<pass>/<statistic>'``, e.g.
+        ``'latency/layer1.0/forward/p99_ms'``.
+
+        Arguments:
+            writer (SummaryWriter): the writer to add the scalars to
+            global_step (int, optional): global step value to record
+            tag (str, optional): prefix of the tags (default: ``'latency'``)
+        """
+        for name, module_stats in self.stats().items():
+            for key, summary in module_stats.items():
+                for statistic, value in summary.items():
+                    writer.add_scalar('{}/{}/{}/{}'.format(tag, name or '<root>', key, statistic),
+                                      value, global_step)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+        return False
@@ -0,0 +1,24 @@
+from typing import Any, Dict, Iterable, Optional
+from ..modules import Module
+
+
+class ModuleLatencyMonitor:
+    def __init__(self, module: Module, submodules: Optional[Iterable[str]] = ..., window_size: int = ...,
+                 backward: bool = ..., use_cuda: bool = ..., enabled: bool = ...) -> None: ...
+
+    @property
+    def enabled(self) -> bool: ...
+
+    def enable(self) -> None: ...
+
+    def disable(self) -> None: ...
+
+    def reset(self) -> None: ...
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]: ...
+
+    def add_to_summary_writer(self, writer: Any, global_step: Optional[int] = ..., tag: str = ...) -> None: ...
+
+    def __enter__(self) -> ModuleLatencyMonitor: ...
+
+    def __exit__(self, *args: Any) -> bool: ...
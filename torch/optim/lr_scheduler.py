@@ -1,5 +1,6 @@
 import types
 import math
+import torch
 from torch._six import inf
 from functools import wraps
 import warnings
@@ -21,6 +22,42 @@ EPOCH_DEPRECATION_WARNING = (
 
 SAVE_STATE_WARNING = "Please also save or load the state of the optimzer when saving or loading the scheduler."
 
+
+# Closed-form learning rates are written once against these helpers, so that
+# ``lr_at`` accepts either a single step or a tensor of steps.
+def _cos(x):
+    if isinstance(x, torch.Tensor):
+        return torch.cos(x)
+    return math.cos(x)
+
+
+def _floor(x):
+    if isinstance(x, torch.Tensor):
+        return torch.floor(x)
+    return math.floor(x)
+
+
+def _log(x):
+    if isinstance(x, torch.Tensor):
+        return torch.log(x)
+    return math.log(x)
+
+
+def _where(condition, x, y):
+    if isinstance(condition, torch.Tensor):
+        return torch.where(condition,
+                           torch.as_tensor(x, dtype=torch.float64),
+                           torch.as_tensor(y, dtype=torch.float64))
+    return x if condition else y
+
+
+def _map(fn, x):
+    # Applies a user-provided scalar function to every step.
+    if isinstance(x, torch.Tensor):
+        return torch.tensor([fn(int(v)) for v in x.tolist()], dtype=torch.float64).view_as(x)
+    return fn(x)
+
+
 class _LRScheduler(object):
 
     def __init__(self, optimizer, last_epoch=-1):
@@ -81,9 +118,9 @@ class _LRScheduler(object):
         """Returns the state of the scheduler as a :class:`dict`.
 
         It contains an entry for every variable in self.__dict__ which
-        is not the optimizer.
+        is not the optimizer or a precomputed learning rate table.
         """
-        return {key: value for key, value in self.__dict__.items() if key != 'optimizer'}
+        return {key: value for key, value in self.__dict__.items() if key not in ('optimizer', '_lr_table')}
 
     def load_state_dict(self, state_dict):
         """Loads the schedulers state.
@@ -103,6 +140,50 @@ class _LRScheduler(object):
         # Compute learning rate using chainable form of the scheduler
         raise NotImplementedError
 
+    def lr_at(self, step):
+        """Returns the learning rate of each parameter group after ``step``
+        calls to :meth:`step`, assuming the learning rate is set solely by
+        this scheduler.
+
+        The result is computed in closed form from :attr:`base_lrs`, without
+        replaying the schedule or changing the state of the scheduler.
+
+        Arguments:
+            step (int or Tensor): step to evaluate, or a tensor of steps to
+                evaluate all at once.
+        """
+        raise NotImplementedError
+
+    def lr_table(self, steps):
+        """Returns a ``float64`` tensor of shape ``(len(steps), num_groups)``
+        holding :meth:`lr_at` for each of :attr:`steps`."""
+        steps = torch.as_tensor(steps, dtype=torch.float64)
+        return torch.stack([torch.as_tensor(lr, dtype=torch.float64).expand_as(steps)
+                            for lr in self.lr_at(steps)], dim=-1)
+
+    def precompute(self, num_steps):
+        """Precomputes the learning rates of the next :attr:`num_steps` steps.
+
+        While the table lasts, :meth:`step` looks the learning rates up
+        instead of computing them, so its cost does not depend on the
+        schedule. Like :meth:`lr_at`, the table ignores changes made to the
+        learning rates outside of this scheduler.
+        """
+        if getattr(self, 'cycle_momentum', False):
+            raise ValueError("Learning rate tables can't be used with `cycle_momentum`")
+        start = self.last_epoch + 1
+        self._lr_table_start = start
+        self._lr_table = self.lr_table(torch.arange(start, start + num_steps, dtype=torch.float64))
+
+    def _precomputed_lr(self):
+        table = getattr(self, '_lr_table', None)
+        if table is None:
+            return None
+        index = self.last_epoch - self._lr_table_start
+        if 0 <= index < len(table):
+            return table[index].tolist()
+        return None
+
     def step(self, epoch=None):
         # Raise a warning if old pattern is detected
         # https://github.com/pytorch/pytorch/issues/20124
@@ -138,7 +219,9 @@ class _LRScheduler(object):
         with _enable_get_lr_call(self):
             if epoch is None:
                 self.last_epoch += 1
-                values = self.get_lr()
+                values = self._precomputed_lr()
+                if values is None:
+                    values = self.get_lr()
             else:
                 warnings.warn(EPOCH_DEPRECATION_WARNING, UserWarning)
                 self.last_epoch = epoch
@@ -198,7 +281,8 @@ class LambdaLR(_LRScheduler):
         """
 
         warnings.warn(SAVE_STATE_WARNING, UserWarning)
-        state_dict = {key: value for key, value in self.__dict__.items() if key not in ('optimizer', 'lr_lambdas')}
+        state_dict = {key: value for key, value in self.__dict__.items()
+                      if key not in ('optimizer', 'lr_lambdas', '_lr_table')}
         state_dict['lr_lambdas'] = [None] * len(self.lr_lambdas)
 
         for idx, fn in enumerate(self.lr_lambdas):
@@ -234,6 +318,10 @@ class LambdaLR(_LRScheduler):
         return [base_lr * lmbda(self.last_epoch)
                 for lmbda, base_lr in zip(self.lr_lambdas, self.base_lrs)]
 
+    def lr_at(self, step):
+        return [base_lr * _map(lmbda, step)
+                for lmbda, base_lr in zip(self.lr_lambdas, self.base_lrs)]
+
 
 class MultiplicativeLR(_LRScheduler):
     """Multiply the learning rate of each parameter group by the factor given
@@ -276,7 +364,8 @@ class MultiplicativeLR(_LRScheduler):
         The learning rate lambda functions will only be saved if they are callable objects
         and not if they are functions or lambdas.
         """
-        state_dict = {key: value for key, value in self.__dict__.items() if key not in ('optimizer', 'lr_lambdas')}
+        state_dict = {key: value for key, value in self.__dict__.items()
+                      if key not in ('optimizer', 'lr_lambdas', '_lr_table')}
         state_dict['lr_lambdas'] = [None] * len(self.lr_lambdas)
 
         for idx, fn in enumerate(self.lr_lambdas):
@@ -313,6 +402,23 @@ class MultiplicativeLR(_LRScheduler):
         else:
             return list(self.base_lrs)
 
+    def lr_at(self, step):
+        # The factors of a multiplicative schedule have no closed form, so
+        # this costs O(step); precomputed tables amortize it.
+        if not isinstance(step, torch.Tensor):
+            lrs = list(self.base_lrs)
+            for epoch in range(1, step + 1):
+                lrs = [lr * lmbda(epoch) for lr, lmbda in zip(lrs, self.lr_lambdas)]
+            return lrs
+
+        last = max(int(step.max().item()), 0)
+        lrs = []
+        for lmbda, base_lr in zip(self.lr_lambdas, self.base_lrs):
+            factors = torch.tensor([1.] + [lmbda(epoch) for epoch in range(1, last + 1)],
+                                   dtype=torch.float64).cumprod(0)
+            lrs.append(base_lr * factors[step.long().clamp(min=0)])
+        return lrs
+
 
 class StepLR(_LRScheduler):
     """Decays the learning rate of each parameter group by gamma every
@@ -356,7 +462,10 @@ class StepLR(_LRScheduler):
                 for group in self.optimizer.param_groups]
 
     def _get_closed_form_lr(self):
-        return [base_lr * self.gamma ** (self.last_epoch // self.step_size)
+        return self.lr_at(self.last_epoch)
+
+    def lr_at(self, step):
+        return [base_lr * self.gamma ** (step // self.step_size)
                 for base_lr in self.base_lrs]
 
 
@@ -405,6 +514,10 @@ class MultiStepLR(_LRScheduler):
         return [base_lr * self.gamma ** bisect_right(milestones, self.last_epoch)
                 for base_lr in self.base_lrs]
 
+    def lr_at(self, step):
+        num_decays = sum(_where(step >= milestone, 1., 0.) for milestone in self.milestones.elements())
+        return [base_lr * self.gamma ** num_decays for base_lr in self.base_lrs]
+
 
 class ExponentialLR(_LRScheduler):
     """Decays the learning rate of each parameter group by gamma every epoch.
@@ -431,7 +544,10 @@ class ExponentialLR(_LRScheduler):
                 for group in self.optimizer.param_groups]
 
     def _get_closed_form_lr(self):
-        return [base_lr * self.gamma ** self.last_epoch
+        return self.lr_at(self.last_epoch)
+
+    def lr_at(self, step):
+        return [base_lr * self.gamma ** step
                 for base_lr in self.base_lrs]
 
 
@@ -496,8 +612,11 @@ class CosineAnnealingLR(_LRScheduler):
                 for group in self.optimizer.param_groups]
 
     def _get_closed_form_lr(self):
+        return self.lr_at(self.last_epoch)
+
+    def lr_at(self, step):
         return [self.eta_min + (base_lr - self.eta_min) *
-                (1 + math.cos(math.pi * self.last_epoch / self.T_max)) / 2
+                (1 + _cos(math.pi * step / self.T_max)) / 2
                 for base_lr in self.base_lrs]
 
 
@@ -864,36 +983,48 @@ class CyclicLR(_LRScheduler):
             warnings.warn("To get the last learning rate computed by the scheduler, "
                           "please use `get_last_lr()`.", UserWarning)
 
-        cycle = math.floor(1 + self.last_epoch / self.total_size)
-        x = 1. + self.last_epoch / self.total_size - cycle
-        if x <= self.step_ratio:
-            scale_factor = x / self.step_ratio
-        else:
-            scale_factor = (x - 1) / (self.step_ratio - 1)
+        scale_factor, scale = self._cycle_scale(self.last_epoch)
 
         lrs = []
         for base_lr, max_lr in zip(self.base_lrs, self.max_lrs):
             base_height = (max_lr - base_lr) * scale_factor
-            if self.scale_mode == 'cycle':
-                lr = base_lr + base_height * self.scale_fn(cycle)
-            else:
-                lr = base_lr + base_height * self.scale_fn(self.last_epoch)
+            lr = base_lr + base_height * scale
             lrs.append(lr)
 
         if self.cycle_momentum:
             momentums = []
             for base_momentum, max_momentum in zip(self.base_momentums, self.max_momentums):
                 base_height = (max_momentum - base_momentum) * scale_factor
-                if self.scale_mode == 'cycle':
-                    momentum = max_momentum - base_height * self.scale_fn(cycle)
-                else:
-                    momentum = max_momentum - base_height * self.scale_fn(self.last_epoch)
+                momentum = max_momentum - base_height * scale
                 momentums.append(momentum)
             for param_group, momentum in zip(self.optimizer.param_groups, momentums):
                 param_group['momentum'] = momentum
 
         return lrs
 
+    def lr_at(self, step):
+        scale_factor, scale = self._cycle_scale(step)
+        return [base_lr + (max_lr - base_lr) * scale_factor * scale
+                for base_lr, max_lr in zip(self.base_lrs, self.max_lrs)]
+
+    def _cycle_scale(self, step):
+        """Returns the position within the current cycle, scaled to [0, 1],
+        and the value of the scaling policy at :attr:`step`."""
+        cycle = _floor(1 + step / self.total_size)
+        x = 1. + step / self.total_size - cycle
+        if isinstance(x, torch.Tensor):
+            scale_factor = torch.where(x <= self.step_ratio, x / self.step_ratio, (x - 1) / (self.step_ratio - 1))
+        elif x <= self.step_ratio:
+            scale_factor = x / self.step_ratio
+        else:
+            scale_factor = (x - 1) / (self.step_ratio - 1)
+        scale_arg = cycle if self.scale_mode == 'cycle' else step
+        if self.scale_fn in (self._triangular_scale_fn, self._triangular2_scale_fn, self._exp_range_scale_fn):
+            scale = self.scale_fn(scale_arg)
+        else:
+            scale = _map(self.scale_fn, scale_arg)
+        return scale_factor, scale
+
 
 class CosineAnnealingWarmRestarts(_LRScheduler):
     r"""Set the learning rate of each parameter group using a cosine annealing
@@ -944,6 +1075,21 @@ class CosineAnnealingWarmRestarts(_LRScheduler):
         return [self.eta_min + (base_lr - self.eta_min) * (1 + math.cos(math.pi * self.T_cur / self.T_i)) / 2
                 for base_lr in self.base_lrs]
 
+    def lr_at(self, step):
+        if self.T_mult == 1:
+            T_cur = step % self.T_0
+            T_i = self.T_0
+        else:
+            # Index of the restart period that contains ``step``, corrected
+            # for the rounding error of the logarithm at period boundaries.
+            n = _floor(_log(step / self.T_0 * (self.T_mult - 1) + 1) / math.log(self.T_mult))
+            start = self.T_0 * (self.T_mult ** n - 1) / (self.T_mult - 1)
+            n = _where(step < start, n - 1, _where(step >= start + self.T_0 * self.T_mult ** n, n + 1, n))
+            T_cur = step - self.T_0 * (self.T_mult ** n - 1) / (self.T_mult - 1)
+            T_i = self.T_0 * self.T_mult ** n
+        return [self.eta_min + (base_lr - self.eta_min) * (1 + _cos(math.pi * T_cur / T_i)) / 2
+                for base_lr in self.base_lrs]
+
     def step(self, epoch=None):
         """Step could be called after every batch update
 
@@ -973,6 +1119,7 @@ class CosineAnnealingWarmRestarts(_LRScheduler):
         if epoch is None and self.last_epoch < 0:
             epoch = 0
 
+        use_table = epoch is None
         if epoch is None:
             epoch = self.last_epoch + 1
             self.T_cur = self.T_cur + 1
@@ -1008,7 +1155,10 @@ class CosineAnnealingWarmRestarts(_LRScheduler):
                 return self
 
         with _enable_get_lr_call(self):
-            for param_group, lr in zip(self.optimizer.param_groups, self.get_lr()):
+            values = self._precomputed_lr() if use_table else None
+            if values is None:
+                values = self.get_lr()
+            for param_group, lr in zip(self.optimizer.param_groups, values):
                 param_group['lr'] = lr
 
         self._last_lr = [group['lr'] for group in self.optimizer.param_groups]
@@ -1193,7 +1343,7 @@ class OneCycleLR(_LRScheduler):
 
     def _annealing_cos(self, start, end, pct):
         "Cosine anneal from `start` to `end` as pct goes from 0.0 to 1.0."
-        cos_out = math.cos(math.pi * pct) + 1
+        cos_out = _cos(math.pi * pct) + 1
         return end + (start - end) / 2.0 * cos_out
 
     def _annealing_linear(self, start, end, pct):
@@ -1234,3 +1384,111 @@ class OneCycleLR(_LRScheduler):
                     group['momentum'] = computed_momentum
 
         return lrs
+
+    def lr_at(self, step):
+        last_step = step.max().item() if isinstance(step, torch.Tensor) else step
+        if last_step > self.total_steps:
+            raise ValueError("Tried to step {} times. The specified number of total steps is {}"
+                             .format(last_step + 1, self.total_steps))
+
+        lrs = []
+        for group in self.optimizer.param_groups:
+            if isinstance(step, torch.Tensor):
+                lrs.append(torch.where(
+                    step <= self.step_size_up,
+                    self.anneal_func(group['initial_lr'], group['max_lr'], step / self.step_size_up),
+                    self.anneal_func(group['max_lr'], group['min_lr'],
+                                     (step - self.step_size_up) / self.step_size_down)))
+            elif step <= self.step_size_up:
+                lrs.append(self.anneal_func(group['initial_lr'], group['max_lr'], step / self.step_size_up))
+            else:
+                lrs.append(self.anneal_func(group['max_lr'], group['min_lr'],
+                                            (step - self.step_size_up) / self.step_size_down))
+        return lrs
+
+
+class ChainedScheduler(_LRScheduler):
+    """Chains several schedulers of the same optimizer into a single schedule.
+
+    The learning rate of each parameter group is its initial lr times the
+    product of the factors by which every chained scheduler changes its own
+    base learning rate, which is what stepping all of them together gives
+    when each of them updates the learning rate multiplicatively. Since the
+    chained schedule is computed from :meth:`lr_at` of each scheduler, it can
+    be evaluated at any step in closed form; the chained schedulers themselves
+    should not be stepped.
+
+    Args:
+        schedulers (list): Schedulers to chain. They must all wrap the same
+            optimizer and have nonzero base learning rates.
+        last_epoch (int): The index of last epoch. Default: -1.
+
+    Example:
+        >>> # Assuming optimizer uses lr = 0.05 for all groups
+        >>> # lr = 0.05 * 0.9 ** epoch * 0.1 ** (epoch // 30)
+        >>> scheduler1 = ExponentialLR(optimizer, gamma=0.9)
+        >>> scheduler2 = StepLR(optimizer, step_size=30, gamma=0.1)
+        >>> scheduler = ChainedScheduler([scheduler1, scheduler2])
+        >>> for epoch in range(100):
+        >>>     train(...)
+        >>>     validate(...)
+        >>>     scheduler.step()
+    """
+
+    def __init__(self, schedulers, last_epoch=-1):
+        schedulers = list(schedulers)
+        if not schedulers:
+            raise ValueError("Expected at least one scheduler to chain")
+        optimizer = schedulers[0].optimizer
+        for scheduler in schedulers:
+            if scheduler.optimizer is not optimizer:
+                raise ValueError("ChainedScheduler expects all schedulers to belong to the same optimizer")
+            if any(base_lr == 0 for base_lr in scheduler.base_lrs):
+                raise ValueError("ChainedScheduler expects nonzero base learning rates, but {} has {}".format(
+                    type(scheduler).__name__, scheduler.base_lrs))
+        self._schedulers = schedulers
+        super(ChainedScheduler, self).__init__(optimizer, last_epoch)
+
+    def state_dict(self):
+        """Returns the state of the scheduler as a :class:`dict`.
+
+        It contains an entry for every variable in self.__dict__ which
+        is not the optimizer, with the chained schedulers replaced by their
+        own state dicts.
+        """
+        state_dict = super(ChainedScheduler, self).state_dict()
+        state_dict['_schedulers'] = [scheduler.state_dict() for scheduler in self._schedulers]
+        return state_dict
+
+    def load_state_dict(self, state_dict):
+        """Loads the schedulers state.
+
+        Arguments:
+            state_dict (dict): scheduler state. Should be an object returned
+                from a call to :meth:`state_dict`.
+        """
+        scheduler_states = state_dict.pop('_schedulers')
+        self.__dict__.update(state_dict)
+        # Restore state_dict keys in order to prevent side effects
+        # https://github.com/pytorch/pytorch/issues/32756
+        state_dict['_schedulers'] = scheduler_states
+
+        for scheduler, scheduler_state in zip(self._schedulers, scheduler_states):
+            scheduler.load_state_dict(scheduler_state)
+
+    def get_lr(self):
+        if not self._get_lr_called_within_step:
+            warnings.warn("To get the last learning rate computed by the scheduler, "
+                          "please use `get_last_lr()`.", UserWarning)
+
+        return self.lr_at(self.last_epoch)
+
+    def _get_closed_form_lr(self):
+        return self.lr_at(self.last_epoch)
+
+    def lr_at(self, step):
+        lrs = list(self.base_lrs)
+        for scheduler in self._schedulers:
+            lrs = [lr * scheduler_lr / scheduler_base_lr
+                   for lr, scheduler_lr, scheduler_base_lr in zip(lrs, scheduler.lr_at(step), scheduler.base_lrs)]
+        return lrs
@@ -1,11 +1,15 @@
 from typing import Iterable, Any, Optional, Callable, Union, List
 from .optimizer import Optimizer
+from .. import Tensor
 
 class _LRScheduler:
     def __init__(self, optimizer: Optimizer, last_epoch: int=...) -> None: ...
     def state_dict(self) -> dict: ...
     def load_state_dict(self, state_dict: dict) -> None: ...
     def get_lr(self) -> float: ...
+    def lr_at(self, step: Union[int, Tensor]) -> List[Any]: ...
+    def lr_table(self, steps: Union[Iterable[int], Tensor]) -> Tensor: ...
+    def precompute(self, num_steps: int) -> None: ...
     def step(self, epoch: Optional[int]=...) -> None: ...
 
 class LambdaLR(_LRScheduler):
@@ -37,3 +41,6 @@ class CyclicLR(_LRScheduler):
 class CosineAnnealingWarmRestarts(_LRScheduler):
     def __init__(self, optimizer: Optimizer, T_0: int=..., T_mult: int=..., eta_min: int=..., last_epoch: int=...) -> None: ...
     def step(self, epoch: Optional[int] = ...) -> None: ...
+
+class ChainedScheduler(_LRScheduler):
+    def __init__(self, schedulers: Iterable[_LRScheduler], last_epoch: int=...) -> None: ...
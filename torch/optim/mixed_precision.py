@@ -0,0 +1,187 @@
+import torch
+from collections import OrderedDict
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+from .optimizer import Optimizer
+
+
+_LOW_PRECISION_TYPES = (torch.float16, torch.bfloat16)
+
+
+class _MasterGroup(object):
+    """fp32 master copy of the low-precision parameters of one dtype and
+    device within a parameter group."""
+    def __init__(self, model_params):
+        self.model_params = model_params
+        # Make the model parameters views of a single buffer, so that the
+        # updated weights can be written back with one copy.
+        self.model_flat = _flatten_dense_tensors([p.data for p in model_params])
+        for p, view in zip(model_params, _unflatten_dense_tensors(self.model_flat, model_params)):
+            p.data = view
+        self.master_flat = self.model_flat.float()
+        self.master_grad = torch.zeros_like(self.master_flat)
+        self.master_params = [torch.nn.Parameter(view) for view in
+                              _unflatten_dense_tensors(self.master_flat, model_params)]
+        self.master_grads = _unflatten_dense_tensors(self.master_grad, model_params)
+        self.has_grad = [False] * len(model_params)
+
+
+class MixedPrecisionOptimizer(object):
+    r"""Wraps an optimizer of a low-precision model to update fp32 master
+    weights.
+
+    For every parameter group of :attr:`optimizer`, the ``float16`` and
+    ``bfloat16`` parameters are given flat fp32 master copies, one per dtype
+    and device, and :attr:`optimizer` is changed to update the master copies
+    instead of the model parameters. Parameters that already are fp32 are
+    left untouched.
+
+    Gradients are accumulated in fp32: :meth:`accumulate_grad` adds the
+    low-precision gradients of the model to the master gradients and clears
+    them, so it can be called after the backward pass of every micro-batch.
+    :meth:`step` accumulates any pending gradients, steps :attr:`optimizer`
+    and writes the updated weights back to the model with one cast per group.
+
+    Learning rate schedulers should be attached to the wrapped
+    :attr:`optimizer`.
+
+    Arguments:
+        optimizer (torch.optim.Optimizer): optimizer over the parameters of a
+            low-precision model, of any :class:`~torch.optim.Optimizer` subclass
+        loss_scale (float, optional): static factor the loss was multiplied
+            by before backward; gradients are divided by it when they are
+            accumulated (default: 1.0)
+
+    Example:
+        >>> model = model.to(torch.bfloat16)
+        >>> optimizer = MixedPrecisionOptimizer(torch.optim.Adam(model.parameters()))
+        >>> for micro_batches in loader:
+        >>>     optimizer.zero_grad()
+        >>>     for input, target in micro_batches:
+        >>>         loss_fn(model(input), target).backward()
+        >>>         optimizer.accumulate_grad()
+        >>>     optimizer.step()
+    """
+    def __init__(self, optimizer, loss_scale=1.0):
+        if not isinstance(optimizer, Optimizer):
+            raise TypeError('{} is not an Optimizer'.format(
+                type(optimizer).__name__))
+        if loss_scale <= 0:
+            raise ValueError("Invalid loss_scale value: {}".format(loss_scale))
+        self.optimizer = optimizer
+        self.loss_scale = loss_scale
+        self._master_groups = []
+
+        for param_group in optimizer.param_groups:
+            params = param_group['params']
+            buckets = OrderedDict()
+            for i, p in enumerate(params):
+                if p.dtype in _LOW_PRECISION_TYPES:
+                    buckets.setdefault((p.dtype, p.device), []).append(i)
+            for indices in buckets.values():
+                master_group = _MasterGroup([params[i] for i in indices])
+                for i, master in zip(indices, master_group.master_params):
+                    params[i] = master
+                self._master_groups.append(master_group)
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self.optimizer)
+
+    @property
+    def param_groups(self):
+        return self.optimizer.param_groups
+
+    @property
+    def state(self):
+        return self.optimizer.state
+
+    def state_dict(self):
+        r"""Returns the state of the wrapped optimizer together with the fp32
+        master weights as a :class:`dict`."""
+        return {
+            'optimizer': self.optimizer.state_dict(),
+            'master_weights': [group.master_flat for group in self._master_groups],
+            'loss_scale': self.loss_scale,
+        }
+
+    def load_state_dict(self, state_dict):
+        r"""Loads the optimizer state and master weights, and copies the
+        loaded weights to the model.
+
+        Arguments:
+            state_dict (dict): optimizer state. Should be an object returned
+                from a call to :meth:`state_dict`.
+        """
+        master_weights = state_dict['master_weights']
+        if len(master_weights) != len(self._master_groups):
+            raise ValueError("loaded state dict has {} groups of master weights, "
+                             "but the optimizer has {}".format(len(master_weights), len(self._master_groups)))
+        self.optimizer.load_state_dict(state_dict['optimizer'])
+        self.loss_scale = state_dict['loss_scale']
+        with torch.no_grad():
+            for group, master_flat in zip(self._master_groups, master_weights):
+                group.master_flat.copy_(master_flat)
+                group.model_flat.copy_(group.master_flat)
+
+    def zero_grad(self):
+        r"""Clears the fp32 master gradients and the gradients of the model."""
+        for group in self._master_groups:
+            group.master_grad.zero_()
+            group.has_grad = [False] * len(group.model_params)
+            for p in group.model_params:
+                p.grad = None
+            # The gradients of the master weights are views of master_grad,
+            # which Optimizer.zero_grad cannot detach in place. They are set
+            # again by the next step.
+            for master in group.master_params:
+                master.grad = None
+        self.optimizer.zero_grad()
+
+    @torch.no_grad()
+    def accumulate_grad(self):
+        r"""Adds the gradients of the low-precision model parameters to the
+        fp32 master gradients and clears them."""
+        for group in self._master_groups:
+            grads = [p.grad for p in group.model_params]
+            if all(grad is None for grad in grads):
+                continue
+            if any(grad is not None and grad.is_sparse for grad in grads):
+                raise RuntimeError("MixedPrecisionOptimizer does not support sparse gradients")
+            flat = _flatten_dense_tensors([grad if grad is not None else torch.zeros_like(p)
+                                           for p, grad in zip(group.model_params, grads)])
+            group.master_grad.add_(flat, alpha=1.0 / self.loss_scale)
+            for i, grad in enumerate(grads):
+                if grad is not None:
+                    group.has_grad[i] = True
+            for p in group.model_params:
+                p.grad = None
+
+    def _prepare_master_grads(self):
+        self.accumulate_grad()
+        # Parameters that never received a gradient are skipped by the
+        # optimizer, as they would be without master weights.
+        for group in self._master_groups:
+            for master, grad, has_grad in zip(group.master_params, group.master_grads, group.has_grad):
+                master.grad = grad if has_grad else None
+
+    def step(self, closure=None):
+        r"""Performs a single optimization step on the master weights and
+        copies the result to the model.
+
+        Arguments:
+            closure (callable, optional): A closure that reevaluates the model
+                and returns the loss.
+        """
+        self._prepare_master_grads()
+        if closure is None:
+            loss = self.optimizer.step()
+        else:
+            def master_closure():
+                loss = closure()
+                self._prepare_master_grads()
+                return loss
+            loss = self.optimizer.step(master_closure)
+
+        with torch.no_grad():
+            for group in self._master_groups:
+                group.model_flat.copy_(group.master_flat)
+        return loss
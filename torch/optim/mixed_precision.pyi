@@ -0,0 +1,15 @@
+from .optimizer import Optimizer
+from typing import Any, Callable, List, Optional
+
+class MixedPrecisionOptimizer:
+    optimizer: Optimizer
+    loss_scale: float
+    param_groups: List[dict]
+    state: dict
+
+    def __init__(self, optimizer: Optimizer, loss_scale: float=...) -> None: ...
+    def state_dict(self) -> dict: ...
+    def load_state_dict(self, state_dict: dict) -> None: ...
+    def zero_grad(self) -> None: ...
+    def accumulate_grad(self) -> None: ...
+    def step(self, closure: Optional[Callable[[], float]]=...) -> Optional[float]: ...
@@ -1,7 +1,9 @@
 import torch
 import math
+from collections import OrderedDict
 from torch.nn import Module
 from copy import deepcopy
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
 from torch.optim.lr_scheduler import _LRScheduler
 
 
@@ -112,6 +114,128 @@ class AveragedModel(Module):
         self.n_averaged += 1
 
 
+
+def _flatten_into_views(tensors):
+    """Moves :attr:`tensors` into one flat buffer per dtype and makes each of
+    them a view of its buffer. Returns a list of ``(flat, indices)`` pairs."""
+    groups = OrderedDict()
+    for i, tensor in enumerate(tensors):
+        groups.setdefault(tensor.dtype, []).append(i)
+    flats = []
+    for indices in groups.values():
+        members = [tensors[i] for i in indices]
+        flat = _flatten_dense_tensors([t.data for t in members])
+        for tensor, view in zip(members, _unflatten_dense_tensors(flat, members)):
+            tensor.data = view
+        flats.append((flat, indices))
+    return flats
+
+
+def _gather_flat(tensors, device):
+    tensors = [t.detach() for t in tensors]
+    if all(t.device == tensors[0].device for t in tensors):
+        return _flatten_dense_tensors(tensors).to(device)
+    return _flatten_dense_tensors([t.to(device) for t in tensors])
+
+
+class FlatAveragedModel(AveragedModel):
+    r"""Implements an averaged model for SWA or EMA that keeps its weights in
+    flat buffers.
+
+    Like :class:`AveragedModel`, this class keeps a copy of :attr:`model` on
+    :attr:`device` (e.g. the CPU, to keep the average out of accelerator
+    memory). Its parameters are views into one contiguous buffer per dtype,
+    so that :meth:`update_parameters` costs a single ``lerp_`` per buffer
+    instead of one Python-level update per parameter.
+
+    The floating point buffers of :attr:`model`, such as the running
+    statistics of Batch Normalization layers, are averaged the same way,
+    which gives a running estimate of the statistics of the averaged model.
+    This removes the need for a separate :func:`update_bn` pass, at the cost
+    of the statistics being an average of the statistics seen during
+    training rather than statistics recomputed for the averaged weights.
+
+    Arguments:
+        model (torch.nn.Module): model to average
+        device (torch.device, optional): if provided, the averaged model will
+            be stored on the :attr:`device`
+        decay (float, optional): if provided, an exponential moving average
+            with this decay is kept; otherwise all updates are weighted
+            equally, as in SWA (default: None)
+        update_every (int, optional): only every :attr:`update_every`-th call
+            to :meth:`update_parameters` updates the average (default: 1)
+        average_buffers (bool, optional): whether to average the floating
+            point buffers of :attr:`model`; if ``False``, they are copied
+            (default: True)
+
+    Example:
+        >>> loader, optimizer, model, loss_fn = ...
+        >>> ema_model = torch.optim.swa_utils.FlatAveragedModel(
+        >>>     model, device='cpu', decay=0.999, update_every=10)
+        >>> for input, target in loader:
+        >>>     optimizer.zero_grad()
+        >>>     loss_fn(model(input), target).backward()
+        >>>     optimizer.step()
+        >>>     ema_model.update_parameters(model)
+        >>> # Batch Normalization statistics are already averaged
+        >>> ema_model.eval()
+        >>> preds = ema_model(test_input)
+    """
+    def __init__(self, model, device=None, decay=None, update_every=1, average_buffers=True):
+        super(FlatAveragedModel, self).__init__(model, device=device)
+        if decay is not None and not 0.0 <= decay <= 1.0:
+            raise ValueError("Invalid decay value: {}".format(decay))
+        if update_every < 1:
+            raise ValueError("Expected positive update_every, but got {}".format(update_every))
+        self.decay = decay
+        self.update_every = update_every
+        self.average_buffers = average_buffers
+        self._num_calls = 0
+        self._flatten()
+
+    def _averaged_buffers(self):
+        return [b for b in self.module.buffers() if b.is_floating_point()]
+
+    def _flatten(self):
+        self._param_flats = _flatten_into_views(list(self.module.parameters()))
+        self._buffer_flats = _flatten_into_views(self._averaged_buffers())
+
+    def _apply(self, fn):
+        super(FlatAveragedModel, self)._apply(fn)
+        # Moving or casting the module replaces the views with new tensors.
+        if hasattr(self, '_param_flats'):
+            self._flatten()
+        return self
+
+    def _weight(self):
+        if self.decay is not None:
+            return 1.0 - self.decay
+        return 1.0 / (self.n_averaged.item() + 1)
+
+    def _update(self, flats, tensors, weight):
+        for flat, indices in flats:
+            source = _gather_flat([tensors[i] for i in indices], flat.device)
+            if weight is None:
+                flat.copy_(source)
+            else:
+                flat.lerp_(source, weight)
+
+    @torch.no_grad()
+    def update_parameters(self, model):
+        self._num_calls += 1
+        if (self._num_calls - 1) % self.update_every != 0:
+            return
+        weight = None if self.n_averaged == 0 else self._weight()
+        self._update(self._param_flats, list(model.parameters()), weight)
+
+        buffers = [b for b in model.buffers() if b.is_floating_point()]
+        self._update(self._buffer_flats, buffers, weight if self.average_buffers else None)
+        for b_avg, b_model in zip(self.module.buffers(), model.buffers()):
+            if not b_avg.is_floating_point():
+                b_avg.copy_(b_model.detach())
+        self.n_averaged += 1
+
+
 def update_bn(loader, model, device=None):
     r"""Updates BatchNorm running_mean, running_var buffers in the model.
 
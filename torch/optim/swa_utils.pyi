@@ -10,6 +10,10 @@ class AveragedModel(Module):
 
     def update_parameters(self, model: Module) -> None:...
 
+class FlatAveragedModel(AveragedModel):
+    def __init__(self, model: Module, device: Union[int, device]=..., decay: Optional[float]=...,
+                 update_every: int=..., average_buffers: bool=...) -> None:...
+
 def update_bn(loader: Iterable, model: Module, device: Union[int, device]=...) -> None:...
 
 class SWALR(_LRScheduler):
@@ -6,7 +6,12 @@ import torch
 import torch.distributed.autograd as dist_autograd
 import torch.distributed.rpc as rpc
 from torch import optim
-from torch.distributed.optim import DistributedOptimizer
+from torch.distributed.optim import DistributedOptimizer, ParameterServerOptimizer
+from torch.distributed.optim.optimizer import (
+    _ParameterServerOptimizer,
+    _ShardOptimizer,
+    _shard_optimizers,
+)
 from torch.testing._internal.dist_utils import dist_init
 from torch.testing._internal.distributed.rpc.rpc_agent_test_fixture import (
     RpcAgentTestFixture,
@@ -203,6 +208,99 @@ class DistOptimizerTest(RpcAgentTestFixture):
             self.assertEqual(new_w1, module1.get_w())
             self.assertEqual(new_w2, module2.get_w())
 
+    @dist_init()
+    def test_parameter_server_optim(self):
+        # local version
+        module1 = MyModule()
+        module2 = MyModule()
+        params = [module1.get_w(), module2.get_w()]
+        local_optim = optim.SGD(params, lr=0.05)
+
+        g_cpu = torch.Generator()
+        g_cpu.manual_seed(0)
+        t1 = torch.rand((3, 3), requires_grad=True, generator=g_cpu)
+        t2 = torch.rand((3, 3), requires_grad=True, generator=g_cpu)
+        output1 = module1.forward(t2)
+        output2 = module2.forward(output1)
+        loss = torch.add(output2, t1).sum()
+
+        loss.backward()
+        local_optim.step()
+
+        # distributed version
+        owner1 = "worker%d" % ((self.rank + 1) % self.world_size)
+        owner2 = "worker%d" % ((self.rank + 2) % self.world_size)
+
+        remote_module1 = rpc.remote(owner1, MyModule)
+        remote_module2 = rpc.remote(owner2, MyModule)
+        remote_param1 = remote_method(MyModule.get_w, remote_module1)
+        remote_param2 = remote_method(MyModule.get_w, remote_module2)
+
+        ps_optim = ParameterServerOptimizer(
+            optim.SGD, [remote_param1, remote_param2], lr=0.05
+        )
+
+        with dist_autograd.context() as context_id:
+            g_cpu.manual_seed(0)
+            t1 = torch.rand((3, 3), requires_grad=True, generator=g_cpu)
+            t2 = torch.rand((3, 3), requires_grad=True, generator=g_cpu)
+            output1 = rpc_async_method(MyModule.forward, remote_module1, t2)
+            output2 = rpc_async_method(MyModule.forward, remote_module2, output1.wait())
+            loss = torch.add(output2.wait(), t1)
+
+            dist_autograd.backward(context_id, [loss.sum()])
+            ps_optim.step(context_id)
+
+            new_w1 = rpc_async_method(MyModule.get_w, remote_module1).wait()
+            new_w2 = rpc_async_method(MyModule.get_w, remote_module2).wait()
+
+            # ensure local equals remote
+            self.assertEqual(new_w1, module1.get_w())
+            self.assertEqual(new_w2, module2.get_w())
+
+        ps_optim.close()
+        self.assertEqual(ps_optim.remote_optimizers, [])
+
+    @dist_init()
+    def test_parameter_server_optim_shares_and_releases_shards(self):
+        param = torch.zeros(2, requires_grad=True)
+        param_rref = rpc.RRef(param)
+        ps_optim1 = _ParameterServerOptimizer(False, False, optim.SGD, [param_rref], lr=1.0)
+        ps_optim2 = _ParameterServerOptimizer(False, False, optim.SGD, [param_rref], lr=1.0)
+        self.assertIs(ps_optim1.shards[0], ps_optim2.shards[0])
+        self.assertEqual(ps_optim1.shards[0].num_users, 2)
+
+        with self.assertRaisesRegex(ValueError, "different configuration"):
+            _ParameterServerOptimizer(False, False, optim.SGD, [param_rref], lr=0.5)
+        self.assertEqual(ps_optim1.shards[0].num_users, 2)
+
+        # The optimizer of the parameter is freed with its last user.
+        ps_optim1.release()
+        self.assertIn(param, _shard_optimizers)
+        del ps_optim2
+        self.assertNotIn(param, _shard_optimizers)
+
+    @dist_init()
+    def test_parameter_server_optim_batches_gradients(self):
+        param = torch.zeros(2, requires_grad=True)
+        shard_optim = _ShardOptimizer(optim.SGD, param, (), {"lr": 1.0})
+
+        # Simulate a step of another trainer in progress, asynchronous
+        # gradients are left pending.
+        shard_optim.step_lock.acquire()
+        shard_optim.submit(torch.ones(2), asynchronous=True, average=True)
+        shard_optim.submit(torch.ones(2) * 2, asynchronous=True, average=True)
+        self.assertEqual(param, torch.zeros(2))
+        self.assertEqual(shard_optim.pending_count, 2)
+        shard_optim.step_lock.release()
+
+        # The pending gradients are applied with this one in a single step.
+        shard_optim.submit(torch.ones(2) * 3, asynchronous=False, average=True)
+        self.assertEqual(param, torch.ones(2) * -2)
+        self.assertEqual(shard_optim.pending_count, 0)
+        self.assertFalse(shard_optim.step_lock.locked())
+
+
 class TensorPipeRpcAgentDistOptimizerTest(TensorPipeRpcAgentTestFixture,
                                           DistOptimizerTest):
 
@@ -1,4 +1,5 @@
 import concurrent.futures
+import pickle
 import sys
 import time
 import unittest
@@ -19,7 +20,7 @@ from torch.distributed.rpc.internal import (
     _build_rpc_profiling_key,
 )
 from torch.testing._internal.common_distributed import skip_if_lt_x_gpu
-from torch.testing._internal.common_utils import IS_MACOS, load_tests
+from torch.testing._internal.common_utils import IS_MACOS, TEST_NUMPY, load_tests
 from torch.testing._internal.dist_utils import (
     dist_init,
     get_function_event,
@@ -151,6 +152,19 @@ def add_rref_to_value(rref, value):
     return rref.to_here() + value
 
 
+def add_to_rref_value_inplace(rref, value):
+    rref.local_value().add_(value)
+
+
+def replace_rref_tensor(rref, index, value):
+    rref.local_value()[index] = value
+
+
+def increment_and_mark_modified(rref, increment):
+    rref.local_value().increment_value(increment)
+    rpc.RRefCache.mark_modified(rref)
+
+
 def run_nested_pickle(pickle_cls_instance, tensor):
     return pickle_cls_instance.t + tensor
 
@@ -203,6 +217,12 @@ def delayed_add(a, b, seconds=0.05):
     return a + b
 
 
+def batch_my_tensor_function(args_list):
+    a = torch.stack([a for a, _ in args_list])
+    b = torch.stack([b for _, b in args_list])
+    return list(torch.add(a, b).unbind())
+
+
 def no_result():
     print("do nothing")
 
@@ -418,6 +438,20 @@ def async_add_multi_fanout(to, x, num, step):
     return ret_future
 
 
+@rpc.functions.batched_execution(max_batch_size=4, max_delay_us=100000)
+def batched_add_one(args_list):
+    return list(torch.stack([t for t, in args_list]).add(1))
+
+
+@rpc.functions.batched_execution(max_batch_size=4, max_delay_us=1000)
+def batched_raise_func(args_list):
+    raise ValueError("Expected error")
+
+
+def get_batching_metrics():
+    return batched_add_one.batching_metrics()
+
+
 def return_future():
     return torch.futures.Future()
 
@@ -525,6 +559,67 @@ class RpcTest(RpcAgentTestFixture):
     def test_rref_proxy_tensor_self(self):
         self._test_rref_proxy_tensor(rpc.get_worker_info())
 
+    @dist_init
+    def test_rref_cache(self):
+        dst = worker_name((self.rank + 1) % self.world_size)
+        cache = rpc.RRefCache(max_size=2)
+        rref = rpc.remote(dst, torch.add, args=(torch.zeros(2, 2), 1))
+        self.assertEqual(cache.to_here(rref), torch.ones(2, 2))
+        self.assertEqual(cache.to_here(rref), torch.ones(2, 2))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "evictions": 0, "size": 1})
+
+        # In-place modifications on the owner invalidate the cached value.
+        rpc.rpc_sync(dst, add_to_rref_value_inplace, args=(rref, 1))
+        self.assertEqual(cache.to_here(rref), torch.ones(2, 2) * 2)
+        self.assertEqual(cache.to_here(rref), torch.ones(2, 2) * 2)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+        rrefs = [rpc.remote(dst, torch.add, args=(torch.zeros(i), 0)) for i in range(2)]
+        for i, r in enumerate(rrefs):
+            self.assertEqual(cache.to_here(r), torch.zeros(i))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.to_here(rref), torch.ones(2, 2) * 2)
+        self.assertEqual(cache.stats()["misses"], 5)
+
+        cache.invalidate(rref)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    @dist_init
+    def test_rref_cache_mark_modified(self):
+        dst = worker_name((self.rank + 1) % self.world_size)
+        cache = rpc.RRefCache()
+        rref = rpc.remote(dst, MyClass, args=(1,))
+        self.assertEqual(cache.to_here(rref).a, 1)
+        rpc.rpc_sync(dst, increment_and_mark_modified, args=(rref, 2))
+        self.assertEqual(cache.to_here(rref).a, 3)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    @dist_init
+    def test_rref_cache_replaced_tensor(self):
+        dst = worker_name((self.rank + 1) % self.world_size)
+        cache = rpc.RRefCache()
+        rref = rpc.remote(dst, list, args=([torch.zeros(2), torch.zeros(3)],))
+        self.assertEqual(cache.to_here(rref), [torch.zeros(2), torch.zeros(3)])
+        # The new tensor has the version of the one it replaces, and may get
+        # its address once the old one is freed.
+        for i in range(3):
+            rpc.rpc_sync(dst, replace_rref_tensor, args=(rref, 0, torch.ones(2) * i))
+            self.assertEqual(cache.to_here(rref), [torch.ones(2) * i, torch.zeros(3)])
+        self.assertEqual(cache.to_here(rref), [torch.ones(2) * 2, torch.zeros(3)])
+        self.assertEqual(cache.stats()["misses"], 4)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    @dist_init
+    def test_rref_cache_self(self):
+        cache = rpc.RRefCache()
+        rref = rpc.remote(worker_name(self.rank), torch.add, args=(torch.zeros(2), 1))
+        self.assertEqual(cache.to_here(rref), torch.ones(2))
+        self.assertEqual(len(cache), 0)
+
     @dist_init
     def test_rref_proxy_reuse(self):
         rref = rpc.remote(
@@ -1275,6 +1370,154 @@ class RpcTest(RpcAgentTestFixture):
         m.set(my_tensor_function(torch.ones(2, 2), torch.ones(2, 2)))
         self.assertEqual(ret, run_nested_pickle(m, torch.ones(2, 2)))
 
+    def test_rpc_pickler_python_udf_fast_path(self):
+        t = torch.ones(2, 2)
+        python_udf = PythonUDF(my_tensor_function, (t, 3, "a"), {"b": None})
+        binary_data, tensors = _internal_rpc_pickler.serialize(python_udf)
+        self.assertEqual(len(tensors), 1)
+        self.assertIs(tensors[0], t)
+
+        ret = _internal_rpc_pickler.deserialize(binary_data, tensors)
+        self.assertIs(ret.func, my_tensor_function)
+        self.assertIs(ret.args[0], t)
+        self.assertEqual(ret.args[1:], (3, "a"))
+        self.assertEqual(ret.kwargs, {"b": None})
+
+        # Serializing again reuses the pickler of this thread.
+        self.assertEqual(_internal_rpc_pickler.serialize(python_udf), (binary_data, tensors))
+
+        # A tensor passed as several arguments is sent once.
+        u = torch.zeros(3)
+        python_udf = PythonUDF(my_tensor_function, (t, u, t), {})
+        binary_data, tensors = _internal_rpc_pickler.serialize(python_udf)
+        self.assertEqual(len(tensors), 2)
+        self.assertIs(tensors[0], t)
+        self.assertIs(tensors[1], u)
+        ret = _internal_rpc_pickler.deserialize(binary_data, tensors)
+        self.assertIs(ret.args[0], t)
+        self.assertIs(ret.args[1], u)
+        self.assertIs(ret.args[2], t)
+
+    @unittest.skipIf(
+        not TEST_NUMPY or pickle.HIGHEST_PROTOCOL < 5,
+        "Out-of-band buffers require numpy and pickle protocol 5",
+    )
+    def test_rpc_pickler_out_of_band_buffers(self):
+        import numpy as np
+
+        array = np.arange(1 << 16, dtype=np.float32)
+        small_array = np.arange(4)
+        t = torch.ones(2)
+        binary_data, tensors = _internal_rpc_pickler.serialize([array, t, small_array])
+        self.assertLess(len(binary_data), array.nbytes)
+        self.assertEqual(len(tensors), 2)
+        self.assertIs(tensors[0], t)
+        self.assertEqual(tensors[1].dtype, torch.uint8)
+        self.assertEqual(tensors[1].numel(), array.nbytes)
+
+        ret = _internal_rpc_pickler.deserialize(binary_data, tensors)
+        self.assertTrue(np.array_equal(ret[0], array))
+        self.assertIs(ret[1], t)
+        self.assertTrue(np.array_equal(ret[2], small_array))
+
+    @unittest.skipIf(not TEST_NUMPY, "numpy is required")
+    @dist_init
+    def test_py_numpy_args(self):
+        import numpy as np
+
+        n = self.rank + 1
+        dst_rank = n % self.world_size
+        array = np.arange(1 << 16, dtype=np.float32) * n
+        ret = rpc.rpc_sync(worker_name(dst_rank), np.add, args=(array, array))
+        self.assertTrue(np.array_equal(ret, array + array))
+
+    @dist_init
+    def test_rpc_async_many(self):
+        n = self.rank + 1
+        dst_rank = n % self.world_size
+        args_list = [(torch.ones(n, n), i, 1) for i in range(10)]
+        futs = rpc.rpc_async_many(worker_name(dst_rank), my_function, args_list)
+        self.assertEqual(len(futs), len(args_list))
+        for fut, args in zip(futs, args_list):
+            self.assertEqual(fut.wait(), my_function(*args))
+
+        kwargs_list = [{"seconds": 0.01} for _ in range(3)]
+        futs = rpc.rpc_async_many(
+            worker_name(dst_rank), delayed_add, [(i, 1) for i in range(3)], kwargs_list)
+        self.assertEqual([fut.wait() for fut in futs], [1, 2, 3])
+
+        self.assertEqual(rpc.rpc_async_many(worker_name(dst_rank), my_function, []), [])
+
+    @dist_init
+    def test_rpc_async_many_exception(self):
+        n = self.rank + 1
+        dst_rank = n % self.world_size
+        futs = rpc.rpc_async_many(
+            worker_name(dst_rank), raise_or_inc, [(torch.ones(1),), (torch.ones(2),), (torch.ones(3),)])
+        self.assertEqual(futs[0].wait(), torch.ones(1) + 1)
+        # The error is raised by the callback that extracts the result.
+        with self.assertRaisesRegex(Exception, "Expected error"):
+            futs[1].wait()
+        self.assertEqual(futs[2].wait(), torch.ones(3) + 1)
+
+        with self.assertRaisesRegex(ValueError, "one per call"):
+            rpc.rpc_async_many(worker_name(dst_rank), my_function, [(1, 2, 3)], [{}, {}])
+
+        with self.assertRaisesRegex(TypeError, "does not support TorchScript"):
+            rpc.rpc_async_many(worker_name(dst_rank), my_script_func, [(torch.ones(1),)])
+
+    @dist_init
+    def test_rpc_async_many_batch_func(self):
+        n = self.rank + 1
+        dst_rank = n % self.world_size
+        args_list = [(torch.ones(n, n) * i, torch.ones(n, n)) for i in range(5)]
+        futs = rpc.rpc_async_many(
+            worker_name(dst_rank),
+            my_tensor_function,
+            args_list,
+            batch_func=batch_my_tensor_function,
+        )
+        for fut, args in zip(futs, args_list):
+            self.assertEqual(fut.wait(), my_tensor_function(*args))
+
+    @dist_init
+    def test_batched_execution(self):
+        n = self.rank + 1
+        dst_rank = n % self.world_size
+        tensors = [torch.ones(2, 2) * i for i in range(8)]
+        futs = [
+            rpc.rpc_async(worker_name(dst_rank), batched_add_one, args=(t,))
+            for t in tensors
+        ]
+        for fut, t in zip(futs, tensors):
+            self.assertEqual(fut.wait(), t + 1)
+
+        # Only this worker calls batched_add_one on dst_rank.
+        metrics = rpc.rpc_sync(worker_name(dst_rank), get_batching_metrics)
+        self.assertEqual(metrics["num_calls"], len(tensors))
+        self.assertGreaterEqual(metrics["num_batches"], 2)
+        self.assertLessEqual(metrics["num_batches"], len(tensors))
+        self.assertLessEqual(metrics["mean_batch_size"], 4)
+        self.assertGreaterEqual(metrics["max_queueing_delay_us"], metrics["mean_queueing_delay_us"])
+
+    @dist_init
+    def test_batched_execution_exception(self):
+        n = self.rank + 1
+        dst_rank = n % self.world_size
+        futs = [
+            rpc.rpc_async(worker_name(dst_rank), batched_raise_func, args=(i,))
+            for i in range(3)
+        ]
+        for fut in futs:
+            with self.assertRaisesRegex(ValueError, "Expected error"):
+                fut.wait()
+
+    def test_batched_execution_invalid_args(self):
+        with self.assertRaisesRegex(ValueError, "max_batch_size"):
+            rpc.functions.batched_execution(max_batch_size=0)
+        with self.assertRaisesRegex(ValueError, "max_delay_us"):
+            rpc.functions.batched_execution(max_delay_us=-1)
+
     @dist_init
     def test_py_function_exception(self):
         n = self.rank + 1
@@ -1,6 +1,10 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
+import math
+import threading
+import weakref
 import torch
 import warnings
+from collections import namedtuple
 
 
 def detach_variable(inputs):
@@ -52,6 +56,181 @@ def set_device_states(devices, states):
             torch.cuda.set_rng_state(state)
 
 
+_offload_state = threading.local()
+
+
+def _current_offloader():
+    stack = getattr(_offload_state, 'stack', None)
+    return stack[-1] if stack else None
+
+
+class _OffloadedTensor(object):
+    __slots__ = ['device', 'requires_grad', 'nbytes', 'host', 'copy_event',
+                 'prefetched', 'prefetch_event', '__weakref__']
+
+    def __init__(self, tensor, host, copy_event):
+        self.device = tensor.device
+        self.requires_grad = tensor.requires_grad
+        self.nbytes = tensor.numel() * tensor.element_size()
+        self.host = host
+        self.copy_event = copy_event
+        self.prefetched = None
+        self.prefetch_event = None
+
+
+class offload_activations(object):
+    r"""Context manager that offloads activations saved by :func:`checkpoint`
+    to host memory.
+
+    While active, every tensor input of a checkpointed segment that is at
+    least :attr:`min_bytes` large is copied to (pinned) host memory during
+    forward instead of being kept on its device. For CUDA tensors the copy is
+    issued on a side stream, so it overlaps with the rest of forward. During
+    backward, unpacking an offloaded tensor also starts copying back the
+    :attr:`prefetch` tensors that were offloaded right before it, which are
+    the ones the following (earlier) segments will need next.
+
+    Offloading works the same way for CPU tensors, where it only moves the
+    saved inputs to separate buffers; this allows testing the bookkeeping
+    without a GPU. The counters :attr:`num_offloaded`, :attr:`offloaded_bytes`,
+    :attr:`num_prefetched` and :attr:`fetched_bytes`, and the
+    :attr:`host_bytes` / :attr:`peak_host_bytes` currently and at most held
+    in host memory, describe what happened.
+
+    .. warning::
+        Offloaded tensors must not be modified in-place after the forward pass,
+        since the modification can't be detected once the tensor left the
+        device.
+
+    Arguments:
+        min_bytes (int, optional): tensors smaller than this are saved as
+            usual. Default: ``1048576``
+        pin_memory (bool, optional): whether to use page-locked host buffers
+            for CUDA tensors, which is required for asynchronous copies.
+            Default: ``True``
+        prefetch (int, optional): number of offloaded tensors to copy back
+            ahead of their use in backward. Default: ``1``
+
+    Example:
+        >>> with torch.utils.checkpoint.offload_activations(min_bytes=2 ** 20):
+        ...     out = checkpoint_sequential(model, 4, input_var)
+        >>> out.sum().backward()
+    """
+    def __init__(self, min_bytes=1 << 20, pin_memory=True, prefetch=1):
+        if prefetch < 0:
+            raise ValueError("prefetch must be non-negative, got {}".format(prefetch))
+        self.min_bytes = min_bytes
+        self.pin_memory = pin_memory
+        self.prefetch = prefetch
+        self.num_offloaded = 0
+        self.offloaded_bytes = 0
+        self.num_prefetched = 0
+        self.fetched_bytes = 0
+        self.host_bytes = 0
+        self.peak_host_bytes = 0
+        self._handles = []
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if not hasattr(_offload_state, 'stack'):
+            _offload_state.stack = []
+        _offload_state.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _offload_state.stack.pop()
+        return False
+
+    def _stream(self, device):
+        if device not in self._streams:
+            self._streams[device] = torch.cuda.Stream(device)
+        return self._streams[device]
+
+    def _release(self, nbytes):
+        with self._lock:
+            self.host_bytes -= nbytes
+
+    def pack(self, tensor):
+        r"""Offloads :attr:`tensor` if it is large enough.
+
+        Returns either :attr:`tensor` itself or a handle that must be passed
+        to :meth:`unpack` to get the tensor back.
+        """
+        nbytes = tensor.numel() * tensor.element_size()
+        if nbytes < self.min_bytes:
+            return tensor
+        tensor = tensor.detach()
+        if tensor.is_cuda:
+            host = torch.empty(tensor.size(), dtype=tensor.dtype, layout=tensor.layout,
+                               pin_memory=self.pin_memory)
+            stream = self._stream(tensor.device)
+            stream.wait_stream(torch.cuda.current_stream(tensor.device))
+            with torch.cuda.stream(stream):
+                host.copy_(tensor, non_blocking=self.pin_memory)
+                # The device memory can't be reused before the copy is done.
+                tensor.record_stream(stream)
+                copy_event = torch.cuda.Event()
+                copy_event.record(stream)
+        else:
+            host = tensor.clone()
+            copy_event = None
+        handle = _OffloadedTensor(tensor, host, copy_event)
+        with self._lock:
+            self.num_offloaded += 1
+            self.offloaded_bytes += nbytes
+            self.host_bytes += nbytes
+            self.peak_host_bytes = max(self.peak_host_bytes, self.host_bytes)
+            self._handles.append(weakref.ref(handle))
+        # Host memory is given back when the autograd graph that owns the
+        # handle goes away.
+        weakref.finalize(handle, self._release, nbytes)
+        return handle
+
+    def _start_fetch(self, handle):
+        if handle.prefetched is not None:
+            return
+        if handle.device.type == 'cuda':
+            stream = self._stream(handle.device)
+            with torch.cuda.stream(stream):
+                stream.wait_event(handle.copy_event)
+                handle.prefetched = handle.host.to(handle.device, non_blocking=self.pin_memory)
+                handle.prefetch_event = torch.cuda.Event()
+                handle.prefetch_event.record(stream)
+        else:
+            handle.prefetched = handle.host.clone()
+        with self._lock:
+            self.num_prefetched += 1
+            self.fetched_bytes += handle.nbytes
+
+    def unpack(self, handle):
+        r"""Returns the tensor packed by :meth:`pack`, bringing it back to its
+        device if it was offloaded."""
+        if not isinstance(handle, _OffloadedTensor):
+            return handle
+        with self._lock:
+            handles = [ref() for ref in self._handles]
+            self._handles = [ref for ref, h in zip(self._handles, handles) if h is not None]
+            handles = [h for h in handles if h is not None]
+        self._start_fetch(handle)
+        tensor = handle.prefetched
+        handle.prefetched = None
+        if handle.prefetch_event is not None:
+            current_stream = torch.cuda.current_stream(handle.device)
+            current_stream.wait_event(handle.prefetch_event)
+            tensor.record_stream(current_stream)
+            handle.prefetch_event = None
+        tensor.requires_grad = handle.requires_grad
+
+        # Backward visits checkpointed segments in reverse order, so the
+        # tensors offloaded right before this one are needed next.
+        if handle in handles:
+            index = handles.index(handle)
+            for prev in handles[max(index - self.prefetch, 0):index]:
+                self._start_fetch(prev)
+        return tensor
+
+
 class CheckpointFunction(torch.autograd.Function):
 
     @staticmethod
@@ -69,7 +248,19 @@ class CheckpointFunction(torch.autograd.Function):
             if torch.cuda._initialized:
                 ctx.had_cuda_in_fwd = True
                 ctx.fwd_gpu_devices, ctx.fwd_gpu_states = get_device_states(*args)
-        ctx.save_for_backward(*args)
+        ctx.offloader = _current_offloader()
+        ctx.offloaded = {}
+        if ctx.offloader is not None:
+            saved = list(args)
+            for i, arg in enumerate(args):
+                if isinstance(arg, torch.Tensor):
+                    packed = ctx.offloader.pack(arg)
+                    if packed is not arg:
+                        ctx.offloaded[i] = packed
+                        saved[i] = None
+            ctx.save_for_backward(*saved)
+        else:
+            ctx.save_for_backward(*args)
         with torch.no_grad():
             outputs = run_function(*args)
         return outputs
@@ -79,6 +270,11 @@ class CheckpointFunction(torch.autograd.Function):
         if not torch.autograd._is_checkpoint_valid():
             raise RuntimeError("Checkpointing is not compatible with .grad(), please use .backward() if possible")
         inputs = ctx.saved_tensors
+        if ctx.offloaded:
+            inputs = list(inputs)
+            for i, handle in ctx.offloaded.items():
+                inputs[i] = ctx.offloader.unpack(handle)
+            inputs = tuple(inputs)
         # Stash the surrounding rng state, and mimic the state that was
         # present at this time during forward.  Restore the surrounding state
         # when we're done.
@@ -163,6 +359,191 @@ def checkpoint(function, *args, **kwargs):
     return CheckpointFunction.apply(function, preserve, *args)
 
 
+# A single entry of a checkpointing plan. Layers ``start`` through ``end``
+# (inclusive) are run as one unit; if ``checkpointed`` is False the unit runs
+# normally and keeps its activations, otherwise it is wrapped in
+# :func:`checkpoint` and recomputed during backward.
+CheckpointSegment = namedtuple('CheckpointSegment', ['start', 'end', 'checkpointed'])
+
+# Per-layer statistics collected by :func:`profile_sequential`. ``cpu_time``
+# is in microseconds and ``memory`` is the number of bytes the layer keeps
+# alive for backward.
+LayerProfile = namedtuple('LayerProfile', ['index', 'name', 'cpu_time', 'memory'])
+
+
+def _sequential_functions(functions):
+    if isinstance(functions, torch.nn.Sequential):
+        return list(functions.children())
+    return list(functions)
+
+
+def _tensor_nbytes(output):
+    if isinstance(output, torch.Tensor):
+        return output.numel() * output.element_size()
+    if isinstance(output, (tuple, list)):
+        return sum(_tensor_nbytes(o) for o in output)
+    return 0
+
+
+def profile_sequential(functions, input, warmup=1):
+    r"""Profiles each layer of a sequential model for checkpoint planning.
+
+    Runs :attr:`functions` once with autograd enabled under
+    :class:`torch.autograd.profiler.profile` (with ``profile_memory=True``)
+    and reports, for every layer, the CPU time it took and the memory it
+    left allocated, which approximates the activations autograd keeps alive
+    for backward. When the profiler reports no memory usage for a layer (for
+    example because memory profiling is unavailable for the device), the
+    size of the layer's output is used instead.
+
+    Args:
+        functions: A :class:`torch.nn.Sequential` or the list of modules or
+            functions to profile
+        input: A Tensor that is input to :attr:`functions`
+        warmup(int, optional, default=1): number of un-profiled forward
+            passes to run first, so that one-time initialization does not
+            skew the timings
+
+    Returns:
+        A list of :class:`LayerProfile`, one per layer
+    """
+    functions = _sequential_functions(functions)
+    labels = ['checkpoint::layer_{}'.format(i) for i in range(len(functions))]
+
+    with torch.no_grad():
+        for _ in range(warmup):
+            x = input
+            for function in functions:
+                x = function(x)
+
+    output_bytes = []
+    with torch.autograd.profiler.profile(profile_memory=True) as prof:
+        x = input
+        for label, function in zip(labels, functions):
+            with torch.autograd.profiler.record_function(label):
+                x = function(x)
+            output_bytes.append(_tensor_nbytes(x))
+    del x
+
+    events = {}
+    for evt in prof.function_events:
+        if evt.name in labels and evt.name not in events:
+            events[evt.name] = evt
+
+    profiles = []
+    for i, (label, function) in enumerate(zip(labels, functions)):
+        evt = events.get(label)
+        cpu_time = evt.cpu_time_total if evt is not None else 0
+        memory = 0
+        if evt is not None:
+            memory = max(evt.cpu_memory_usage, 0) + max(evt.cuda_memory_usage, 0)
+        if memory == 0:
+            memory = output_bytes[i]
+        profiles.append(LayerProfile(i, type(function).__name__, cpu_time, memory))
+    return profiles
+
+
+def _default_checkpoint_policy(layer):
+    # Prefer to keep activations that are expensive to recompute relative to
+    # the memory they occupy (e.g. matmul outputs) and recompute the cheap
+    # ones (e.g. elementwise ops).
+    return float(layer.cpu_time) / max(layer.memory, 1)
+
+
+def _split_recompute_run(start, end):
+    # Break a run of recomputed layers into roughly sqrt(n) checkpointed
+    # segments, so that recomputation during backward never materializes the
+    # activations of the whole run at once.
+    length = end - start + 1
+    size = int(math.ceil(length / max(int(math.sqrt(length)), 1)))
+    return [CheckpointSegment(s, min(s + size - 1, end), True)
+            for s in range(start, end + 1, size)]
+
+
+def _build_plan(save):
+    plan = []
+    start = 0
+    for i in range(1, len(save) + 1):
+        if i == len(save) or save[i] != save[start]:
+            if save[start]:
+                plan.append(CheckpointSegment(start, i - 1, False))
+            else:
+                plan.extend(_split_recompute_run(start, i - 1))
+            start = i
+    return plan
+
+
+def _estimate_plan_memory(profiles, plan):
+    stored = 0
+    peak_recompute = 0
+    for i, segment in enumerate(plan):
+        memory = sum(p.memory for p in profiles[segment.start:segment.end + 1])
+        if segment.checkpointed:
+            # Only the segment input stays alive, unless it is already kept
+            # by a preceding saved segment (or is the model input itself); the
+            # rest is rematerialized while the segment is recomputed.
+            if i > 0 and plan[i - 1].checkpointed:
+                stored += profiles[segment.start - 1].memory
+            peak_recompute = max(peak_recompute, memory)
+        else:
+            stored += memory
+    return stored + peak_recompute
+
+
+def plan_checkpoint_segments(profiles, memory_budget, policy=None):
+    r"""Decides which layers of a sequential model to save or recompute.
+
+    Starting from a plan that recomputes every layer, layers are greedily
+    switched to "save" in decreasing order of :attr:`policy` as long as the
+    estimated activation memory of the plan stays within
+    :attr:`memory_budget`. Consecutive recomputed layers are grouped into
+    checkpointed segments of about :math:`\sqrt{n}` layers each.
+
+    The memory estimate of a plan is the memory of all saved layers, plus the
+    inputs saved by checkpointed segments, plus the memory of the largest
+    checkpointed segment, which is materialized while it is recomputed.
+
+    Args:
+        profiles: list of :class:`LayerProfile`, as returned by
+            :func:`profile_sequential`
+        memory_budget(int): activation memory budget, in bytes
+        policy(callable, optional): maps a :class:`LayerProfile` to a score;
+            layers with higher scores are saved first. Defaults to the CPU
+            time per byte of activation memory.
+
+    Returns:
+        A list of :class:`CheckpointSegment` that can be passed to
+        :func:`checkpoint_sequential` as :attr:`segments`
+    """
+    if policy is None:
+        policy = _default_checkpoint_policy
+    profiles = list(profiles)
+    if not profiles:
+        return []
+
+    save = [False] * len(profiles)
+    for layer in sorted(profiles, key=policy, reverse=True):
+        save[layer.index] = True
+        if _estimate_plan_memory(profiles, _build_plan(save)) > memory_budget:
+            save[layer.index] = False
+    return _build_plan(save)
+
+
+def plan_checkpoint_sequential(functions, input, memory_budget, policy=None):
+    r"""Profiles a sequential model and plans its checkpoint segments.
+
+    This is a shorthand for :func:`profile_sequential` followed by
+    :func:`plan_checkpoint_segments`.
+
+    Example:
+        >>> model = nn.Sequential(...)
+        >>> plan = plan_checkpoint_sequential(model, input_var, 2 ** 30)
+        >>> output = checkpoint_sequential(model, plan, input_var)
+    """
+    profiles = profile_sequential(functions, input)
+    return plan_checkpoint_segments(profiles, memory_budget, policy=policy)
+
+
 def checkpoint_sequential(functions, segments, input, **kwargs):
     r"""A helper function for checkpointing sequential models.
 
@@ -188,10 +569,16 @@ def checkpoint_sequential(functions, segments, input, **kwargs):
         Since PyTorch 1.4, it allows only one Tensor as the input and
         intermediate outputs, just like :class:`torch.nn.Sequential`.
 
+    Instead of a number of chunks, :attr:`segments` can also be a plan, i.e.
+    a list of :class:`CheckpointSegment` covering every layer in order, as
+    produced by :func:`plan_checkpoint_segments`. Only the segments marked as
+    checkpointed are recomputed in backward.
+
     Args:
         functions: A :class:`torch.nn.Sequential` or the list of modules or
             functions (comprising the model) to run sequentially.
-        segments: Number of chunks to create in the model
+        segments: Number of chunks to create in the model, or a list of
+            :class:`CheckpointSegment`
         input: A Tensor that is input to :attr:`functions`
         preserve_rng_state(bool, optional, default=True):  Omit stashing and restoring
             the RNG state during each checkpoint.
@@ -218,6 +605,22 @@ def checkpoint_sequential(functions, segments, input, **kwargs):
     if isinstance(functions, torch.nn.Sequential):
         functions = list(functions.children())
 
+    if not isinstance(segments, int):
+        expected_start = 0
+        for segment in segments:
+            if segment.start != expected_start or segment.end < segment.start:
+                raise ValueError("Checkpoint plan must cover the layers in order without gaps")
+            expected_start = segment.end + 1
+            if segment.checkpointed:
+                input = checkpoint(run_function(segment.start, segment.end, functions), input,
+                                   preserve_rng_state=preserve)
+            else:
+                input = run_function(segment.start, segment.end, functions)(input)
+        if expected_start != len(functions):
+            raise ValueError("Checkpoint plan covers {} layers, but the model has {}".format(
+                expected_start, len(functions)))
+        return input
+
     segment_size = len(functions) // segments
     # the last chunk has to be non-volatile
     end = -1
@@ -1,5 +1,8 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import bisect
+from collections import namedtuple
+
 import torch._C
 
 def format_time(time_us=None, time_ms=None, time_s=None):
@@ -28,6 +31,7 @@ class ExecutionStats(object):
     def __init__(self, c_stats, benchmark_config):
         self._c_stats = c_stats
         self.benchmark_config = benchmark_config
+        self._sorted_latencies_ms = None
 
     @property
     def latency_avg_ms(self):
@@ -46,17 +50,92 @@ class ExecutionStats(object):
 
     @property
     def total_time_seconds(self):
-        return self.num_iters * (
-            self.latency_avg_ms / 1000.0) / self.benchmark_config.num_calling_threads
+        return self._c_stats.total_time_ms / 1000.0
+
+    @property
+    def latencies_ms(self):
+        '''
+        Returns the latency of every measured iteration in milliseconds. In the
+        open-loop mode, the latency of an iteration includes the time its
+        request waited for a free calling thread
+        '''
+        return self._c_stats.latencies_ms
 
+    @property
+    def num_warmup_iters(self):
+        '''
+        Returns the number of warmup iterations run by each calling thread
+        '''
+        return self._c_stats.num_warmup_iters
+
+    def latency_percentile_ms(self, q):
+        '''
+        Returns the q-th percentile of the latencies in milliseconds, with q
+        between 0 and 100, using the nearest-rank method
+        '''
+        if not 0 <= q <= 100:
+            raise ValueError("Invalid percentile: {}".format(q))
+        if self._sorted_latencies_ms is None:
+            self._sorted_latencies_ms = sorted(self.latencies_ms)
+        latencies = self._sorted_latencies_ms
+        index = max(0, int(-(-q * len(latencies) // 100)) - 1)
+        return latencies[index]
+
+    @property
+    def latency_p50_ms(self):
+        return self.latency_percentile_ms(50)
+
+    @property
+    def latency_p90_ms(self):
+        return self.latency_percentile_ms(90)
+
+    @property
+    def latency_p99_ms(self):
+        return self.latency_percentile_ms(99)
+
+    def latency_histogram(self, num_buckets=20):
+        '''
+        Returns the histogram of the latencies as a list of
+        ``(upper_bound_ms, count)`` pairs, with ``num_buckets`` buckets of
+        geometrically increasing width between the lowest and the highest
+        latency, so that the tail is as visible as the mode
+        '''
+        latencies = self._sorted_latencies_ms
+        if latencies is None:
+            latencies = self._sorted_latencies_ms = sorted(self.latencies_ms)
+        low, high = latencies[0], latencies[-1]
+        if low <= 0 or high == low:
+            bounds = [low + (high - low) * (i + 1) / num_buckets for i in range(num_buckets)]
+        else:
+            ratio = (high / low) ** (1.0 / num_buckets)
+            bounds = [low * ratio ** (i + 1) for i in range(num_buckets)]
+        bounds[-1] = high
+        counts = []
+        start = 0
+        for bound in bounds:
+            end = bisect.bisect_right(latencies, bound)
+            counts.append(end - start)
+            start = end
+        return list(zip(bounds, counts))
 
     def __str__(self):
-        return '\n'.join([
+        lines = [
             "Average latency per example: " + format_time(time_ms=self.latency_avg_ms),
+            "Latency percentiles: p50 {}, p90 {}, p99 {}".format(
+                format_time(time_ms=self.latency_p50_ms),
+                format_time(time_ms=self.latency_p90_ms),
+                format_time(time_ms=self.latency_p99_ms)),
             "Total number of iterations: {}".format(self.num_iters),
             "Total number of iterations per second (across all threads): {:.2f}".format(self.iters_per_second),
             "Total time: " + format_time(time_s=self.total_time_seconds)
-        ])
+        ]
+        if self.benchmark_config.target_qps > 0:
+            lines.append("Target number of iterations per second: {:.2f}".format(
+                self.benchmark_config.target_qps))
+        return '\n'.join(lines)
+
+
+SweepResult = namedtuple('SweepResult', ['num_calling_threads', 'num_intra_op_threads', 'stats'])
 
 
 class ThroughputBenchmark(object):
@@ -122,7 +201,10 @@ class ThroughputBenchmark(object):
             num_calling_threads=1,
             num_warmup_iters=10,
             num_iters=100,
-            profiler_output_path=""):
+            profiler_output_path="",
+            target_qps=0,
+            warmup_tolerance=0,
+            max_warmup_iters=10000):
         '''
         Args:
             num_warmup_iters (int): Warmup iters are used to make sure we run a module
@@ -130,6 +212,16 @@ class ThroughputBenchmark(object):
                 caches and any other similar problems. This is the number of warmup
                 iterations for each of the thread in separate
 
+            warmup_tolerance (float): If positive, each thread keeps running windows of
+                num_warmup_iters warmup iterations until the average latency of a window
+                differs from the one of the previous window by less than this fraction,
+                i.e. until the latency reached a steady state, or max_warmup_iters
+                iterations were run. The number of warmup iterations of each thread is
+                reported as stats.num_warmup_iters
+
+            max_warmup_iters (int): Maximum number of warmup iterations of each thread
+                when warmup_tolerance is positive
+
             num_iters (int): Number of iterations the benchmark should run with.
                 This number is separate from the warmup iterations. Also the number is
                 shared across all the threads. Once the num_iters iterations across all
@@ -142,16 +234,68 @@ class ThroughputBenchmark(object):
                 execution (but not the warmup phase). The full trace will be saved
                 into the file path provided by this argument
 
+            target_qps (float): If positive, the benchmark runs open-loop, like a server
+                receiving independent requests: the num_iters requests arrive as a Poisson
+                process with target_qps requests per second on average, and are served in
+                order of arrival by the calling threads. The latency of a request is
+                measured from its arrival, so it includes the time it waited for a free
+                thread. Otherwise every thread starts the next iteration as soon as the
+                previous one finished, and the arrival rate adapts to the service rate
+
 
-        This function returns BenchmarkExecutionStats object which is defined via pybind11.
-        It currently has two fields:
-            - num_iters - number of actual iterations the benchmark have made
-            - avg_latency_ms - average time it took to infer on one input example in milliseconds
+        This function returns ExecutionStats object, which provides the average latency,
+        the latency of every iteration and their percentiles and histogram, the number
+        of iterations, the number of iterations per second and the total time.
+
+        The calling threads use the number of intra-op threads set by
+        torch.set_num_threads before the call.
         '''
         config = torch._C.BenchmarkConfig()
         config.num_calling_threads = num_calling_threads
         config.num_warmup_iters = num_warmup_iters
+        config.warmup_tolerance = warmup_tolerance
+        config.max_warmup_iters = max_warmup_iters
         config.num_iters = num_iters
+        config.target_qps = target_qps
         config.profiler_output_path = profiler_output_path
         c_stats = self._benchmark.benchmark(config)
         return ExecutionStats(c_stats, config)
+
+    def sweep(self, num_calling_threads=(1, 2, 4, 8), num_intra_op_threads=(None,), **kwargs):
+        '''
+        Runs the benchmark for every combination of a number of calling threads and a
+        number of intra-op threads, e.g. to find the configuration with the highest
+        throughput at an acceptable p99 latency, or the load where the latency starts to
+        grow faster than the throughput.
+
+        Args:
+            num_calling_threads (iterable of int): Numbers of calling threads to run with
+
+            num_intra_op_threads (iterable of int): Numbers of intra-op threads to run with,
+                set with torch.set_num_threads. None keeps the current number. The number
+                of intra-op threads is restored after the sweep
+
+            kwargs: Other arguments of benchmark(), e.g. num_iters or target_qps
+
+        Returns a list of SweepResult named tuples with fields num_calling_threads,
+        num_intra_op_threads and stats, the ExecutionStats of the run.
+
+        Example::
+
+            >>> results = bench.sweep(num_calling_threads=[1, 2, 4], num_intra_op_threads=[1, 4],
+                                      num_iters=1000, warmup_tolerance=0.05)
+            >>> for result in results:
+                    print(result.num_calling_threads, result.num_intra_op_threads,
+                          result.stats.iters_per_second, result.stats.latency_p99_ms)
+        '''
+        initial_num_threads = torch.get_num_threads()
+        results = []
+        try:
+            for num_threads in num_intra_op_threads:
+                torch.set_num_threads(num_threads if num_threads is not None else initial_num_threads)
+                for num_callers in num_calling_threads:
+                    stats = self.benchmark(num_calling_threads=num_callers, **kwargs)
+                    results.append(SweepResult(num_callers, torch.get_num_threads(), stats))
+        finally:
+            torch.set_num_threads(initial_num_threads)
+        return results